@@ -0,0 +1,53 @@
+from app.structured_logging import configure_logging
+configure_logging()
+
+import os
+
+from aiohttp import ClientSession, web
+from slack_bolt.oauth.async_callback_options import AsyncCallbackOptions
+from slack_bolt.oauth.async_oauth_settings import AsyncOAuthSettings
+from slack_sdk.oauth.installation_store import FileInstallationStore
+
+from app.async_listener_index import AsyncIndexedApp
+from app.async_listeners import register_listeners
+from app.async_onboarding import install_completion, install_failure
+from app.onboarding_fanout import onboarding_fanout
+from app.tutorials import load_all_options_indexes
+
+# デフォルトではローカルファイルに state の情報やインストール情報を書きます
+# 必要に応じて別の実装に差し替えてください（Amazon S3, RDB に対応しています）
+installation_store = FileInstallationStore(client_id=os.environ["SLACK_CLIENT_ID"])
+
+# lazy リスナーはスレッドではなく asyncio のタスクとして実行されます
+app = AsyncIndexedApp(
+    oauth_settings=AsyncOAuthSettings(
+        callback_options=AsyncCallbackOptions(
+            success=install_completion, failure=install_failure
+        ),
+        installation_store=installation_store,
+        # Simpler & v1.0.x compatible mode
+        installation_store_bot_only=True
+    ),
+)
+register_listeners(app)
+# The welcome DMs are sent in threads, which use the sync interface of the store
+onboarding_fanout.installation_store = installation_store
+# The options of SLACK_OPTIONS_SOURCE are indexed before the server receives requests
+load_all_options_indexes()
+
+
+# e.g., gunicorn aiohttp_app:web_app --worker-class aiohttp.GunicornWebWorker
+async def web_app() -> web.Application:
+    # All the Web API calls share the connection pool of this session
+    app.client.session = ClientSession()
+
+    async def close_session(_):
+        await app.client.session.close()
+
+    application = app.web_app()
+    application.on_cleanup.append(close_session)
+    return application
+
+
+if __name__ == "__main__":
+    web.run_app(web_app(), port=int(os.environ.get("PORT", 3000)))
@@ -0,0 +1,64 @@
+import functools
+import logging
+from typing import Awaitable, Callable, Optional
+
+from slack_bolt.async_app import AsyncBoltContext
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from app.i18n import (
+    LazyLang,
+    _current_lang,
+    cache_lang,
+    default_lang,
+    find_cached_lang,
+    find_user_lang,
+    fixed_lang,
+    to_lang,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def resolve_lang(
+    client: AsyncWebClient, user_id: Optional[str], token: Optional[str] = None
+) -> str:
+    if fixed_lang is not None:
+        return fixed_lang
+    if user_id is None:
+        return default_lang
+
+    lang = find_cached_lang(user_id)
+    if lang is not None:
+        return lang
+    try:
+        response = await client.users_info(
+            user=user_id, include_locale=True, token=token
+        )
+        lang = to_lang(response["user"].get("locale"))
+    except SlackApiError as e:
+        logger.warning(f"Failed to fetch the locale of {user_id}: {e}")
+        return default_lang
+
+    cache_lang(user_id, lang)
+    return lang
+
+
+# For the lazy listeners; resolves the user's language before running the listener (see app/i18n.py)
+def with_user_lang(listener: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    @functools.wraps(listener)
+    async def run(*args, **kwargs):
+        lang = _current_lang.get()
+        if isinstance(lang, LazyLang) and lang.lang is None:
+            lang.lang = await lang.resolve()
+        return await listener(*args, **kwargs)
+
+    return run
+
+
+# Never calls users.info (see app/i18n.py); each request runs in its own asyncio task
+async def set_user_lang(context: AsyncBoltContext, client: AsyncWebClient, body: dict, next):
+    lang = find_user_lang(body, context.user_id)
+    user_id = context.user_id
+    _current_lang.set(lang or LazyLang(user_id, lambda: resolve_lang(client, user_id)))
+    await next()
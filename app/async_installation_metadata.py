@@ -0,0 +1,40 @@
+import logging
+
+from slack_bolt.async_app import AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from app.installation_metadata import InstallationMetadata, installation_metadata_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def find_installation_metadata(
+    context: AsyncBoltContext, client: AsyncWebClient
+) -> InstallationMetadata:
+    cache = installation_metadata_cache
+    metadata = cache.find(enterprise_id=context.enterprise_id, team_id=context.team_id)
+    if metadata is not None:
+        return metadata
+
+    bot = None
+    if cache.installation_store is not None:
+        try:
+            bot = await cache.installation_store.async_find_bot(
+                enterprise_id=context.enterprise_id,
+                team_id=context.team_id,
+                is_enterprise_install=context.is_enterprise_install,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load the bot installation: {e}")
+    if bot is not None and bot.app_id is not None:
+        metadata = InstallationMetadata(app_id=bot.app_id, bot_user_id=bot.bot_user_id)
+    else:
+        # https://github.com/slackapi/bolt-python/pull/126
+        bot_info = (await client.bots_info(bot=context.bot_id))["bot"]
+        metadata = InstallationMetadata(
+            app_id=bot_info["app_id"], bot_user_id=bot_info.get("user_id")
+        )
+    cache.save(
+        enterprise_id=context.enterprise_id, team_id=context.team_id, metadata=metadata
+    )
+    return metadata
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from slack_bolt import BoltResponse
+from slack_bolt.async_app import AsyncAck, AsyncApp
+from slack_bolt.middleware.async_middleware import AsyncMiddleware
+from slack_bolt.request.async_request import AsyncBoltRequest
+
+from app.listener_index import (
+    ListenerIndex,
+    ListenerIndexMixin,
+    current_routing_key,
+    to_routing_key,
+)
+
+
+async def just_ack(ack: AsyncAck):
+    await ack()
+
+
+class AsyncAckOnlyMiddleware(AsyncMiddleware):
+    def __init__(self, app: ListenerIndexMixin):
+        self.app = app
+
+    async def async_process(
+        self,
+        *,
+        req: AsyncBoltRequest,
+        resp: BoltResponse,
+        next: Callable[[], Awaitable[BoltResponse]],
+    ):
+        if self.app.is_ack_only():
+            return BoltResponse(status=200, body="")
+        return await next()
+
+
+# The same routing as IndexedApp, running on asyncio
+class AsyncIndexedApp(ListenerIndexMixin, AsyncApp):
+    ack_only_function = staticmethod(just_ack)
+
+    def __init__(self, **kwargs):
+        self.ack_only_listeners = set()
+        kwargs.setdefault("before_authorize", AsyncAckOnlyMiddleware(self))
+        super().__init__(**kwargs)
+        self._async_listeners = self.listener_index = ListenerIndex(self._async_listeners)
+
+    # In a new task (a copy of the context) as with IndexedApp; aiohttp handles
+    # the requests on a keep-alive connection in the same task
+    async def async_dispatch(self, req: AsyncBoltRequest) -> BoltResponse:
+        return await asyncio.create_task(self._async_dispatch(req))
+
+    async def _async_dispatch(self, req: AsyncBoltRequest) -> BoltResponse:
+        current_routing_key.set(to_routing_key(req.body))
+        return await super().async_dispatch(req)
@@ -0,0 +1,70 @@
+import logging
+
+from slack_bolt.async_app import AsyncAck, AsyncRespond
+from slack_bolt.oauth.async_callback_options import AsyncFailureArgs, AsyncSuccessArgs
+
+from app.async_i18n import with_user_lang
+from app.authorization_cache import invalidate_authorization
+from app.i18n import i18n, language
+from app.installation_metadata import InstallationMetadata, installation_metadata_cache
+from app.onboarding import (
+    build_html_response,
+    install_path,
+    render_failure_page_with_size,
+    render_success_page_with_size,
+    to_page_lang,
+)
+from app.onboarding_fanout import onboarding_fanout
+
+logger = logging.getLogger(__name__)
+
+
+async def install_completion(args: AsyncSuccessArgs):
+    installation = args.installation
+    installation_metadata_cache.save(
+        enterprise_id=installation.enterprise_id,
+        team_id=installation.team_id,
+        metadata=InstallationMetadata(
+            app_id=installation.app_id,
+            bot_user_id=installation.bot_user_id,
+        ),
+    )
+    # The other containers may have cached that the app is not installed
+    invalidate_authorization(
+        installation.enterprise_id,
+        installation.team_id,
+        installation.is_enterprise_install,
+    )
+    # The welcome DMs are sent by the same background pipeline as the sync edition
+    try:
+        onboarding_fanout.start(installation)
+    except Exception as e:
+        logger.exception(f"Failed to start sending the welcome messages: {e}")
+
+    with language(to_page_lang(args.request)):
+        html, size = render_success_page_with_size(
+            app_id=installation.app_id,
+            team_id=installation.team_id,
+            is_enterprise_install=installation.is_enterprise_install,
+            enterprise_url=installation.enterprise_url,
+        )
+    return build_html_response(200, html, size)
+
+
+async def install_failure(args: AsyncFailureArgs):
+    with language(to_page_lang(args.request)):
+        html, size = render_failure_page_with_size(install_path, args.reason)
+    return build_html_response(args.suggested_status_code, html, size)
+
+
+async def message_multi_users_select(ack: AsyncAck):
+    await ack()
+
+
+@with_user_lang
+async def message_multi_users_select_lazy(action: dict, respond: AsyncRespond):
+    users = ", ".join([f"<@{u}>" for u in action["selected_users"]])
+    await respond(
+        text=i18n(f"You selected {users}!", f"あなたは {users} を選択しました！"),
+        replace_original=False,
+    )
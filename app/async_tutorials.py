@@ -0,0 +1,291 @@
+import asyncio
+import functools
+from logging import Logger
+from typing import Optional
+
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from app.async_i18n import with_user_lang
+from app.async_installation_metadata import find_installation_metadata
+from app.i18n import current_lang
+from app.published_views import InMemoryPublishedViewStore, PublishedView
+from app.structured_logging import structured
+from app.tutorials import (
+    build_channel_setup_message_blocks,
+    build_channel_setup_message_text,
+    build_global_shortcut_modal,
+    build_message_shortcut_guide_blocks,
+    build_message_shortcut_guide_text,
+    build_message_shortcut_modal,
+    build_page1_button_modal,
+    build_page1_users_select_modal,
+    build_page2_modal,
+    build_page2_modal_submission_response,
+    build_page4_channel_created_view,
+    build_page4_channel_creation_failure_view,
+    build_page4_channel_creation_progress_view,
+    build_page4_create_channel_modal,
+    build_page4_create_channel_submission_view,
+    build_shortcuts_summary_text,
+    find_options,
+    find_page_to_publish,
+    load_tutorial_view_hashes,
+    published_view_store,
+    tutorial_view,
+)
+
+
+# The file and S3 stores block, so they run in the default thread pool
+async def run_published_view_store(method, **kwargs):
+    if isinstance(published_view_store, InMemoryPublishedViewStore):
+        return method(**kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(method, **kwargs))
+
+
+# --------------------------------------------
+# home tab
+# --------------------------------------------
+
+
+async def app_home_opened():
+    pass
+
+
+async def publish_tutorial_view(
+    context: AsyncBoltContext, client: AsyncWebClient, page: int
+):
+    await client.views_publish(user_id=context.user_id, view=tutorial_view(page))
+    content_hash = load_tutorial_view_hashes(current_lang()).get(page)
+    if content_hash is not None:
+        await run_published_view_store(
+            published_view_store.save,
+            enterprise_id=context.enterprise_id,
+            team_id=context.team_id,
+            user_id=context.user_id,
+            view=PublishedView(page=page, content_hash=content_hash),
+        )
+
+
+@with_user_lang
+async def app_home_opened_lazy(
+    event, context: AsyncBoltContext, client: AsyncWebClient
+):
+    if event["tab"] != "home":
+        return
+
+    published = await run_published_view_store(
+        published_view_store.find,
+        enterprise_id=context.enterprise_id,
+        team_id=context.team_id,
+        user_id=context.user_id,
+    )
+    page = find_page_to_publish(event, published)
+    if page is not None:
+        await publish_tutorial_view(context, client, page)
+
+
+async def tutorial_page_transition(ack: AsyncAck):
+    await ack()
+
+
+@with_user_lang
+async def tutorial_page_transition_lazy(
+    action: dict, context: AsyncBoltContext, client: AsyncWebClient
+):
+    await publish_tutorial_view(context, client, int(action["value"]))
+
+
+# --------------------------------------------
+# page 1
+# --------------------------------------------
+
+
+async def page1_home_tab_button_click(ack: AsyncAck):
+    await ack()
+
+
+@with_user_lang
+async def page1_home_tab_button_click_lazy(
+    action: dict, body: dict, client: AsyncWebClient
+):
+    await client.views_open(
+        trigger_id=body["trigger_id"],
+        view=build_page1_button_modal(int(action["value"])),
+    )
+
+
+async def page1_home_tab_users_select(ack: AsyncAck):
+    await ack()
+
+
+@with_user_lang
+async def page1_home_tab_users_select_lazy(
+    action, body: dict, client: AsyncWebClient
+):
+    await client.views_open(
+        trigger_id=body["trigger_id"],
+        view=build_page1_users_select_modal(action["selected_user"]),
+    )
+
+
+# --------------------------------------------
+# page 2
+# --------------------------------------------
+
+
+async def page2_modal(ack: AsyncAck):
+    await ack()
+
+
+@with_user_lang
+async def page2_modal_lazy(body: dict, client: AsyncWebClient, logger: Logger):
+    modal = build_page2_modal()
+    logger.info(structured("Opening a modal", view=modal))
+    await client.views_open(trigger_id=body["trigger_id"], view=modal)
+
+
+async def page2_modal_submission(ack: AsyncAck, view: dict):
+    await ack(**build_page2_modal_submission_response(view))
+
+
+# --------------------------------------------
+# page 3
+# --------------------------------------------
+
+
+async def external_data_source_handler(ack: AsyncAck, body: dict):
+    await ack(options=find_options(body.get("value")))
+
+
+# --------------------------------------------
+# page 4
+# --------------------------------------------
+
+
+async def page4_create_channel(ack: AsyncAck):
+    await ack()
+
+
+@with_user_lang
+async def page4_create_channel_lazy(
+    body: dict, context: AsyncBoltContext, client: AsyncWebClient, logger: Logger
+):
+    modal = build_page4_create_channel_modal(context.user_id)
+    logger.info(structured("Opening a modal", view=modal))
+    await client.views_open(trigger_id=body["trigger_id"], view=modal)
+
+
+async def page4_create_channel_submission(ack: AsyncAck):
+    await ack(
+        response_action="update",
+        view=build_page4_create_channel_submission_view(),
+    )
+
+
+async def update_view(
+    client: AsyncWebClient, view_id: str, view: dict, view_hash: Optional[str] = None
+) -> Optional[str]:
+    try:
+        response = await client.views_update(view_id=view_id, hash=view_hash, view=view)
+        return response["view"]["hash"]
+    except SlackApiError as e:
+        if e.response["error"] == "hash_conflict":
+            return None
+        raise
+
+
+@with_user_lang
+async def page4_create_channel_submission_lazy(
+    view: dict, context: AsyncBoltContext, client: AsyncWebClient, logger: Logger
+):
+    values = view.get("state", {}).get("values", {})
+    channel_name = values.get("channel_name", {}).get("input", {}).get("value")
+    progress = None
+    try:
+        channel_creation = await client.conversations_create(name=channel_name)
+        channel_id = channel_creation["channel"]["id"]
+        # The progress update, join and invite only need the channel ID
+        progress = asyncio.ensure_future(
+            update_view(
+                client, view["id"], build_page4_channel_creation_progress_view(channel_id)
+            )
+        )
+        await asyncio.gather(
+            client.conversations_join(channel=channel_id),
+            client.conversations_invite(channel=channel_id, users=[context.user_id]),
+        )
+        result_view = build_page4_channel_created_view(channel_id)
+    except SlackApiError as e:
+        result_view = build_page4_channel_creation_failure_view(e.response["error"])
+
+    # The result must not be overwritten by the progress update
+    view_hash = None
+    if progress is not None:
+        try:
+            view_hash = await progress
+        except SlackApiError as e:
+            logger.warning(f"Failed to update the progress: {e}")
+    await update_view(client, view["id"], result_view, view_hash)
+
+
+async def page4_create_channel_setup(ack: AsyncAck):
+    await ack()
+
+
+@with_user_lang
+async def page4_create_channel_setup_lazy(
+    event: dict, context: AsyncBoltContext, client: AsyncWebClient
+):
+    creator = event["channel"]["creator"]
+    if creator == context.bot_user_id:
+        await client.chat_postMessage(
+            channel=event["channel"]["id"],
+            text=build_channel_setup_message_text(),
+            blocks=build_channel_setup_message_blocks(),
+        )
+
+
+async def global_shortcut_handler(ack: AsyncAck, body: dict, client: AsyncWebClient):
+    await ack()
+    await client.views_open(
+        trigger_id=body["trigger_id"],
+        view=build_global_shortcut_modal(),
+    )
+
+
+async def global_shortcut_view_submission(ack: AsyncAck):
+    await ack()
+
+
+@with_user_lang
+async def global_shortcut_view_submission_lazy(view: dict, client: AsyncWebClient):
+    await client.chat_postMessage(
+        channel=view["state"]["values"]["channel"]["input"]["selected_conversation"],
+        text=build_message_shortcut_guide_text(),
+        blocks=build_message_shortcut_guide_blocks(),
+    )
+
+
+async def message_shortcut_handler(ack: AsyncAck):
+    await ack()
+
+
+@with_user_lang
+async def message_shortcut_handler_lazy(
+    body: dict, context: AsyncBoltContext, client: AsyncWebClient, logger: Logger
+):
+    await client.views_open(
+        trigger_id=body["trigger_id"], view=build_message_shortcut_modal()
+    )
+    try:
+        team_id = context.team_id
+        app_id = (await find_installation_metadata(context, client)).app_id
+        await client.chat_postMessage(
+            channel=body["channel"]["id"],
+            text=build_shortcuts_summary_text(team_id, app_id),
+        )
+    except Exception as e:
+        logger.exception(f"Failed to post a message: {e}")
@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from logging import Logger
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+from slack_bolt import BoltContext
+from slack_bolt.authorization import AuthorizeResult
+from slack_bolt.authorization.authorize import InstallationStoreAuthorize
+from slack_sdk.errors import SlackApiError
+
+# The serialized form is a JSON array of these values in this order
+authorize_result_fields = [
+    "enterprise_id",
+    "team_id",
+    "team",
+    "url",
+    "bot_user_id",
+    "bot_id",
+    "bot_token",
+    "bot_scopes",
+    "user_id",
+    "user",
+    "user_token",
+    "user_scopes",
+]
+
+
+def serialize_authorize_result(result: Optional[AuthorizeResult]) -> str:
+    if result is None:
+        return ""  # the installation does not exist
+    values = []
+    for name in authorize_result_fields:
+        value = result.get(name)
+        values.append(",".join(value) if isinstance(value, list) else value)
+    while len(values) > 0 and values[-1] is None:
+        values.pop()
+    return json.dumps(values, separators=(",", ":"))
+
+
+def deserialize_authorize_result(data: str) -> Optional[AuthorizeResult]:
+    if data == "":
+        return None
+    return AuthorizeResult(**dict(zip(authorize_result_fields, json.loads(data))))
+
+
+# A cache shared by the Lambda containers, e.g., on an EFS volume mounted to all of them.
+# A file per installation; each file has the expiration time in the first line
+class FileAuthorizationCache:
+    def __init__(
+        self,
+        *,
+        base_dir: str,
+        logger: Logger = logging.getLogger(__name__),
+    ):
+        self.base_dir = base_dir
+        self.logger = logger
+        Path(base_dir).mkdir(parents=True, exist_ok=True)
+
+    def find(self, key):
+        try:
+            expires_at, value = Path(f"{self.base_dir}/{key}").read_text().split("\n", 1)
+            return value if float(expires_at) > time.time() else None
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Failed to load the authorization cache ({key}): {e}")
+            return None
+
+    def save(self, key, value, ttl_seconds):
+        path = f"{self.base_dir}/{key}"
+        # Renaming a file is atomic, so other containers never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{time.time() + ttl_seconds}\n{value}")
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        Path(f"{self.base_dir}/{key}").unlink(missing_ok=True)
+
+
+class SQLiteAuthorizationCache:
+    def __init__(self, *, database: str):
+        self.database = database
+        self._local = threading.local()
+        # The file has the bot tokens; readable only by the owner as with FileAuthorizationCache
+        os.close(os.open(database, os.O_WRONLY | os.O_CREAT, 0o600))
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS authorization_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.database, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def find(self, key):
+        row = (
+            self._connect()
+            .execute(
+                "SELECT value FROM authorization_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return row[0] if row is not None else None
+
+    def save(self, key, value, ttl_seconds):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO authorization_cache VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl_seconds),
+            )
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM authorization_cache WHERE key = ?", (key,))
+
+
+AuthorizationCache = Union[FileAuthorizationCache, SQLiteAuthorizationCache]
+
+
+def build_authorization_cache() -> Optional[AuthorizationCache]:
+    database = os.environ.get("SLACK_AUTHORIZATION_CACHE_DB")
+    if database:
+        return SQLiteAuthorizationCache(database=database)
+    base_dir = os.environ.get("SLACK_AUTHORIZATION_CACHE_DIR")
+    if base_dir:
+        return FileAuthorizationCache(base_dir=base_dir)
+    return None
+
+
+shared_authorization_cache = build_authorization_cache()
+
+# key -> (authorize result, expiration time) in this container (least recently used first).
+# The workspaces without the installation are cached only in the shared cache,
+# so that invalidate_authorization on a new installation applies to all the containers.
+local_authorizations: "OrderedDict[str, Tuple[AuthorizeResult, float]]" = OrderedDict()
+local_authorizations_lock = threading.Lock()
+max_local_authorizations = 10000
+
+# auth.test errors meaning that the installation is no longer valid
+unauthorized_errors = {"invalid_auth", "account_inactive", "token_revoked"}
+
+
+def to_authorization_key(
+    enterprise_id: Optional[str], team_id: Optional[str], is_enterprise_install: Optional[bool]
+) -> str:
+    none = "none"
+    return f"{enterprise_id or none}-{none if is_enterprise_install else team_id or none}"
+
+
+# Called when an installation is saved, as it may have a negative cache entry
+def invalidate_authorization(
+    enterprise_id: Optional[str], team_id: Optional[str], is_enterprise_install: Optional[bool]
+):
+    key = to_authorization_key(enterprise_id, team_id, is_enterprise_install)
+    with local_authorizations_lock:
+        local_authorizations.pop(key, None)
+    if shared_authorization_cache is not None:
+        try:
+            shared_authorization_cache.delete(key)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Failed to invalidate {key}: {e}")
+
+
+# Looks up the authorization in this order:
+# 1. this container's memory
+# 2. the shared cache, which the other containers have filled
+# 3. the installation store's bot and auth.test (as InstallationStoreAuthorize with bot_only=True)
+# Workspaces without the installation are cached for a shorter time.
+class SharedCacheAuthorize(InstallationStoreAuthorize):
+    def __init__(
+        self,
+        *,
+        cache: AuthorizationCache,
+        ttl_seconds: float = 600,
+        negative_ttl_seconds: float = 60,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+
+    # Returns the authorization and whether the installation is confirmed missing or revoked;
+    # the temporary failures (e.g., the installation store, auth.test's 429 / 5xx) are not cached
+    def _authorize(
+        self, context: BoltContext, enterprise_id: Optional[str], team_id: Optional[str]
+    ) -> Tuple[Optional[AuthorizeResult], bool]:
+        try:
+            bot = self.installation_store.find_bot(
+                enterprise_id=enterprise_id,
+                team_id=team_id,
+                is_enterprise_install=context.is_enterprise_install,
+            )
+        except Exception as e:
+            self.logger.info(f"Failed to call find_bot method: {e}")
+            return None, False
+        if bot is None:
+            return None, True
+        try:
+            response = context.client.auth_test(token=bot.bot_token)
+        except SlackApiError as e:
+            self.logger.debug(f"auth.test failed ({enterprise_id}-{team_id}): {e.response}")
+            return None, e.response.get("error") in unauthorized_errors
+        result = AuthorizeResult.from_auth_test_response(
+            auth_test_response=response,
+            bot_token=bot.bot_token,
+            bot_scopes=bot.bot_scopes,
+        )
+        return result, False
+
+    def __call__(
+        self,
+        *,
+        context: BoltContext,
+        enterprise_id: Optional[str],
+        team_id: Optional[str],
+        user_id: Optional[str],
+        **kwargs,
+    ) -> Optional[AuthorizeResult]:
+        key = to_authorization_key(enterprise_id, team_id, context.is_enterprise_install)
+        now = time.time()
+        with local_authorizations_lock:
+            entry = local_authorizations.get(key)
+            if entry is not None:
+                local_authorizations.move_to_end(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        data = None
+        try:
+            data = self.cache.find(key)
+        except Exception as e:
+            self.logger.warning(f"Failed to load the authorization cache ({key}): {e}")
+        if data is not None:
+            result = deserialize_authorize_result(data)
+        else:
+            result, unauthorized = self._authorize(context, enterprise_id, team_id)
+            if result is None and not unauthorized:
+                return None
+            ttl_seconds = self.ttl_seconds if result is not None else self.negative_ttl_seconds
+            try:
+                self.cache.save(key, serialize_authorize_result(result), ttl_seconds)
+            except Exception as e:
+                self.logger.warning(f"Failed to save the authorization cache ({key}): {e}")
+
+        if result is None:
+            return None
+        with local_authorizations_lock:
+            local_authorizations[key] = (result, now + self.ttl_seconds)
+            local_authorizations.move_to_end(key)
+            while len(local_authorizations) > max_local_authorizations:
+                local_authorizations.popitem(last=False)
+        return result
@@ -0,0 +1,35 @@
+import functools
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+text_object_types = {"mrkdwn", "plain_text"}
+
+
+# Removes the whitespace that Slack doesn't render: the newlines and indentation around
+# the triple-quoted text and the trailing spaces of each line.
+# The leading spaces of each line are kept as they are visible (e.g., in ``` code blocks).
+def compact_text(text: str) -> str:
+    return "\n".join(line.rstrip() for line in text.strip().split("\n"))
+
+
+# Returns a copy of the blocks / view with the text objects compacted
+def compact_blocks(value: T) -> T:
+    if isinstance(value, list):
+        return [compact_blocks(v) for v in value]
+    if isinstance(value, dict):
+        result = {k: compact_blocks(v) for k, v in value.items()}
+        if value.get("type") in text_object_types and isinstance(value.get("text"), str):
+            result["text"] = compact_text(value["text"])
+        return result
+    return value
+
+
+# For the builders of the views and messages that are not cached per language
+# (the original builder is available as __wrapped__)
+def compacted(builder: Callable[..., T]) -> Callable[..., T]:
+    @functools.wraps(builder)
+    def build(*args, **kwargs) -> T:
+        return compact_blocks(builder(*args, **kwargs))
+
+    return build
@@ -0,0 +1,28 @@
+import threading
+from typing import Any, Optional
+
+
+# Creating a boto3 client takes more than 100 ms as it loads the service model,
+# so this proxy creates the underlying client when it's used for the first time
+class LazyBoto3Client:
+    def __init__(self, service_name: str, **kwargs):
+        self._service_name = service_name
+        self._kwargs = kwargs
+        self._client: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+
+                    from app.tracing import trace_boto3_client
+
+                    client = boto3.client(self._service_name, **self._kwargs)
+                    self._client = trace_boto3_client(client)
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
@@ -0,0 +1,38 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Optional, Set
+
+
+# Runs listeners with a copy of the caller's context variables
+# so that the language selected for the request is kept in lazy listeners
+class ContextCopyingThreadPoolExecutor(ThreadPoolExecutor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_flight: Set[Future] = set()
+        self._in_flight_lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        future = super().submit(context.run, fn, *args, **kwargs)
+        with self._in_flight_lock:
+            self._in_flight.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._in_flight_lock:
+            self._in_flight.discard(future)
+
+    def in_flight(self) -> int:
+        with self._in_flight_lock:
+            return len(self._in_flight)
+
+    # Stops accepting new tasks and waits for the running and queued ones
+    # (e.g., lazy listeners) before the process exits; returns the number of unfinished ones
+    def drain(self, timeout: Optional[float] = None) -> int:
+        self.shutdown(wait=False)
+        with self._in_flight_lock:
+            pending = list(self._in_flight)
+        _, not_done = wait(pending, timeout=timeout)
+        return len(not_done)
@@ -0,0 +1,146 @@
+import functools
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional, Union
+
+from slack_bolt import BoltContext
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+# When SLACK_LANGUAGE is set (ja / en), the app always uses the language.
+# Otherwise, the language is selected per request from the user's locale.
+fixed_lang = os.environ.get("SLACK_LANGUAGE") or None
+default_lang = "en"
+supported_langs = [fixed_lang] if fixed_lang is not None else ["en", "ja"]
+
+# The user's language that requires users.info. Only the lazy listeners resolve it
+# (with_user_lang), as the listeners that render text in ack have to respond in 3 seconds;
+# until then, it's the cached language or the default language.
+class LazyLang:
+    def __init__(self, user_id: str, resolve: Callable):
+        self.user_id = user_id
+        self.resolve = resolve
+        self.lang: Optional[str] = None
+
+    def get(self) -> str:
+        return self.lang or find_cached_lang(self.user_id) or default_lang
+
+
+_current_lang: ContextVar[Union[str, LazyLang, None]] = ContextVar("lang", default=None)
+
+
+def current_lang() -> str:
+    lang = _current_lang.get()
+    if isinstance(lang, LazyLang):
+        return lang.get()
+    return lang or fixed_lang or default_lang
+
+
+@contextmanager
+def language(lang: Union[str, LazyLang]):
+    token = _current_lang.set(lang)
+    try:
+        yield
+    finally:
+        _current_lang.reset(token)
+
+
+def i18n(default: str, ja: str):
+    if current_lang() == "ja":
+        return ja
+    return default
+
+
+def to_lang(locale: Optional[str]) -> str:
+    if locale is not None and locale.startswith("ja"):
+        return "ja"
+    return default_lang
+
+
+logger = logging.getLogger(__name__)
+
+_user_langs: "OrderedDict[str, str]" = OrderedDict()
+_user_langs_lock = threading.Lock()
+_user_langs_max_size = 10000
+
+
+def find_cached_lang(user_id: str) -> Optional[str]:
+    with _user_langs_lock:
+        lang = _user_langs.get(user_id)
+        if lang is not None:
+            _user_langs.move_to_end(user_id)
+        return lang
+
+
+def cache_lang(user_id: str, lang: str):
+    with _user_langs_lock:
+        _user_langs[user_id] = lang
+        while len(_user_langs) > _user_langs_max_size:
+            _user_langs.popitem(last=False)
+
+
+def resolve_lang(
+    client: WebClient, user_id: Optional[str], token: Optional[str] = None
+) -> str:
+    if fixed_lang is not None:
+        return fixed_lang
+    if user_id is None:
+        return default_lang
+
+    lang = find_cached_lang(user_id)
+    if lang is not None:
+        return lang
+    try:
+        response = client.users_info(user=user_id, include_locale=True, token=token)
+        lang = to_lang(response["user"].get("locale"))
+    except SlackApiError as e:
+        logger.warning(f"Failed to fetch the locale of {user_id}: {e}")
+        return default_lang
+
+    cache_lang(user_id, lang)
+    return lang
+
+
+# Some payloads have the user's locale (e.g., "user": {"locale": ...} when it is present)
+def find_payload_locale(body: dict) -> Optional[str]:
+    user = body.get("user")
+    return body.get("locale") or (user.get("locale") if isinstance(user, dict) else None)
+
+
+# Returns None when users.info is required
+def find_user_lang(body: dict, user_id: Optional[str]) -> Optional[str]:
+    if fixed_lang is not None:
+        return fixed_lang
+    if user_id is None:
+        return default_lang
+    locale = find_payload_locale(body)
+    if locale is not None:
+        lang = to_lang(locale)
+        cache_lang(user_id, lang)
+        return lang
+    return find_cached_lang(user_id)
+
+
+# For the lazy listeners; resolves the user's language before running the listener
+def with_user_lang(listener: Callable) -> Callable:
+    @functools.wraps(listener)
+    def run(*args, **kwargs):
+        lang = _current_lang.get()
+        if isinstance(lang, LazyLang) and lang.lang is None:
+            lang.lang = lang.resolve()
+        return listener(*args, **kwargs)
+
+    return run
+
+
+# Never calls users.info; the payload locale or the cached language is used when available.
+# IndexedApp runs each request in its own context, so the language doesn't leak into the next request.
+def set_user_lang(context: BoltContext, client: WebClient, body: dict, next):
+    lang = find_user_lang(body, context.user_id)
+    user_id = context.user_id
+    _current_lang.set(lang or LazyLang(user_id, lambda: resolve_lang(client, user_id)))
+    next()
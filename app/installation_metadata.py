@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from slack_bolt import BoltContext
+from slack_sdk import WebClient
+
+logger = logging.getLogger(__name__)
+
+
+# The values that never change for an installation
+class InstallationMetadata:
+    def __init__(self, *, app_id: str, bot_user_id: Optional[str] = None):
+        self.app_id = app_id
+        self.bot_user_id = bot_user_id
+
+
+def _to_key(enterprise_id: Optional[str], team_id: Optional[str]) -> str:
+    none = "none"
+    return f"{enterprise_id or none}-{team_id or none}"
+
+
+class InstallationMetadataCache:
+    def __init__(self, *, max_size: int = 10000, ttl_seconds: int = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # register_listeners sets the app's installation store
+        self.installation_store = None
+        self._entries: "OrderedDict[str, Tuple[InstallationMetadata, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(
+        self,
+        *,
+        enterprise_id: Optional[str],
+        team_id: Optional[str],
+        metadata: InstallationMetadata,
+    ):
+        key = _to_key(enterprise_id, team_id)
+        with self._lock:
+            self._entries[key] = (metadata, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def find(
+        self, *, enterprise_id: Optional[str], team_id: Optional[str]
+    ) -> Optional[InstallationMetadata]:
+        key = _to_key(enterprise_id, team_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+
+installation_metadata_cache = InstallationMetadataCache()
+
+
+def find_installation_metadata(
+    context: BoltContext, client: WebClient
+) -> InstallationMetadata:
+    cache = installation_metadata_cache
+    metadata = cache.find(enterprise_id=context.enterprise_id, team_id=context.team_id)
+    if metadata is not None:
+        return metadata
+
+    bot = None
+    if cache.installation_store is not None:
+        # CacheableInstallationStore already has the bot loaded by the authorization
+        try:
+            bot = cache.installation_store.find_bot(
+                enterprise_id=context.enterprise_id,
+                team_id=context.team_id,
+                is_enterprise_install=context.is_enterprise_install,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load the bot installation: {e}")
+    if bot is not None and bot.app_id is not None:
+        metadata = InstallationMetadata(app_id=bot.app_id, bot_user_id=bot.bot_user_id)
+    else:
+        # https://github.com/slackapi/bolt-python/pull/126
+        bot_info = client.bots_info(bot=context.bot_id)["bot"]
+        metadata = InstallationMetadata(
+            app_id=bot_info["app_id"], bot_user_id=bot_info.get("user_id")
+        )
+    cache.save(
+        enterprise_id=context.enterprise_id, team_id=context.team_id, metadata=metadata
+    )
+    return metadata
@@ -0,0 +1,341 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Set
+
+from slack_sdk.oauth.installation_store import Bot, Installation
+from slack_sdk.oauth.installation_store.amazon_s3 import AmazonS3InstallationStore
+from slack_sdk.oauth.installation_store.cacheable_installation_store import (
+    CacheableInstallationStore,
+)
+from slack_sdk.oauth.installation_store.sqlite3 import SQLite3InstallationStore
+from slack_sdk.oauth.state_store.amazon_s3 import AmazonS3OAuthStateStore
+from slack_sdk.oauth.state_store.sqlite3 import SQLite3OAuthStateStore
+
+from app.executors import ContextCopyingThreadPoolExecutor
+
+
+# Runs independent S3 requests at the same time on the shared boto3 client,
+# whose connection pool has 10 connections by default
+class ConcurrentS3IO:
+    def __init__(self, *, max_workers: int = 10):
+        # Copies the context so that the S3 requests belong to the request's trace
+        self.executor = ContextCopyingThreadPoolExecutor(max_workers=max_workers)
+        self._pending: Set[Future] = set()
+        self._lock = threading.Lock()
+
+    def run_all(self, calls: List[Callable]) -> list:
+        futures = [self.executor.submit(c) for c in calls[1:]]
+        results = [calls[0]()] if len(calls) > 0 else []
+        return results + [f.result() for f in futures]
+
+    # Runs a request that nobody waits for until wait() is called
+    def run_later(self, call: Callable):
+        future = self.executor.submit(call)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    # The Lambda handler calls this before returning a response,
+    # as the container can be frozen right after that
+    def wait(self):
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.exception()
+
+
+s3_io = ConcurrentS3IO()
+
+
+def is_not_found_error(e: Exception) -> bool:
+    if type(e).__name__ == "NoSuchKey":
+        return True
+    code = getattr(e, "response", {}).get("Error", {}).get("Code")
+    return code in ["NoSuchKey", "404"]
+
+
+# Writes the same objects as AmazonS3InstallationStore, at the same time
+class ConcurrentS3InstallationStore(AmazonS3InstallationStore):
+    def __init__(self, *, io: ConcurrentS3IO = s3_io, **kwargs):
+        super().__init__(**kwargs)
+        self.io = io
+
+    def _put_objects(self, objects: List[tuple]):
+        def put(key: str, body: str):
+            response = self.s3_client.put_object(Bucket=self.bucket_name, Body=body, Key=key)
+            self.logger.debug(f"S3 put_object response: {response}")
+
+        self.io.run_all([lambda k=k, b=b: put(k, b) for k, b in objects])
+
+    def _bot_objects(self, bot: Bot) -> List[tuple]:
+        if bot.bot_token is None:
+            self.logger.debug("Skipped saving a new row because of the absence of bot token in it")
+            return []
+        workspace_path = f"{self.client_id}/{bot.enterprise_id or 'none'}-{bot.team_id or 'none'}"
+        entity = json.dumps(bot.__dict__)
+        objects = [(f"{workspace_path}/bot-latest", entity)]
+        if self.historical_data_enabled:
+            objects.append((f"{workspace_path}/bot-{bot.installed_at}", entity))
+        return objects
+
+    def save(self, installation: Installation):
+        e_id = installation.enterprise_id or "none"
+        t_id = installation.team_id or "none"
+        u_id = installation.user_id or "none"
+        workspace_path = f"{self.client_id}/{e_id}-{t_id}"
+        entity = json.dumps(installation.__dict__)
+        objects = self._bot_objects(installation.to_bot()) + [
+            (f"{workspace_path}/installer-latest", entity),
+            (f"{workspace_path}/installer-{u_id}-latest", entity),
+        ]
+        if self.historical_data_enabled:
+            history_version = str(installation.installed_at)
+            objects += [
+                (f"{workspace_path}/installer-{history_version}", entity),
+                (f"{workspace_path}/installer-{u_id}-{history_version}", entity),
+            ]
+        self._put_objects(objects)
+
+    def save_bot(self, bot: Bot):
+        self._put_objects(self._bot_objects(bot))
+
+    # Returns None only when the bot does not exist;
+    # the other errors (e.g., S3 outages) are raised so that nobody caches them as "not installed"
+    def find_bot(
+        self,
+        *,
+        enterprise_id: Optional[str],
+        team_id: Optional[str],
+        is_enterprise_install: Optional[bool] = False,
+    ) -> Optional[Bot]:
+        t_id = "none" if is_enterprise_install else team_id or "none"
+        key = f"{self.client_id}/{enterprise_id or 'none'}-{t_id}/bot-latest"
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        except Exception as e:
+            if is_not_found_error(e):
+                self.logger.debug(f"No bot installation data found ({key})")
+                return None
+            raise
+        self.logger.debug(f"S3 get_object response: {response}")
+        return Bot(**json.loads(response["Body"].read().decode("utf-8")))
+
+    # Loads the user's installation and the latest bot at the same time
+    def find_installation(
+        self,
+        *,
+        enterprise_id: Optional[str],
+        team_id: Optional[str],
+        user_id: Optional[str] = None,
+        is_enterprise_install: Optional[bool] = False,
+    ) -> Optional[Installation]:
+        if user_id is None:
+            return super().find_installation(
+                enterprise_id=enterprise_id,
+                team_id=team_id,
+                is_enterprise_install=is_enterprise_install,
+            )
+        t_id = "none" if is_enterprise_install else team_id or "none"
+        key = f"{self.client_id}/{enterprise_id or 'none'}-{t_id}/installer-{user_id}-latest"
+
+        def find_user_installation() -> Optional[Installation]:
+            try:
+                response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+                self.logger.debug(f"S3 get_object response: {response}")
+                return Installation(**json.loads(response["Body"].read().decode("utf-8")))
+            except Exception as e:
+                self.logger.warning(f"Failed to find an installation data ({key}): {e}")
+                return None
+
+        def find_latest_bot() -> Optional[Bot]:
+            try:
+                return self.find_bot(
+                    enterprise_id=enterprise_id,
+                    team_id=team_id,
+                    is_enterprise_install=is_enterprise_install,
+                )
+            except Exception as e:
+                self.logger.warning(f"Failed to find bot installation data: {e}")
+                return None
+
+        installation, bot = self.io.run_all([find_user_installation, find_latest_bot])
+        if installation is not None and bot is not None and installation.bot_token != bot.bot_token:
+            installation.bot_id = bot.bot_id
+            installation.bot_user_id = bot.bot_user_id
+            installation.bot_token = bot.bot_token
+            installation.bot_scopes = bot.bot_scopes
+            installation.bot_refresh_token = bot.bot_refresh_token
+            installation.bot_token_expires_at = bot.bot_token_expires_at
+        return installation
+
+
+# Deletes the consumed state in the background;
+# the OAuth flow goes on to the token exchange without waiting for the deletion
+class ConcurrentS3OAuthStateStore(AmazonS3OAuthStateStore):
+    def __init__(self, *, io: ConcurrentS3IO = s3_io, **kwargs):
+        super().__init__(**kwargs)
+        self.io = io
+
+    def _delete(self, state: str):
+        try:
+            response = self.s3_client.delete_object(Bucket=self.bucket_name, Key=state)
+            self.logger.debug(f"S3 delete_object response: {response}")
+        except Exception as e:
+            self.logger.warning(f"Failed to delete the state: {state} - {e}")
+
+    def consume(self, state: str) -> bool:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=state)
+            self.logger.debug(f"S3 get_object response: {response}")
+            created = float(response["Body"].read().decode("utf-8"))
+        except Exception as e:
+            self.logger.warning(f"Failed to find any persistent data for state: {state} - {e}")
+            return False
+        self.io.run_later(lambda: self._delete(state))
+        return time.time() < created + self.expiration_seconds
+
+
+# Also caches what has been saved, so that the first request
+# after an installation does not need to load it again
+class WriteThroughInstallationStore(CacheableInstallationStore):
+    def save(self, installation: Installation):
+        self.underlying.save(installation)
+        e_id = installation.enterprise_id or ""
+        t_id = "" if installation.is_enterprise_install else installation.team_id or ""
+        if installation.bot_token is not None:
+            self.cached_bots[f"{e_id}-{t_id}"] = installation.to_bot()
+        self.cached_installations[f"{e_id}-{t_id}-{installation.user_id or ''}"] = installation
+        self.cached_installations[f"{e_id}-{t_id}-"] = installation
+
+    def save_bot(self, bot: Bot):
+        self.underlying.save_bot(bot)
+        e_id = bot.enterprise_id or ""
+        t_id = "" if bot.is_enterprise_install else bot.team_id or ""
+        if bot.bot_token is not None:
+            self.cached_bots[f"{e_id}-{t_id}"] = bot
+
+
+# Keeps a connection per thread instead of opening the database file for every query.
+# WAL mode lets the requests read the installations while another thread is saving one.
+class SQLiteConnectionMixin:
+    database: str
+    logger: logging.Logger
+
+    def _init_connections(self, create_indexes: List[str]):
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._create_indexes = create_indexes
+
+    def init(self):
+        with self._init_lock:
+            if self.init_called:
+                return
+            super().init()
+            conn = sqlite3.connect(database=self.database)
+            try:
+                conn.execute("pragma journal_mode=wal;")
+                for statement in self._create_indexes:
+                    conn.execute(statement)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def connect(self) -> sqlite3.Connection:
+        if not self.init_called:
+            self.init()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(database=self.database, timeout=10)
+            # Durable enough with WAL; only the last transactions can be lost on power failure
+            conn.execute("pragma synchronous=normal;")
+            self._local.conn = conn
+        return conn
+
+
+class SQLiteInstallationStore(SQLiteConnectionMixin, SQLite3InstallationStore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._init_connections(
+            [
+                # slack_installations_idx has user_id before installed_at,
+                # so the latest installation of a workspace needs this one
+                """
+                create index if not exists slack_installations_latest_idx
+                on slack_installations (client_id, enterprise_id, team_id, installed_at);
+                """,
+            ]
+        )
+
+
+class SQLiteOAuthStateStore(SQLiteConnectionMixin, SQLite3OAuthStateStore):
+    def __init__(
+        self,
+        *,
+        cleanup_interval_seconds: float = 60,
+        cleanup_batch_size: int = 1000,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.cleanup_interval_seconds = cleanup_interval_seconds
+        self.cleanup_batch_size = cleanup_batch_size
+        self._last_cleanup = 0.0
+        self._init_connections(
+            [
+                "create index if not exists oauth_states_state_idx on oauth_states (state);",
+                "create index if not exists oauth_states_expire_at_idx on oauth_states (expire_at);",
+            ]
+        )
+
+    # Deletes the expired states in small transactions not to block the other writers
+    def delete_expired_states(self) -> int:
+        deleted = 0
+        with self.connect() as conn:
+            while True:
+                cur = conn.execute(
+                    """
+                    delete from oauth_states where id in (
+                        select id from oauth_states where expire_at <= ? limit ?
+                    );
+                    """,
+                    [time.time(), self.cleanup_batch_size],
+                )
+                conn.commit()
+                deleted += cur.rowcount
+                if cur.rowcount < self.cleanup_batch_size:
+                    break
+        if deleted > 0:
+            self.logger.debug(f"Deleted {deleted} expired states (database: {self.database})")
+        return deleted
+
+    def issue(self, *args, **kwargs) -> str:
+        state = super().issue(*args, **kwargs)
+        now = time.time()
+        if now - self._last_cleanup >= self.cleanup_interval_seconds:
+            self._last_cleanup = now
+            try:
+                self.delete_expired_states()
+            except Exception as e:
+                self.logger.warning(f"Failed to delete the expired states: {e}")
+        return state
+
+    # A single statement finds and deletes the state
+    def consume(self, state: str) -> bool:
+        try:
+            with self.connect() as conn:
+                cur = conn.execute(
+                    "delete from oauth_states where state = ? and expire_at > ?;",
+                    [state, time.time()],
+                )
+                conn.commit()
+                return cur.rowcount > 0
+        except Exception as e:
+            self.logger.warning(f"Failed to find any persistent data for state: {state} - {e}")
+            return False
@@ -0,0 +1,185 @@
+import re
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from slack_bolt import Ack, App, BoltRequest, BoltResponse
+from slack_bolt.middleware import Middleware
+
+# (kind, action_id / callback_id / event type / command)
+RoutingKey = Tuple[str, Optional[str]]
+
+action_types = [
+    "interactive_message",
+    "dialog_submission",
+    "dialog_cancellation",
+    "workflow_step_edit",
+]
+
+
+# Returns the key that the built-in matchers of app.action, app.view, etc. check
+def to_routing_key(body: dict) -> Optional[RoutingKey]:
+    payload_type = body.get("type")
+    if payload_type == "block_actions":
+        actions = body.get("actions") or [{}]
+        return "action", actions[0].get("action_id")
+    if payload_type in action_types:
+        return "action", body.get("callback_id")
+    if payload_type == "block_suggestion":
+        return "options", body.get("action_id")
+    if payload_type == "dialog_suggestion":
+        return "options", body.get("callback_id")
+    if payload_type in ["view_submission", "view_closed"]:
+        # app.view("callback_id") matches only view_submission
+        kind = "view" if payload_type == "view_submission" else "view_closed"
+        return kind, (body.get("view") or {}).get("callback_id")
+    if payload_type in ["shortcut", "message_action"]:
+        return "shortcut", body.get("callback_id")
+    if payload_type == "event_callback":
+        return "event", (body.get("event") or {}).get("type")
+    if "command" in body:
+        return "command", body.get("command")
+    return None
+
+
+current_routing_key: ContextVar[Optional[RoutingKey]] = ContextVar("routing_key", default=None)
+
+
+# The app's listener list, which iterates only the listeners that can match the current
+# request. Listeners registered with a str or a regex are indexed by the key; the others
+# (e.g., dict constraints, app.message) are always checked. Bolt still runs the matchers of
+# the candidates in the registration order, so the routing works the same as before.
+class ListenerIndex(list):
+    def __init__(self, listeners: Iterable = (), *, max_cached_keys: int = 10000):
+        super().__init__(listeners)
+        self.max_cached_keys = max_cached_keys
+        self._exact: Dict[RoutingKey, List[int]] = {}
+        self._patterns: Dict[str, List[Tuple[re.Pattern, int]]] = {}
+        self._unindexed: List[int] = list(range(len(self)))
+        self._cache: Dict[RoutingKey, tuple] = {}
+
+    def append(self, listener):
+        super().append(listener)
+        self._unindexed.append(len(self) - 1)
+        self._cache.clear()
+
+    # Moves the last registered listener to the index; returns True if it has been indexed
+    def index_last(self, kind: str, constraints) -> bool:
+        position = len(self) - 1
+        if isinstance(constraints, str):
+            self._exact.setdefault((kind, constraints), []).append(position)
+        elif isinstance(constraints, re.Pattern):
+            self._patterns.setdefault(kind, []).append((constraints, position))
+        else:
+            return False
+        self._unindexed.remove(position)
+        self._cache.clear()
+        return True
+
+    def candidates(self, key: RoutingKey) -> tuple:
+        found = self._cache.get(key)
+        if found is None:
+            kind, value = key
+            positions = set(self._unindexed)
+            positions.update(self._exact.get(key, []))
+            if value is not None:
+                for pattern, position in self._patterns.get(kind, []):
+                    if pattern.search(value) is not None:
+                        positions.add(position)
+            found = tuple(self[p] for p in sorted(positions))
+            if len(self._cache) >= self.max_cached_keys:
+                self._cache.clear()
+            self._cache[key] = found
+        return found
+
+    def __iter__(self):
+        key = current_routing_key.get()
+        if key is None:
+            return super().__iter__()
+        return iter(self.candidates(key))
+
+
+def just_ack(ack: Ack):
+    ack()
+
+
+# Shared by IndexedApp and AsyncIndexedApp
+class ListenerIndexMixin:
+    listener_index: ListenerIndex
+    ack_only_function: Callable
+    ack_only_listeners: Set[object]
+
+    # The first listener for the request only acknowledges it
+    def is_ack_only(self) -> bool:
+        key = current_routing_key.get()
+        if key is None:
+            return False
+        candidates = self.listener_index.candidates(key)
+        return len(candidates) > 0 and candidates[0] in self.ack_only_listeners
+
+    def _indexed(self, kind: str, constraints, matchers, middleware, register: Callable):
+        def register_and_index(*args, **kwargs):
+            value = register(*args, **kwargs)
+            # The listeners registered in App's constructor are not indexed
+            index: Optional[ListenerIndex] = getattr(self, "listener_index", None)
+            if index is not None and index.index_last(kind, constraints):
+                functions = list(args) or [kwargs.get("ack")] + list(kwargs.get("lazy") or [])
+                if not matchers and not middleware and functions == [self.ack_only_function]:
+                    self.ack_only_listeners.add(index[-1])
+            return value
+
+        return register_and_index
+
+    def action(self, constraints, matchers=None, middleware=None):
+        register = super().action(constraints, matchers, middleware)
+        return self._indexed("action", constraints, matchers, middleware, register)
+
+    def view(self, constraints, matchers=None, middleware=None):
+        register = super().view(constraints, matchers, middleware)
+        return self._indexed("view", constraints, matchers, middleware, register)
+
+    def shortcut(self, constraints, matchers=None, middleware=None):
+        register = super().shortcut(constraints, matchers, middleware)
+        return self._indexed("shortcut", constraints, matchers, middleware, register)
+
+    def options(self, constraints, matchers=None, middleware=None):
+        register = super().options(constraints, matchers, middleware)
+        return self._indexed("options", constraints, matchers, middleware, register)
+
+    def event(self, event, matchers=None, middleware=None):
+        register = super().event(event, matchers, middleware)
+        return self._indexed("event", event, matchers, middleware, register)
+
+    def command(self, command, matchers=None, middleware=None):
+        register = super().command(command, matchers, middleware)
+        return self._indexed("command", command, matchers, middleware, register)
+
+
+# Runs right after the request verification; the requests only to be acknowledged
+# skip the authorization and the global middleware
+class AckOnlyMiddleware(Middleware):
+    def __init__(self, app: ListenerIndexMixin):
+        self.app = app
+
+    def process(self, *, req: BoltRequest, resp: BoltResponse, next: Callable[[], BoltResponse]):
+        if self.app.is_ack_only():
+            return BoltResponse(status=200, body="")
+        return next()
+
+
+class IndexedApp(ListenerIndexMixin, App):
+    ack_only_function = staticmethod(just_ack)
+
+    def __init__(self, **kwargs):
+        self.ack_only_listeners = set()
+        kwargs.setdefault("before_authorize", AckOnlyMiddleware(self))
+        super().__init__(**kwargs)
+        self._listeners = self.listener_index = ListenerIndex(self._listeners)
+
+    # In a copy of the context, so that the context variables that the middleware set
+    # (e.g., the user's language) don't leak into the next request on this thread
+    def dispatch(self, req: BoltRequest) -> BoltResponse:
+        return copy_context().run(self._dispatch, req)
+
+    def _dispatch(self, req: BoltRequest) -> BoltResponse:
+        current_routing_key.set(to_routing_key(req.body))
+        return super().dispatch(req)
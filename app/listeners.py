@@ -2,10 +2,15 @@ import re
 
 from slack_bolt import App
 
+from app.i18n import set_user_lang
+from app.installation_metadata import installation_metadata_cache
+from app.listener_index import just_ack
+from app.onboarding_fanout import onboarding_fanout
 from app.onboarding import (
     message_multi_users_select,
     message_multi_users_select_lazy,
 )
+from app.web_api_scheduler import use_web_api_scheduler
 from app.tutorials import (
     tutorial_page_transition,
     tutorial_page_transition_lazy,
@@ -34,7 +39,13 @@ from app.tutorials import (
 
 
 def register_listeners(app: App):
-    app.action("link_button")(lambda ack: ack())
+    installation_metadata_cache.installation_store = app.installation_store
+    onboarding_fanout.installation_store = app.installation_store
+
+    app.use(use_web_api_scheduler)
+    app.use(set_user_lang)
+
+    app.action("link_button")(just_ack)
 
     # ----------------------------------------------
     # message
@@ -86,4 +97,4 @@ def register_listeners(app: App):
     )
 
     app.options("external-data-source-example")(external_data_source_handler)
-    app.action("external-data-source-example")(lambda ack: ack())
+    app.action("external-data-source-example")(just_ack)
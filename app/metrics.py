@@ -0,0 +1,392 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from slack_bolt import App, BoltRequest
+from slack_bolt.lazy_listener import LazyListenerRunner
+
+# Latency histograms in milliseconds:
+#   listener_ack_latency  - from the start of the request to the acknowledgement (listener, status)
+#   lazy_listener_latency - from the start of a lazy listener to its completion (listener)
+#   web_api_latency       - a Web API call in a listener (method, error)
+#   web_api_queue_latency - the wait for the rate limits before a Web API call (method)
+#   web_api_retry_after   - Retry-After of the rate limited responses; the count is the number of 429s (method)
+# and the count of the Web API calls waiting ahead when a call is made (web_api_queue_depth)
+metric_units = {
+    "listener_ack_latency": "Milliseconds",
+    "lazy_listener_latency": "Milliseconds",
+    "web_api_latency": "Milliseconds",
+    "web_api_queue_latency": "Milliseconds",
+    "web_api_retry_after": "Milliseconds",
+    "web_api_queue_depth": "Count",
+}
+
+
+# A log-linear histogram like HdrHistogram: each power of two is split into
+# sub_buckets linear buckets, so a value is kept with about 1.5% error (sub_buckets: 32)
+# in a few hundred counters at most, from microseconds to minutes
+class Histogram:
+    def __init__(self, sub_buckets: int = 32):
+        self.sub_buckets = sub_buckets
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def bucket_index(self, value: float) -> int:
+        mantissa, exponent = math.frexp(max(value, 0.001))
+        return exponent * self.sub_buckets + int((mantissa - 0.5) * 2 * self.sub_buckets)
+
+    def bucket_value(self, index: int) -> float:
+        exponent, sub_bucket = divmod(index, self.sub_buckets)
+        return math.ldexp(0.5 + (sub_bucket + 0.5) / (2 * self.sub_buckets), exponent)
+
+    def record(self, value: float):
+        index = self.bucket_index(value)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.sum += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    # (representative value, count) in ascending order
+    def buckets(self) -> List[Tuple[float, int]]:
+        with self._lock:
+            counts = sorted(self.counts.items())
+        return [(self.bucket_value(i), c) for i, c in counts]
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "counts": dict(self.counts),
+                "count": self.count,
+                "sum": self.sum,
+                "min": self.min,
+                "max": self.max,
+            }
+
+    def merge(self, data: dict):
+        with self._lock:
+            for index, count in data["counts"].items():
+                self.counts[int(index)] = self.counts.get(int(index), 0) + count
+            self.count += data["count"]
+            self.sum += data["sum"]
+            self.min = min(self.min, data["min"])
+            self.max = max(self.max, data["max"])
+
+    def percentile(self, p: float) -> float:
+        buckets = self.buckets()
+        threshold = p / 100 * sum(c for _, c in buckets)
+        seen = 0
+        for value, count in buckets:
+            seen += count
+            if seen >= threshold:
+                return min(value, self.max)
+        return 0.0
+
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms: Dict[MetricKey, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        histogram.record(value)
+
+    def snapshot(self) -> Dict[MetricKey, Histogram]:
+        with self._lock:
+            return dict(self.histograms)
+
+    # Returns the recorded histograms and starts new ones
+    def drain(self) -> Dict[MetricKey, Histogram]:
+        with self._lock:
+            histograms = self.histograms
+            self.histograms = {}
+        return histograms
+
+
+metrics = Metrics()
+
+
+# The representative value of a bucket is in [n, n + 1) for a small count n,
+# so the counts are reported as integers
+def to_reported_value(name: str, value: float) -> float:
+    if metric_units.get(name) == "Count":
+        return math.floor(value)
+    return round(value, 3)
+
+
+# --------------------------------------------
+# CloudWatch Embedded Metric Format
+# https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/CloudWatch_Embedded_Metric_Format_Specification.html
+# --------------------------------------------
+
+emf_max_values = 100  # per metric in a document
+
+
+def to_emf_documents(histograms: Dict[MetricKey, Histogram], namespace: str) -> Iterable[dict]:
+    timestamp = int(time.time() * 1000)
+    for (name, labels), histogram in histograms.items():
+        buckets = histogram.buckets()
+        dimensions = [k for k, _ in labels]
+        for start in range(0, len(buckets), emf_max_values):
+            chunk = buckets[start : start + emf_max_values]
+            document = {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": namespace,
+                            "Dimensions": [dimensions],
+                            "Metrics": [{"Name": name, "Unit": metric_units.get(name, "None")}],
+                        }
+                    ],
+                },
+                name: {
+                    "Values": [to_reported_value(name, v) for v, _ in chunk],
+                    "Counts": [c for _, c in chunk],
+                    "Count": sum(c for _, c in chunk),
+                    "Sum": round(
+                        histogram.sum if len(buckets) <= emf_max_values else sum(v * c for v, c in chunk),
+                        3,
+                    ),
+                    "Min": round(histogram.min, 3),
+                    "Max": round(histogram.max, 3),
+                },
+            }
+            document.update(labels)
+            yield document
+
+
+# Writes the metrics recorded since the last call to stdout, which Lambda sends to CloudWatch Logs
+def flush_emf(write: Callable[[str], object] = sys.stdout.write):
+    histograms = metrics.drain()
+    if len(histograms) == 0:
+        return
+    namespace = os.environ.get("SLACK_METRICS_NAMESPACE") or "SlackLearningApp"
+    lines = [json.dumps(d, separators=(",", ":")) for d in to_emf_documents(histograms, namespace)]
+    write("\n".join(lines) + "\n")
+
+
+# --------------------------------------------
+# Prometheus text format
+# --------------------------------------------
+
+prometheus_buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 30]  # seconds
+prometheus_count_buckets = [0, 1, 2, 5, 10, 20, 50, 100, 200]
+
+
+def to_prometheus_text(histograms: Optional[Dict[MetricKey, Histogram]] = None) -> str:
+    if histograms is None:
+        histograms = metrics.snapshot()
+    lines = []
+    previous_name = None
+    for (name, labels), histogram in sorted(histograms.items()):
+        is_count = metric_units.get(name) == "Count"
+        metric = f"slack_{name}" if is_count else f"slack_{name}_seconds"
+        scale = 1 if is_count else 1000
+        if name != previous_name:
+            lines.append(f"# TYPE {metric} histogram")
+            previous_name = name
+        label_text = ",".join(f'{k}="{escape_label(v)}"' for k, v in labels)
+        separator = "," if label_text else ""
+        buckets = histogram.buckets()
+        for le in prometheus_count_buckets if is_count else prometheus_buckets:
+            count = sum(c for v, c in buckets if to_reported_value(name, v) / scale <= le)
+            lines.append(f'{metric}_bucket{{{label_text}{separator}le="{le}"}} {count}')
+        lines.append(f'{metric}_bucket{{{label_text}{separator}le="+Inf"}} {histogram.count}')
+        lines.append(f"{metric}_sum{{{label_text}}} {histogram.sum / scale}")
+        lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# gunicorn runs several worker processes and /metrics is served by one of them,
+# so each worker saves its histograms to a shared directory and /metrics merges all the files.
+# The files of the exited workers are kept so that the counts never go back.
+class WorkerMetricsFiles:
+    def __init__(self, directory: str, save_interval_seconds: float = 5):
+        self.directory = directory
+        self.save_interval_seconds = save_interval_seconds
+        self.saved_at = 0.0
+        self._pid: Optional[int] = None
+        self._path: Optional[str] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def save(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self.saved_at < self.save_interval_seconds:
+            # Saves the latest numbers later even if no more requests come
+            with self._lock:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.save_interval_seconds, self._save_later)
+                    self._timer.daemon = True
+                    self._timer.start()
+            return
+        with self._lock:
+            self.saved_at = now
+            if self._pid != os.getpid():  # forked
+                self._pid = os.getpid()
+                self._path = os.path.join(self.directory, f"{self._pid}-{time.time_ns()}.json")
+            data = [[n, labels, h.to_dict()] for (n, labels), h in metrics.snapshot().items()]
+            temp_path = f"{self._path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(temp_path, self._path)
+
+    def _save_later(self):
+        with self._lock:
+            self._timer = None
+        self.save(force=True)
+
+    def load_all(self) -> Dict[MetricKey, Histogram]:
+        self.save(force=True)
+        histograms: Dict[MetricKey, Histogram] = {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, labels, histogram in data:
+                key = (name, tuple(tuple(label) for label in labels))
+                histograms.setdefault(key, Histogram()).merge(histogram)
+        return histograms
+
+
+# Set by gunicorn.conf.py
+worker_metrics_dir = os.environ.get("SLACK_METRICS_DIR")
+worker_metrics_files = WorkerMetricsFiles(worker_metrics_dir) if worker_metrics_dir else None
+
+
+def collect_prometheus_text() -> str:
+    if worker_metrics_files is None:
+        return to_prometheus_text()
+    return to_prometheus_text(worker_metrics_files.load_all())
+
+
+# --------------------------------------------
+# Bolt integration
+# --------------------------------------------
+
+# Holds ("ack", listener name) or ("lazy", lazy listener name) of the request being dispatched.
+# The app dispatches each request in a copy of this context (app/listener_index.py),
+# so handle_with_metrics sets a list and the listener runner fills it.
+current_listener: ContextVar[Optional[List[Tuple[str, str]]]] = ContextVar(
+    "current_listener", default=None
+)
+
+
+def set_current_listener(kind: str, name: str):
+    holder = current_listener.get()
+    if holder is not None:
+        holder[:] = [(kind, name)]
+
+
+# Runs the app's listener runner, remembering which listener handles the request
+class MetricsListenerRunner:
+    def __init__(self, runner):
+        self.__dict__["runner"] = runner
+        self.lazy_listener_runner = runner.lazy_listener_runner
+
+    def __getattr__(self, name: str):
+        return getattr(self.runner, name)
+
+    # The adapters (e.g., AWS Lambda) replace the lazy listener runner after the app is created
+    def __setattr__(self, name: str, value):
+        if name == "lazy_listener_runner" and not isinstance(value, MetricsLazyListenerRunner):
+            value = MetricsLazyListenerRunner(value)
+        setattr(self.runner, name, value)
+
+    def run(self, request: BoltRequest, response, listener_name: str, listener, *args, **kwargs):
+        if request.lazy_function_name:
+            set_current_listener("lazy", request.lazy_function_name)
+        elif not request.lazy_only:
+            set_current_listener("ack", listener_name)
+        return self.runner.run(request, response, listener_name, listener, *args, **kwargs)
+
+
+class MetricsLazyListenerRunner(LazyListenerRunner):
+    def __init__(self, runner: LazyListenerRunner):
+        self.runner = runner
+        self.logger = runner.logger
+
+    def start(self, function: Callable[..., None], request: BoltRequest) -> None:
+        executor = getattr(self.runner, "executor", None)
+        if executor is None:
+            # e.g., AWS Lambda runs the lazy listener in another invocation (measured by handle_with_metrics)
+            self.runner.start(function, request)
+            return
+        started = time.perf_counter()
+
+        def run():
+            try:
+                self.runner.run(function, request)
+            finally:
+                elapsed = (time.perf_counter() - started) * 1000
+                metrics.observe("lazy_listener_latency", elapsed, listener=function.__name__)
+
+        executor.submit(run)
+
+    def run(self, function: Callable[..., None], request: BoltRequest) -> None:
+        self.runner.run(function, request)
+
+
+def instrument_app(app: App):
+    app._listener_runner = MetricsListenerRunner(app.listener_runner)
+
+
+# AWS Lambda: dict, Flask: Response, Bolt: BoltResponse
+def to_status(response) -> str:
+    if isinstance(response, dict):
+        return str(response.get("statusCode"))
+    return str(getattr(response, "status_code", None) or getattr(response, "status", None))
+
+
+# Runs an adapter's handle method and records how long the request took
+#   flask: handle_with_metrics(handler.handle, request)
+#   AWS Lambda: handle_with_metrics(slack_handler.handle, event, context)
+#   benchmarks: handle_with_metrics(app.dispatch, bolt_request)
+def handle_with_metrics(handle: Callable, *args):
+    listener: List[Tuple[str, str]] = []
+    token = current_listener.set(listener)
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = handle(*args)
+        status = to_status(response)
+        return response
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        kind, name = listener[0] if listener else ("ack", "none")
+        if kind == "lazy":
+            metrics.observe("lazy_listener_latency", elapsed, listener=name)
+        else:
+            metrics.observe("listener_ack_latency", elapsed, listener=name, status=status)
+        current_listener.reset(token)
+        if worker_metrics_files is not None:
+            worker_metrics_files.save()
@@ -1,28 +1,38 @@
+import functools
+import json
 import logging
 import os
-from typing import List, Optional
+import re
+from html import escape as html_escape
+from typing import List, Optional, Tuple
 
 from slack_bolt import BoltResponse, Respond, Ack
 from slack_bolt.oauth.callback_options import SuccessArgs, FailureArgs
-from slack_sdk.errors import SlackApiError
-
-lang = os.environ.get("SLACK_LANGUAGE")
 
+from app.authorization_cache import invalidate_authorization
+from app.block_kit import compact_blocks
+from app.i18n import (
+    current_lang,
+    fixed_lang,
+    i18n,
+    language,
+    to_lang,
+    with_user_lang,
+)
+from app.installation_metadata import InstallationMetadata, installation_metadata_cache
+from app.onboarding_fanout import onboarding_fanout
 
-def i18n(default: str, ja: str):
-    if lang == "ja":
-        return ja
-    return default
+install_path = os.environ["SLACK_LAMBDA_PATH"]
 
 
-install_path = os.environ["SLACK_LAMBDA_PATH"]
-installation_message_text = i18n(
-    ":wave: Thank you for installing this app! Let's learn the Slack Platform features step by step.",
-    ":wave: インストールありがとうございます！このアプリを使って Slack プラットフォームの機能を一緒に学んでいきましょう！",
-)
+def build_installation_message_text() -> str:
+    return i18n(
+        ":wave: Thank you for installing this app! Let's learn the Slack Platform features step by step.",
+        ":wave: インストールありがとうございます！このアプリを使って Slack プラットフォームの機能を一緒に学んでいきましょう！",
+    )
 
 
-def build_installation_message_blocks(app_id: str, user_id: str) -> List[dict]:
+def build_raw_installation_message_blocks(app_id: str, user_id: str) -> List[dict]:
     return [
         {
             "type": "header",
@@ -185,36 +195,85 @@ https://github.com/seratch/slack_learning_app_ja
     ]
 
 
-def render_success_page(
-    app_id: str,
-    team_id: Optional[str],
-    is_enterprise_install: Optional[bool] = None,
-    enterprise_url: Optional[str] = None,
-) -> str:
-    if (
-        is_enterprise_install is True
-        and enterprise_url is not None
-        and app_id is not None
-    ):
-        url = f"{enterprise_url}manage/organization/apps/profile/{app_id}/workspaces/add"
-    elif team_id is None or app_id is None:
-        url = "slack://open"
-    else:
-        url = f"slack://app?team={team_id}&id={app_id}"
-    main = i18n(
-        f"""
+# The message blocks are compacted and serialized once per language with these slots,
+# and only the slots are filled for each message
+app_id_slot = "{{app_id}}"
+user_id_slot = "{{user_id}}"
+slot_pattern = re.compile("(" + re.escape(app_id_slot) + "|" + re.escape(user_id_slot) + ")")
+
+
+@functools.lru_cache(maxsize=None)
+def load_installation_message_template(lang: str) -> Tuple[List[str], List[str]]:
+    with language(lang):
+        blocks = compact_blocks(build_raw_installation_message_blocks(app_id_slot, user_id_slot))
+    parts = slot_pattern.split(json.dumps(blocks, ensure_ascii=False))
+    # the fixed segments and the slots between them
+    return parts[0::2], parts[1::2]
+
+
+def build_installation_message_blocks_json(app_id: str, user_id: str) -> str:
+    segments, slots = load_installation_message_template(current_lang())
+    values = {
+        app_id_slot: json.dumps(app_id)[1:-1],
+        user_id_slot: json.dumps(user_id)[1:-1],
+    }
+    result = [segments[0]]
+    for slot, segment in zip(slots, segments[1:]):
+        result.append(values[slot])
+        result.append(segment)
+    return "".join(result)
+
+
+def build_installation_message_blocks(app_id: str, user_id: str) -> List[dict]:
+    return json.loads(build_installation_message_blocks_json(app_id, user_id))
+
+
+# The HTML pages are split into the fixed segments once per language,
+# with their encoded sizes, so that a response only escapes and encodes the slot values
+class PageTemplate:
+    def __init__(self, html: str, slots: List[str]):
+        pattern = re.compile("(" + "|".join(re.escape(s) for s in slots) + ")")
+        parts = pattern.split(html)
+        # the odd positions are replaced with the values
+        self.parts: List[Optional[str]] = [p if i % 2 == 0 else None for i, p in enumerate(parts)]
+        self.slot_positions = [(i, slots.index(p)) for i, p in enumerate(parts) if i % 2 == 1]
+        self.slot_counts = [parts[1::2].count(s) for s in slots]
+        self.segments_size = sum(len(p.encode("utf-8")) for p in parts[0::2])
+
+    # Returns the HTML and its size in bytes
+    def render(self, *values: str) -> Tuple[str, int]:
+        escaped = [html_escape(v) for v in values]
+        parts = self.parts.copy()
+        for position, slot_index in self.slot_positions:
+            parts[position] = escaped[slot_index]
+        size = self.segments_size
+        for value, count in zip(escaped, self.slot_counts):
+            size += count * (len(value) if value.isascii() else len(value.encode("utf-8")))
+        return "".join(parts), size
+
+
+url_slot = "{{url}}"
+install_path_slot = "{{install_path}}"
+reason_slot = "{{reason}}"
+
+
+@functools.lru_cache(maxsize=None)
+def load_success_page_template(lang: str) -> PageTemplate:
+    with language(lang):
+        main = i18n(
+            f"""
 <h2>Thank you!</h2>
-<p>Redirecting to the Slack App... click <a href="{url}">here</a></p>
+<p>Redirecting to the Slack App... click <a href="{url_slot}">here</a></p>
 """,
-        f"""
+            f"""
 <h2>インストールありがとうございます！</h2>
-<p>Slack クライアントアプリに移動します... 遷移しない場合は<a href="{url}">こちら</a>をクリックしてください。</p>
+<p>Slack クライアントアプリに移動します... 遷移しない場合は<a href="{url_slot}">こちら</a>をクリックしてください。</p>
 """,
-    )
-    return f"""
+        )
+    html = f"""
 <html>
 <head>
-<meta http-equiv="refresh" content="0; URL={url}">
+<meta http-equiv="refresh" content="0; URL={url_slot}">
 <style>
 body {{
   padding: 10px 15px;
@@ -228,20 +287,23 @@ body {{
 </body>
 </html>
 """
+    return PageTemplate(html, [url_slot])
 
 
-def render_failure_page(install_path: str, reason: str) -> str:
-    main = i18n(
-        f"""
+@functools.lru_cache(maxsize=None)
+def load_failure_page_template(lang: str) -> PageTemplate:
+    with language(lang):
+        main = i18n(
+            f"""
 <h2>Oops, Something Went Wrong!</h2>
-<p>Please try again from <a href="{install_path}">here</a> or contact the app owner (reason: {reason})</p>
+<p>Please try again from <a href="{install_path_slot}">here</a> or contact the app owner (reason: {reason_slot})</p>
 """,
-        f"""
+            f"""
 <h2>エラーが発生しました</h2>
-<p><a href="{install_path}">こちら</a>からやり直すか、このアプリの管理者にお問い合わせください。 (エラー: {reason})</p>
+<p><a href="{install_path_slot}">こちら</a>からやり直すか、このアプリの管理者にお問い合わせください。 (エラー: {reason_slot})</p>
 """,
-    )
-    return f"""
+        )
+    html = f"""
 <html>
 <head>
 <style>
@@ -257,68 +319,124 @@ body {{
 </body>
 </html>
 """
+    return PageTemplate(html, [install_path_slot, reason_slot])
+
+
+def build_success_page_url(
+    app_id: str,
+    team_id: Optional[str],
+    is_enterprise_install: Optional[bool] = None,
+    enterprise_url: Optional[str] = None,
+) -> str:
+    if (
+        is_enterprise_install is True
+        and enterprise_url is not None
+        and app_id is not None
+    ):
+        return f"{enterprise_url}manage/organization/apps/profile/{app_id}/workspaces/add"
+    elif team_id is None or app_id is None:
+        return "slack://open"
+    else:
+        return f"slack://app?team={team_id}&id={app_id}"
+
+
+def render_success_page_with_size(
+    app_id: str,
+    team_id: Optional[str],
+    is_enterprise_install: Optional[bool] = None,
+    enterprise_url: Optional[str] = None,
+) -> Tuple[str, int]:
+    url = build_success_page_url(app_id, team_id, is_enterprise_install, enterprise_url)
+    return load_success_page_template(current_lang()).render(url)
+
+
+def render_failure_page_with_size(install_path: str, reason: str) -> Tuple[str, int]:
+    return load_failure_page_template(current_lang()).render(install_path, reason)
+
+
+def render_success_page(
+    app_id: str,
+    team_id: Optional[str],
+    is_enterprise_install: Optional[bool] = None,
+    enterprise_url: Optional[str] = None,
+) -> str:
+    return render_success_page_with_size(
+        app_id, team_id, is_enterprise_install, enterprise_url
+    )[0]
+
+
+def render_failure_page(install_path: str, reason: str) -> str:
+    return render_failure_page_with_size(install_path, reason)[0]
+
+
+def build_html_response(
+    status: int, html: str, content_length: Optional[int] = None
+) -> BoltResponse:
+    if content_length is None:
+        content_length = len(html.encode("utf-8"))
+    return BoltResponse(
+        status=status,
+        headers={
+            "Content-Type": "text/html; charset=utf-8",
+            "Content-Length": content_length,
+        },
+        body=html,
+    )
+
 
 logger = logging.getLogger(__name__)
 
 
+# The OAuth pages are in the browser's language
+def to_page_lang(request) -> str:
+    accept_language = request.headers.get("accept-language", [None])[0]
+    return fixed_lang or to_lang(accept_language)
+
+
 def install_completion(args: SuccessArgs):
     installation = args.installation
-    client = args.request.context.client
+    installation_metadata_cache.save(
+        enterprise_id=installation.enterprise_id,
+        team_id=installation.team_id,
+        metadata=InstallationMetadata(
+            app_id=installation.app_id,
+            bot_user_id=installation.bot_user_id,
+        ),
+    )
+    # The other containers may have cached that the app is not installed
+    invalidate_authorization(
+        installation.enterprise_id,
+        installation.team_id,
+        installation.is_enterprise_install,
+    )
+    # The welcome DMs are sent in the background to return the page immediately;
+    # the job also resolves the installer's language with users.info
     try:
-        try:
-            client.chat_postMessage(
-                token=installation.bot_token,
-                channel=installation.user_id,
-                text=installation_message_text,
-                blocks=build_installation_message_blocks(
-                    installation.app_id, installation.user_id
-                ),
-            )
-        except Exception as e:
-            logger.exception(f"Failed to post a welcome message: {e}")
+        onboarding_fanout.start(installation)
+    except Exception as e:
+        logger.exception(f"Failed to start sending the welcome messages: {e}")
 
-        html = render_success_page(
+    with language(to_page_lang(args.request)):
+        html, size = render_success_page_with_size(
             app_id=installation.app_id,
             team_id=installation.team_id,
             is_enterprise_install=installation.is_enterprise_install,
             enterprise_url=installation.enterprise_url,
         )
-        return BoltResponse(
-            status=200,
-            headers={
-                "Content-Type": "text/html; charset=utf-8",
-                "Content-Length": len(bytes(html, "utf-8")),
-            },
-            body=html,
-        )
-    except SlackApiError as e:
-        html = render_failure_page(install_path, e.response["error"])
-        return BoltResponse(
-            status=500,
-            headers={
-                "Content-Type": "text/html; charset=utf-8",
-                "Content-Length": len(bytes(html, "utf-8")),
-            },
-            body=html,
-        )
+    return build_html_response(200, html, size)
 
 
 def install_failure(args: FailureArgs):
-    html = render_failure_page(install_path, args.reason)
-    return BoltResponse(
-        status=args.suggested_status_code,
-        headers={
-            "Content-Type": "text/html; charset=utf-8",
-            "Content-Length": len(bytes(html, "utf-8")),
-        },
-        body=html,
-    )
+    with language(to_page_lang(args.request)):
+        html, size = render_failure_page_with_size(install_path, args.reason)
+    return build_html_response(args.suggested_status_code, html, size)
 
 
 def message_multi_users_select(ack: Ack):
     ack()
 
 
+@with_user_lang
 def message_multi_users_select_lazy(action: dict, respond: Respond):
     users = ", ".join([f"<@{u}>" for u in action["selected_users"]])
     respond(
@@ -0,0 +1,414 @@
+import json
+import logging
+import os
+import threading
+import time
+from logging import Logger
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from app.executors import ContextCopyingThreadPoolExecutor
+from app.i18n import language, resolve_lang, to_lang
+from app.web_api_scheduler import ScheduledWebClient, web_api_scheduler
+
+
+# The progress of the welcome DMs for an installation.
+# Bot tokens are never saved here; they are loaded from the installation store.
+class OnboardingCheckpoint:
+    def __init__(
+        self,
+        *,
+        enterprise_id: Optional[str],
+        team_id: Optional[str],
+        is_enterprise_install: bool,
+        app_id: str,
+        installer_user_id: str,
+        installer_lang: Optional[str] = None,
+        started_at: Optional[float] = None,
+        installer_notified: bool = False,
+        team_ids: Optional[List[str]] = None,
+        team_index: int = 0,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        sent: int = 0,
+        done: bool = False,
+    ):
+        self.enterprise_id = enterprise_id
+        self.team_id = team_id
+        self.is_enterprise_install = is_enterprise_install
+        self.app_id = app_id
+        self.installer_user_id = installer_user_id
+        # Resolved by the job (users.info) when it's not known yet
+        self.installer_lang = installer_lang
+        self.started_at = started_at if started_at is not None else time.time()
+        self.installer_notified = installer_notified
+        # The workspaces of an org-wide installation, which are fetched when starting
+        self.team_ids = team_ids
+        self.team_index = team_index
+        # The users.list page in progress and the number of the members already handled
+        self.cursor = cursor
+        self.offset = offset
+        self.sent = sent
+        self.done = done
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    @staticmethod
+    def from_dict(data: dict) -> "OnboardingCheckpoint":
+        return OnboardingCheckpoint(**data)
+
+
+def _to_key(enterprise_id: Optional[str], team_id: Optional[str]) -> str:
+    none = "none"
+    return f"onboarding/{enterprise_id or none}-{team_id or none}"
+
+
+# The finished jobs are kept for a day (to skip the members on a reinstall) and then deleted
+class InMemoryOnboardingCheckpointStore:
+    def __init__(self, *, finished_ttl_seconds: float = 86400):
+        self.finished_ttl_seconds = finished_ttl_seconds
+        # key -> (checkpoint, expiration time of a finished job)
+        self._checkpoints: Dict[str, Tuple[dict, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def save(self, checkpoint):
+        key = _to_key(checkpoint.enterprise_id, checkpoint.team_id)
+        now = time.time()
+        expires_at = now + self.finished_ttl_seconds if checkpoint.done else None
+        with self._lock:
+            for expired in [
+                k for k, (_, e) in self._checkpoints.items() if e is not None and e <= now
+            ]:
+                del self._checkpoints[expired]
+            self._checkpoints[key] = (checkpoint.to_dict(), expires_at)
+
+    def find(self, *, enterprise_id, team_id):
+        with self._lock:
+            data, expires_at = self._checkpoints.get(
+                _to_key(enterprise_id, team_id), (None, None)
+            )
+        if data is None or (expires_at is not None and expires_at <= time.time()):
+            return None
+        return OnboardingCheckpoint.from_dict(data)
+
+
+class FileOnboardingCheckpointStore:
+    def __init__(
+        self,
+        *,
+        base_dir: str = str(Path.home()) + "/.slack-learning-app-onboarding",
+        logger: Logger = logging.getLogger(__name__),
+    ):
+        self.base_dir = base_dir
+        self.logger = logger
+
+    def save(self, checkpoint):
+        key = _to_key(checkpoint.enterprise_id, checkpoint.team_id)
+        path = Path(f"{self.base_dir}/{key}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(checkpoint.to_dict()))
+
+    def find(self, *, enterprise_id, team_id):
+        path = Path(f"{self.base_dir}/{_to_key(enterprise_id, team_id)}")
+        try:
+            return OnboardingCheckpoint.from_dict(json.loads(path.read_text()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Failed to load the onboarding checkpoint ({path}): {e}")
+            return None
+
+
+class AmazonS3OnboardingCheckpointStore:
+    def __init__(
+        self,
+        *,
+        s3_client,
+        bucket_name: str,
+        logger: Logger = logging.getLogger(__name__),
+    ):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.logger = logger
+
+    def save(self, checkpoint):
+        response = self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Body=json.dumps(checkpoint.to_dict()),
+            Key=_to_key(checkpoint.enterprise_id, checkpoint.team_id),
+        )
+        self.logger.debug(f"S3 put_object response: {response}")
+
+    def find(self, *, enterprise_id, team_id):
+        key = _to_key(enterprise_id, team_id)
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            body = response["Body"].read().decode("utf-8")
+            return OnboardingCheckpoint.from_dict(json.loads(body))
+        except Exception as e:
+            self.logger.debug(f"Failed to find the onboarding checkpoint ({key}): {e}")
+            return None
+
+
+OnboardingCheckpointStore = Union[
+    InMemoryOnboardingCheckpointStore,
+    FileOnboardingCheckpointStore,
+    AmazonS3OnboardingCheckpointStore,
+]
+
+
+def build_onboarding_checkpoint_store() -> OnboardingCheckpointStore:
+    bucket_name = os.environ.get("SLACK_ONBOARDING_S3_BUCKET_NAME")
+    if bucket_name:
+        from app.boto3_clients import LazyBoto3Client
+
+        return AmazonS3OnboardingCheckpointStore(
+            s3_client=LazyBoto3Client("s3"), bucket_name=bucket_name
+        )
+    base_dir = os.environ.get("SLACK_ONBOARDING_DIR")
+    if base_dir:
+        return FileOnboardingCheckpointStore(base_dir=base_dir)
+    return InMemoryOnboardingCheckpointStore()
+
+
+# Yields the cursor of each page and the members in it
+def iterate_user_pages(
+    client: WebClient, cursor: Optional[str] = None, page_size: int = 200
+) -> Iterator[Tuple[Optional[str], List[dict]]]:
+    while True:
+        response = client.users_list(cursor=cursor, limit=page_size, include_locale=True)
+        yield cursor, response.get("members", [])
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return
+
+
+def fetch_team_ids(client: WebClient) -> List[str]:
+    team_ids, cursor = [], None
+    while True:
+        response = client.auth_teams_list(cursor=cursor, limit=100)
+        team_ids += [t["id"] for t in response.get("teams", [])]
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return team_ids
+
+
+def is_onboarding_target(member: dict, checkpoint: OnboardingCheckpoint) -> bool:
+    if (
+        member.get("deleted")
+        or member.get("is_bot")
+        or member.get("id") in ["USLACKBOT", checkpoint.installer_user_id]
+    ):
+        return False
+    # A member of several workspaces receives the DM only in the first one
+    member_teams = (member.get("enterprise_user") or {}).get("teams") or []
+    earlier_teams = checkpoint.team_ids[: checkpoint.team_index]
+    return not any(t in earlier_teams for t in member_teams)
+
+
+# Sends the welcome DM to the installer and, for org-wide installations,
+# to all the members of the workspaces in the org in the background
+class OnboardingFanout:
+    def __init__(
+        self,
+        *,
+        checkpoint_store: OnboardingCheckpointStore,
+        batch_size: int = 20,
+        # Stops this much earlier than the deadline to save the checkpoint
+        deadline_margin_seconds: float = 10,
+        logger: Logger = logging.getLogger(__name__),
+    ):
+        self.checkpoint_store = checkpoint_store
+        self.batch_size = batch_size
+        self.deadline_margin_seconds = deadline_margin_seconds
+        self.logger = logger
+        # register_listeners sets the app's installation store
+        self.installation_store = None
+        self.executor = ContextCopyingThreadPoolExecutor(max_workers=2)
+        # lambda_app.py replaces this to continue in another Lambda invocation
+        self.dispatch: Callable[[OnboardingCheckpoint, Optional[str]], None] = (
+            self.run_in_background
+        )
+
+    def start(self, installation, installer_lang: Optional[str] = None):
+        checkpoint = OnboardingCheckpoint(
+            enterprise_id=installation.enterprise_id,
+            team_id=installation.team_id,
+            is_enterprise_install=installation.is_enterprise_install is True,
+            app_id=installation.app_id,
+            installer_user_id=installation.user_id,
+            installer_lang=installer_lang,
+        )
+        self.dispatch(checkpoint, installation.bot_token)
+
+    def run_in_background(self, checkpoint: OnboardingCheckpoint, token: Optional[str]):
+        self.executor.submit(self.run, checkpoint, token=token)
+
+    def _find_bot_token(self, checkpoint: OnboardingCheckpoint) -> Optional[str]:
+        bot = self.installation_store.find_bot(
+            enterprise_id=checkpoint.enterprise_id,
+            team_id=checkpoint.team_id,
+            is_enterprise_install=checkpoint.is_enterprise_install,
+        )
+        return bot.bot_token if bot is not None else None
+
+    def _post_welcome_message(
+        self, client: WebClient, checkpoint: OnboardingCheckpoint, user_id: str, lang: str
+    ) -> bool:
+        from app.onboarding import (
+            build_installation_message_blocks_json,
+            build_installation_message_text,
+        )
+
+        with language(lang):
+            text = build_installation_message_text()
+            blocks = build_installation_message_blocks_json(checkpoint.app_id, user_id)
+        try:
+            # The pre-serialized blocks are sent as-is in a form-encoded request
+            client.api_call(
+                "chat.postMessage",
+                data={"channel": user_id, "text": text, "blocks": blocks},
+            )
+            return True
+        except SlackApiError as e:
+            self.logger.warning(f"Failed to post a welcome message to {user_id}: {e}")
+            return False
+
+    # Returns the checkpoint, which is not done when it stopped at the deadline (epoch seconds)
+    def run(
+        self,
+        checkpoint: OnboardingCheckpoint,
+        *,
+        token: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> OnboardingCheckpoint:
+        try:
+            stored = self.checkpoint_store.find(
+                enterprise_id=checkpoint.enterprise_id, team_id=checkpoint.team_id
+            )
+            if stored is not None and stored.started_at == checkpoint.started_at:
+                checkpoint = stored  # resumes the same job
+            elif stored is not None and checkpoint.is_enterprise_install:
+                # Reinstalled; continues from the earlier job's progress (or skips the members
+                # when it's done) so that nobody receives the DM twice.
+                # The earlier job stops when it finds this job's checkpoint.
+                checkpoint.team_ids = stored.team_ids
+                checkpoint.team_index = stored.team_index
+                checkpoint.cursor, checkpoint.offset = stored.cursor, stored.offset
+                checkpoint.sent = stored.sent
+                checkpoint.done = stored.done
+            if token is None:
+                token = self._find_bot_token(checkpoint)
+            if token is None:
+                self.logger.warning("Failed to send the welcome messages (no bot token)")
+                checkpoint.done = True
+                return checkpoint
+
+            client = ScheduledWebClient(web_api_scheduler, token=token, team_id=checkpoint.team_id)
+            if not checkpoint.installer_notified:
+                if checkpoint.installer_lang is None:
+                    checkpoint.installer_lang = resolve_lang(client, checkpoint.installer_user_id)
+                self._post_welcome_message(
+                    client, checkpoint, checkpoint.installer_user_id, checkpoint.installer_lang
+                )
+                checkpoint.installer_notified = True
+                self.checkpoint_store.save(checkpoint)
+            if not checkpoint.is_enterprise_install or checkpoint.done:
+                checkpoint.done = True
+                self.checkpoint_store.save(checkpoint)
+                return checkpoint
+
+            if checkpoint.team_ids is None:
+                checkpoint.team_ids = fetch_team_ids(client)
+            if not self._send_to_members(token, checkpoint, deadline):
+                self.logger.info("Stopped sending the welcome messages (a newer job continues)")
+                checkpoint.done = True  # without saving; the checkpoint is the newer job's
+                return checkpoint
+            self.checkpoint_store.save(checkpoint)
+            self.logger.info(
+                f"Sent {checkpoint.sent} welcome messages "
+                f"({'completed' if checkpoint.done else 'will be resumed'})"
+            )
+            return checkpoint
+        except Exception as e:
+            self.logger.exception(f"Failed to send the welcome messages: {e}")
+            self.checkpoint_store.save(checkpoint)
+            raise
+
+    def _is_superseded(self, checkpoint: OnboardingCheckpoint) -> bool:
+        stored = self.checkpoint_store.find(
+            enterprise_id=checkpoint.enterprise_id, team_id=checkpoint.team_id
+        )
+        return stored is not None and stored.started_at != checkpoint.started_at
+
+    # Returns False when a job for a reinstallation has taken over
+    def _send_to_members(
+        self, token: str, checkpoint: OnboardingCheckpoint, deadline: Optional[float]
+    ) -> bool:
+        while checkpoint.team_index < len(checkpoint.team_ids):
+            team_id = checkpoint.team_ids[checkpoint.team_index]
+            # users.list requires team_id for org-wide tokens
+            client = ScheduledWebClient(web_api_scheduler, token=token, team_id=team_id)
+            for cursor, members in iterate_user_pages(client, checkpoint.cursor):
+                if cursor != checkpoint.cursor:
+                    checkpoint.cursor, checkpoint.offset = cursor, 0
+                    self.checkpoint_store.save(checkpoint)
+                while checkpoint.offset < len(members):
+                    if deadline is not None and (
+                        time.time() + self.deadline_margin_seconds > deadline
+                    ):
+                        return True
+                    if self._is_superseded(checkpoint):
+                        return False
+                    batch = members[checkpoint.offset : checkpoint.offset + self.batch_size]
+                    for member in batch:
+                        if is_onboarding_target(member, checkpoint):
+                            lang = to_lang(member.get("locale"))
+                            if self._post_welcome_message(client, checkpoint, member["id"], lang):
+                                checkpoint.sent += 1
+                    checkpoint.offset += len(batch)
+                    self.checkpoint_store.save(checkpoint)
+            checkpoint.team_index += 1
+            checkpoint.cursor, checkpoint.offset = None, 0
+        checkpoint.done = True
+        return True
+
+
+onboarding_fanout = OnboardingFanout(checkpoint_store=build_onboarding_checkpoint_store())
+
+
+# --------------------------------------------
+# AWS Lambda
+# --------------------------------------------
+
+lambda_event_key = "onboarding_fanout"
+
+_lambda_client = None
+
+
+# Continues in a new asynchronous invocation of the same function
+# so that the fan-out is not frozen after the OAuth response is returned.
+# The checkpoint in the payload is used when the store does not have a newer one.
+def invoke_lambda_onboarding_fanout(checkpoint: OnboardingCheckpoint, token: Optional[str]):
+    global _lambda_client
+    if _lambda_client is None:
+        from app.boto3_clients import LazyBoto3Client
+
+        _lambda_client = LazyBoto3Client("lambda")
+    _lambda_client.invoke(
+        FunctionName=os.environ["AWS_LAMBDA_FUNCTION_NAME"],
+        InvocationType="Event",
+        Payload=json.dumps({lambda_event_key: checkpoint.to_dict()}),
+    )
+
+
+def handle_lambda_onboarding_fanout(event: dict, context) -> None:
+    checkpoint = OnboardingCheckpoint.from_dict(event[lambda_event_key])
+    deadline = time.time() + context.get_remaining_time_in_millis() / 1000
+    checkpoint = onboarding_fanout.run(checkpoint, deadline=deadline)
+    if not checkpoint.done:
+        invoke_lambda_onboarding_fanout(checkpoint, None)
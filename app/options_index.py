@@ -0,0 +1,327 @@
+import csv
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Slack displays up to 100 options
+max_options = 100
+
+emoji_pattern = re.compile(r":[a-z0-9_+\-]+:")
+
+
+katakana_to_hiragana = {c: c - 0x60 for c in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+# NFKC folds full-width alphanumerics and half-width katakana,
+# then katakana is folded into hiragana so that "ﾈｺ", "ネコ" and "ねこ" match each other
+def normalize(text: str) -> str:
+    if ":" in text:
+        text = emoji_pattern.sub(" ", text)
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(text.translate(katakana_to_hiragana).split())
+
+
+def _ngrams(text: str) -> set:
+    grams = set()
+    for word in text.split(" "):
+        grams.update(word)
+        grams.update(word[i : i + 2] for i in range(len(word) - 1))
+    return grams
+
+
+def _sorted_keys(keys: List[Tuple[str, int]]) -> Tuple[List[str], array]:
+    keys.sort()
+    return [k[0] for k in keys], array("i", [k[1] for k in keys])
+
+
+class OptionsIndex:
+    def __init__(self, options: Iterable[Tuple[str, str]]):
+        self.values: List[str] = []
+        self.texts: List[str] = []
+        self.normalized_texts: List[str] = []
+        # characters and bigrams -> option ids in the source order
+        self.ngrams: Dict[str, array] = defaultdict(lambda: array("i"))
+        texts: List[Tuple[str, int]] = []
+        words: List[Tuple[str, int]] = []
+
+        for i, (value, text) in enumerate(options):
+            normalized = normalize(text)
+            self.values.append(value)
+            self.texts.append(text)
+            self.normalized_texts.append(normalized)
+            texts.append((normalized, i))
+            for word in normalized.split(" ")[1:]:
+                words.append((word, i))
+            for gram in _ngrams(normalized):
+                self.ngrams[gram].append(i)
+
+        self.ngrams = dict(self.ngrams)
+        self.text_keys, self.text_ids = _sorted_keys(texts)
+        self.word_keys, self.word_ids = _sorted_keys(words)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @staticmethod
+    def _find_prefix_matches(
+        keys: List[str], ids: array, keyword: str, found: dict, limit: int
+    ):
+        i = bisect_left(keys, keyword)
+        while i < len(keys) and len(found) < limit and keys[i].startswith(keyword):
+            found.setdefault(ids[i], None)
+            i += 1
+
+    def _find_substring_matches(self, keyword: str, found: dict, limit: int):
+        postings = [self.ngrams.get(gram) for gram in _ngrams(keyword)]
+        if len(postings) == 0 or any(p is None for p in postings):
+            return
+        # The shortest posting list has all the candidates
+        for i in min(postings, key=len):
+            if len(found) >= limit:
+                break
+            if i not in found and keyword in self.normalized_texts[i]:
+                found[i] = None
+
+    # Texts starting with the keyword come first, then the ones with a word
+    # starting with it (alphabetical order), and then the ones containing it
+    def find_ids(self, keyword: str, limit: int = max_options) -> List[int]:
+        found: Dict[int, None] = {}  # as an ordered set
+        if len(keyword) == 0:
+            return list(range(min(limit, len(self.values))))
+        self._find_prefix_matches(self.text_keys, self.text_ids, keyword, found, limit)
+        self._find_prefix_matches(self.word_keys, self.word_ids, keyword, found, limit)
+        self._find_substring_matches(keyword, found, limit)
+        return list(found)
+
+    def _rank(self, i: int, keyword: str) -> Optional[tuple]:
+        text = self.normalized_texts[i]
+        if text.startswith(keyword):
+            return 0, text, i
+        words = [w for w in text.split(" ")[1:] if w.startswith(keyword)]
+        if len(words) > 0:
+            return 1, min(words), i
+        if keyword in text:
+            return 2, "", i
+        return None
+
+    # Same as find_ids but only checks the candidates, which must have all the matches
+    # (e.g., the complete result for a prefix of the keyword)
+    def narrow_ids(
+        self, candidates: Sequence[int], keyword: str, limit: int = max_options
+    ) -> List[int]:
+        ranks = [self._rank(i, keyword) for i in candidates]
+        return [r[2] for r in sorted(r for r in ranks if r is not None)[:limit]]
+
+    def to_options(self, ids: Iterable[int]) -> List[dict]:
+        return [
+            {"text": {"type": "plain_text", "text": self.texts[i]}, "value": self.values[i]}
+            for i in ids
+        ]
+
+    def search(self, keyword: Optional[str], limit: int = max_options) -> List[dict]:
+        return self.to_options(self.find_ids(normalize(keyword or ""), limit))
+
+
+# The index of the (value, text) pairs that a subclass's load() yields
+# in the order of the default ranking
+class OptionsSource:
+    def __init__(self, *, name: str):
+        self.name = name
+        self._index: Optional[OptionsIndex] = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    # Returns a value that changes when the options are updated
+    def version(self):
+        return None
+
+    # Builds the index; call this at startup as a large source takes seconds
+    def build_index(self) -> OptionsIndex:
+        with self._lock:
+            if self._index is None:
+                self._version = self.version()
+                self._index = OptionsIndex(self.load())
+                logger.info(f"Loaded {len(self._index)} options from {self.name}")
+            return self._index
+
+    # Returns the current index without waiting for the reload of an updated source;
+    # the new index replaces it once it has been built in a background thread
+    def load_index(self) -> OptionsIndex:
+        index = self._index
+        if index is None:
+            return self.build_index()
+        version = self.version()
+        if version != self._version:
+            with self._lock:
+                if self._reloading or version == self._version:
+                    return index
+                self._reloading = True
+            threading.Thread(target=self._reload, args=(version,), daemon=True).start()
+        return index
+
+    def _reload(self, version):
+        try:
+            index = OptionsIndex(self.load())
+            with self._lock:
+                self._index, self._version = index, version
+            logger.info(f"Reloaded {len(index)} options from {self.name}")
+        except Exception as e:
+            # Keeps serving the old options; retried when the source is updated again
+            logger.warning(f"Failed to reload the options from {self.name}: {e}")
+            with self._lock:
+                self._version = version
+        finally:
+            with self._lock:
+                self._reloading = False
+
+
+class FileVersionMixin:
+    path: str
+
+    def version(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+
+# A CSV file with "value" and "text" columns, or a JSONL file with "value" and "text" keys
+class FileOptionsSource(FileVersionMixin, OptionsSource):
+    def __init__(self, *, path: str):
+        super().__init__(name=path)
+        self.path = path
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            if self.path.endswith(".csv"):
+                for row in csv.DictReader(f):
+                    yield row["value"], row["text"]
+            else:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        yield row["value"], row["text"]
+
+
+class SQLiteOptionsSource(FileVersionMixin, OptionsSource):
+    def __init__(self, *, path: str, table_name: str = "options"):
+        super().__init__(name=f"{path}:{table_name}")
+        self.path = path
+        self.table_name = table_name
+
+    def load(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield from conn.execute(
+                f"SELECT value, text FROM {self.table_name} ORDER BY rowid"
+            )
+        finally:
+            conn.close()
+
+
+def build_options_source() -> Optional[OptionsSource]:
+    path = os.environ.get("SLACK_OPTIONS_SOURCE")
+    if not path:
+        return None
+    if path.endswith(".db") or path.endswith(".sqlite"):
+        return SQLiteOptionsSource(path=path)
+    return FileOptionsSource(path=path)
+
+
+class CachedOptions:
+    def __init__(self, *, options: List[dict], ids: Optional[array]):
+        # Shared by requests; never modify the payload
+        self.options = options
+        # All the matching option ids if there are not too many of them
+        self.ids = ids
+
+
+# LRU cache of normalized keyword -> options payload per source.
+# Typeahead sends "c", "ca", "cat", ... so a miss narrows down the cached result of
+# the longest prefix of the keyword instead of searching the whole index again.
+class OptionsResultCache:
+    def __init__(self, *, max_size: int = 1000, max_candidates: int = 200):
+        self.max_size = max_size
+        self.max_candidates = max(max_candidates, max_options)
+        self._entries: "OrderedDict[Tuple[str, str], CachedOptions]" = OrderedDict()
+        self._indexes: Dict[str, OptionsIndex] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.narrowed = 0
+        self.misses = 0
+
+    def invalidate(self, source: str):
+        with self._lock:
+            self._invalidate(source)
+
+    def _invalidate(self, source: str):
+        for key in [k for k in self._entries if k[0] == source]:
+            del self._entries[key]
+        self._indexes.pop(source, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.narrowed + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "narrowed": self.narrowed,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+            }
+
+    def search(self, source: str, index: OptionsIndex, keyword: Optional[str]) -> List[dict]:
+        keyword = normalize(keyword or "")
+        with self._lock:
+            if self._indexes.get(source) is not index:
+                # The source has been reloaded
+                self._invalidate(source)
+                self._indexes[source] = index
+            cached = self._entries.get((source, keyword))
+            if cached is not None:
+                self._entries.move_to_end((source, keyword))
+                self.hits += 1
+                return cached.options
+            candidates = None
+            for length in range(len(keyword) - 1, -1, -1):
+                prefix = self._entries.get((source, keyword[:length]))
+                if prefix is not None and prefix.ids is not None:
+                    candidates = prefix.ids
+                    break
+            if candidates is not None:
+                self.narrowed += 1
+            else:
+                self.misses += 1
+            if (self.hits + self.narrowed + self.misses) % 1000 == 0:
+                logger.debug(
+                    f"options cache: {len(self._entries)}/{self.max_size} entries, "
+                    f"hits: {self.hits}, narrowed: {self.narrowed}, misses: {self.misses}"
+                )
+
+        if candidates is not None:
+            ids = index.narrow_ids(candidates, keyword, self.max_candidates)
+        else:
+            ids = index.find_ids(keyword, self.max_candidates)
+        cached = CachedOptions(
+            options=index.to_options(ids[:max_options]),
+            ids=array("i", ids) if len(ids) < self.max_candidates else None,
+        )
+        with self._lock:
+            if self._indexes.get(source) is index:
+                self._entries[(source, keyword)] = cached
+                self._entries.move_to_end((source, keyword))
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return cached.options
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from logging import Logger
+from pathlib import Path
+from typing import Optional, Union
+
+
+class PublishedView:
+    def __init__(
+        self,
+        *,
+        page: int,
+        content_hash: str,
+        published_at: Optional[float] = None,
+    ):
+        self.page = page
+        self.content_hash = content_hash
+        self.published_at = published_at if published_at is not None else time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "page": self.page,
+            "content_hash": self.content_hash,
+            "published_at": self.published_at,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "PublishedView":
+        return PublishedView(
+            page=data["page"],
+            content_hash=data["content_hash"],
+            published_at=data.get("published_at"),
+        )
+
+
+def _to_key(enterprise_id: Optional[str], team_id: Optional[str], user_id: str) -> str:
+    none = "none"
+    return f"{enterprise_id or none}-{team_id or none}/{user_id}"
+
+
+# Remembers the Home tab page that was last published for each user
+class InMemoryPublishedViewStore:
+    def __init__(self, *, max_size: int = 10000):
+        self.max_size = max_size
+        self._views: "OrderedDict[str, PublishedView]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, *, enterprise_id, team_id, user_id, view):
+        key = _to_key(enterprise_id, team_id, user_id)
+        with self._lock:
+            self._views[key] = view
+            self._views.move_to_end(key)
+            while len(self._views) > self.max_size:
+                self._views.popitem(last=False)
+
+    def find(self, *, enterprise_id, team_id, user_id):
+        key = _to_key(enterprise_id, team_id, user_id)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+            return view
+
+
+# Uses the same key layout as AmazonS3PublishedViewStore,
+# so this works as a local stand-in for the S3 bucket
+class FilePublishedViewStore:
+    def __init__(
+        self,
+        *,
+        base_dir: str = str(Path.home()) + "/.slack-learning-app-published-views",
+        logger: Logger = logging.getLogger(__name__),
+    ):
+        self.base_dir = base_dir
+        self.logger = logger
+
+    def save(self, *, enterprise_id, team_id, user_id, view):
+        path = Path(f"{self.base_dir}/{_to_key(enterprise_id, team_id, user_id)}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(view.to_dict()))
+
+    def find(self, *, enterprise_id, team_id, user_id):
+        path = Path(f"{self.base_dir}/{_to_key(enterprise_id, team_id, user_id)}")
+        try:
+            return PublishedView.from_dict(json.loads(path.read_text()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Failed to load the published view ({path}): {e}")
+            return None
+
+
+class AmazonS3PublishedViewStore:
+    def __init__(
+        self,
+        *,
+        s3_client,
+        bucket_name: str,
+        logger: Logger = logging.getLogger(__name__),
+    ):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.logger = logger
+
+    def save(self, *, enterprise_id, team_id, user_id, view):
+        response = self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Body=json.dumps(view.to_dict()),
+            Key=_to_key(enterprise_id, team_id, user_id),
+        )
+        self.logger.debug(f"S3 put_object response: {response}")
+
+    def find(self, *, enterprise_id, team_id, user_id):
+        key = _to_key(enterprise_id, team_id, user_id)
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            body = response["Body"].read().decode("utf-8")
+            return PublishedView.from_dict(json.loads(body))
+        except Exception as e:
+            # NoSuchKey for the users that have never opened the Home tab
+            self.logger.debug(f"Failed to find the published view ({key}): {e}")
+            return None
+
+
+PublishedViewStore = Union[
+    InMemoryPublishedViewStore, FilePublishedViewStore, AmazonS3PublishedViewStore
+]
+
+
+def build_published_view_store() -> PublishedViewStore:
+    bucket_name = os.environ.get("SLACK_PUBLISHED_VIEW_S3_BUCKET_NAME")
+    if bucket_name:
+        from app.boto3_clients import LazyBoto3Client
+
+        return AmazonS3PublishedViewStore(
+            s3_client=LazyBoto3Client("s3"), bucket_name=bucket_name
+        )
+    base_dir = os.environ.get("SLACK_PUBLISHED_VIEW_DIR")
+    if base_dir:
+        return FilePublishedViewStore(base_dir=base_dir)
+    return InMemoryPublishedViewStore()
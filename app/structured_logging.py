@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import random
+from typing import Dict, Optional
+
+
+# A log message with fields, which is serialized to JSON only when a handler emits it
+#   logger.info(structured("Opening a modal", view=modal))
+class StructuredMessage:
+    def __init__(self, message: str, fields: Dict[str, object]):
+        self.message = message
+        self.fields = fields
+
+    def render(self, max_field_length: Optional[int] = None) -> str:
+        # Each field is serialized once; the ones longer than the limit become truncated strings
+        items = [f'"message":{to_json(self.message)}']
+        for name, value in self.fields.items():
+            text = to_json(value)
+            if max_field_length and len(text) > max_field_length:
+                text = to_json(f"{text[:max_field_length]}...({len(text)} chars)")
+            items.append(f"{to_json(name)}:{text}")
+        return "{" + ",".join(items) + "}"
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+def structured(message: str, **fields) -> StructuredMessage:
+    return StructuredMessage(message, fields)
+
+
+def to_json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+# e.g., "page2_modal_lazy:0.01,print_request:0.1"
+def parse_sample_rates(value: Optional[str]) -> Dict[str, float]:
+    rates = {}
+    for item in (value or "").split(","):
+        name, _, rate = item.strip().partition(":")
+        if name and rate:
+            rates[name] = float(rate)
+    return rates
+
+
+# Drops a part of the logs below WARNING by the function (e.g., listener) that writes them,
+# and caps the size of the structured fields below ERROR.
+# Errors are always written with all the fields.
+class SamplingFilter(logging.Filter):
+    def __init__(self, sample_rates: Dict[str, float], max_field_length: Optional[int]):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.max_field_length = max_field_length
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            rate = self.sample_rates.get(record.funcName)
+            if rate is not None and random.random() >= rate:
+                return False
+        if isinstance(record.msg, StructuredMessage):
+            max_length = self.max_field_length if record.levelno < logging.ERROR else None
+            record.msg = record.msg.render(max_length)
+        return True
+
+
+def configure_logging(default_level: str = "INFO", force: bool = False):
+    level = os.environ.get("SLACK_LOG_LEVEL") or default_level
+    logging.basicConfig(
+        format="%(asctime)s %(message)s", level=level.upper(), force=force
+    )
+    sampling_filter = SamplingFilter(
+        sample_rates=parse_sample_rates(os.environ.get("SLACK_LOG_SAMPLE_RATES")),
+        max_field_length=int(os.environ.get("SLACK_LOG_MAX_FIELD_LENGTH") or 1000),
+    )
+    for handler in logging.getLogger().handlers:
+        # The entry points of this app may call this function more than once
+        for f in [f for f in handler.filters if isinstance(f, SamplingFilter)]:
+            handler.removeFilter(f)
+        handler.addFilter(sampling_filter)
@@ -0,0 +1,309 @@
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from slack_bolt import BoltRequest
+from slack_bolt.adapter.aws_lambda.lazy_listener_runner import LambdaLazyListenerRunner
+
+# Set when the process (e.g., a Lambda container) loads this module, to trace cold starts
+process_started_ns = time.time_ns()
+
+
+class Span:
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        start_ns: Optional[int] = None,
+        attributes: Optional[Dict[str, object]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, name: str, value: object):
+        self.attributes[name] = value
+
+    # W3C Trace Context: https://www.w3.org/TR/trace-context/
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    # A span of OTLP/JSON (https://opentelemetry.io/docs/specs/otlp/#json-protobuf-encoding)
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [to_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def to_otlp_attribute(name: str, value: object) -> dict:
+    if isinstance(value, bool):
+        return {"key": name, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": name, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": name, "value": {"doubleValue": value}}
+    return {"key": name, "value": {"stringValue": str(value)}}
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Dict[str, str]]:
+    parts = (value or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return {"trace_id": parts[1], "span_id": parts[2]}
+
+
+# --------------------------------------------
+# Exporters
+# --------------------------------------------
+
+
+# Appends the spans to a local file as OTLP/JSON lines (one request per line)
+class FileSpanExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        line = json.dumps(to_otlp_request(spans), separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+# Sends the spans to an OpenTelemetry collector's OTLP/HTTP JSON endpoint
+# e.g., http://localhost:4318/v1/traces (benchmarks/trace_collector.py works as a stand-in)
+class OTLPHttpSpanExporter:
+    def __init__(self, endpoint: str, timeout_seconds: float = 1.0):
+        self.endpoint = endpoint
+        self.timeout_seconds = timeout_seconds
+
+    def export(self, spans: List[Span]):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(to_otlp_request(spans)).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+            response.read()
+
+
+SpanExporter = Union[FileSpanExporter, OTLPHttpSpanExporter]
+
+
+def to_otlp_request(spans: List[Span]) -> dict:
+    service_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME") or "slack_learning_app_ja"
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [to_otlp_attribute("service.name", service_name)]},
+                "scopeSpans": [
+                    {"scope": {"name": "app.tracing"}, "spans": [s.to_otlp() for s in spans]}
+                ],
+            }
+        ]
+    }
+
+
+def build_span_exporter() -> Optional[SpanExporter]:
+    endpoint = os.environ.get("SLACK_TRACE_OTLP_ENDPOINT")
+    if endpoint:
+        return OTLPHttpSpanExporter(endpoint)
+    path = os.environ.get("SLACK_TRACE_FILE")
+    if path:
+        return FileSpanExporter(path)
+    return None
+
+
+# --------------------------------------------
+# Tracer
+# --------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+# Keeps the finished spans until flush() so that the export doesn't slow down each Web API call
+class Tracer:
+    def __init__(self, exporter: Optional[SpanExporter]):
+        self.exporter = exporter
+        self._finished: List[Span] = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    # Starts a span under the current one; without a current span, only when root=True
+    # (the spans of background tasks outside any request are not recorded)
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        *,
+        root: bool = False,
+        traceparent: Optional[str] = None,
+        start_ns: Optional[int] = None,
+        **attributes,
+    ) -> Iterator[Optional[Span]]:
+        parent = current_span.get()
+        if not self.enabled or (parent is None and not root):
+            yield None
+            return
+        remote_parent = parse_traceparent(traceparent) if parent is None else None
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        elif remote_parent is not None:
+            trace_id, parent_id = remote_parent["trace_id"], remote_parent["span_id"]
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+        span = Span(name, trace_id, parent_id, start_ns, attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current_span.reset(token)
+            self.finish(span)
+
+    def finish(self, span: Span):
+        span.end_ns = span.end_ns or time.time_ns()
+        with self._lock:
+            self._finished.append(span)
+
+    def flush(self):
+        with self._lock:
+            spans = self._finished
+            self._finished = []
+        if self.exporter is None or len(spans) == 0:
+            return
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            # Tracing never breaks the app
+            logger.warning(f"Failed to export {len(spans)} spans: {e}")
+
+
+tracer = Tracer(build_span_exporter())
+
+
+def current_traceparent() -> Optional[str]:
+    span = current_span.get()
+    return span.traceparent() if span is not None else None
+
+
+# --------------------------------------------
+# boto3
+# --------------------------------------------
+
+
+def _start_boto3_span(model, context: dict, **kwargs):
+    parent = current_span.get()
+    if parent is None:
+        return
+    service = model.service_model.service_name
+    span = Span(f"{service}.{model.name}", parent.trace_id, parent.span_id)
+    span.set_attribute("rpc.service", service)
+    span.set_attribute("rpc.method", model.name)
+    context["trace_span"] = span
+
+
+def _finish_boto3_span(http_response, parsed: dict, context: dict, **kwargs):
+    span: Optional[Span] = context.pop("trace_span", None)
+    if span is None:
+        return
+    status = getattr(http_response, "status_code", None)
+    span.set_attribute("http.status_code", status)
+    error = (parsed or {}).get("Error", {}).get("Code")
+    if error:
+        span.error = error
+    tracer.finish(span)
+
+
+def _fail_boto3_span(exception: Exception, context: dict, **kwargs):
+    span: Optional[Span] = context.pop("trace_span", None)
+    if span is None:
+        return
+    span.error = f"{type(exception).__name__}: {exception}"
+    tracer.finish(span)
+
+
+# Records each call of the boto3 client (e.g., S3 GetObject, Lambda Invoke) as a span
+def trace_boto3_client(client):
+    if not tracer.enabled:
+        return client
+    client.meta.events.register("before-call.*.*", _start_boto3_span)
+    client.meta.events.register("after-call.*.*", _finish_boto3_span)
+    client.meta.events.register("after-call-error.*.*", _fail_boto3_span)
+    return client
+
+
+# --------------------------------------------
+# AWS Lambda
+# --------------------------------------------
+
+cold_start = True
+
+
+def to_span_attributes(**attributes) -> Dict[str, object]:
+    return {k.replace("__", "."): v for k, v in attributes.items() if v is not None}
+
+
+# The root span of an invocation, which continues the trace of the invocation
+# that has started this lazy listener (the traceparent header in the payload)
+@contextmanager
+def trace_lambda_invocation(event: dict, context, name: Optional[str] = None) -> Iterator[Optional[Span]]:
+    global cold_start
+    headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    lazy_function = headers.get("x-slack-bolt-lazy-function-name")
+    if name is None:
+        name = f"lazy {lazy_function}" if lazy_function else "slack request"
+    attributes = to_span_attributes(
+        faas__coldstart=cold_start,
+        faas__invocation_id=getattr(context, "aws_request_id", None),
+        slack__lazy_function=lazy_function,
+    )
+    with tracer.span(name, root=True, traceparent=headers.get("traceparent"), **attributes) as span:
+        if span is not None and cold_start:
+            # From the module import to the first invocation
+            init = Span("lambda init", span.trace_id, span.span_id, start_ns=process_started_ns)
+            init.end_ns = span.start_ns
+            tracer.finish(init)
+        cold_start = False
+        yield span
+
+
+# Starts the lazy listeners in new invocations, passing the trace context in the payload
+class TracingLambdaLazyListenerRunner(LambdaLazyListenerRunner):
+    def start(self, function: Callable[..., None], request: BoltRequest) -> None:
+        with tracer.span("lambda lazy invoke", **{"slack.lazy_function": request.lazy_function_name}):
+            traceparent = current_traceparent()
+            if traceparent is not None:
+                request.context["lambda_request"]["headers"]["traceparent"] = traceparent
+            super().start(function, request)
@@ -1,36 +1,40 @@
 import datetime
+import functools
+import hashlib
 import json
 import os
 from logging import Logger
+from typing import Dict, List, Optional
 
 from slack_bolt import BoltContext, Ack
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
-lang = os.environ.get("SLACK_LANGUAGE")
-
-
-def i18n(default: str, ja: str):
-    if lang == "ja":
-        return ja
-    return default
-
-
-pages = [
-    # --------------------------------------------
-    # page 1
-    # --------------------------------------------
-    [
-        {
-            "type": "header",
-            "text": {"type": "plain_text", "text": i18n("1. Home Tab", "1. ホームタブ")},
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+from app.block_kit import compact_blocks, compacted
+from app.executors import ContextCopyingThreadPoolExecutor
+from app.i18n import current_lang, i18n, language, supported_langs, with_user_lang
+from app.installation_metadata import find_installation_metadata
+from app.options_index import OptionsIndex, OptionsResultCache, build_options_source
+from app.published_views import PublishedView, build_published_view_store
+from app.structured_logging import structured
+
+
+def build_pages() -> List[List[dict]]:
+    return [
+        # --------------------------------------------
+        # page 1
+        # --------------------------------------------
+        [
+            {
+                "type": "header",
+                "text": {"type": "plain_text", "text": i18n("1. Home Tab", "1. ホームタブ")},
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 This page is the Home Tab. In this first tutorial page, you will learn how the home tab is built. Although we use Home tab for displaying tutorial content here, you can use it for showing a list of pending approval requests or building a data dashboard. The <https://my.slack.com/apps/ADZ494LHY|Google Calendar App>'s Home tab is a great example.
 
 The Home Tab is not enabled by default. Go to the Slack App Configuration page, and turn *Features* > *App Home* on.
@@ -46,7 +50,7 @@ You can use <http://api.slack.com/methods/views.publish|*views.publish*> API met
 }
 ```
                 """,
-                    """
+                        """
 このページは「ホームタブ」と呼ばれるものです。最初のチュートリアルでは、このホームタブがどのように作られているかを説明します。ここではチュートリアルの表示に利用していますが、未対応の承認依頼一覧を表示したり、ダッシュボードを構成すると便利です。<https://my.slack.com/apps/ADZ494LHY|Google カレンダーアプリ>のホームタブはとてもよくできていますので、参考にしてみてください。
 
 ホームタブはデフォルトでは有効になっていない機能です。Slack アプリの管理画面の *Features* > *App Home* で有効にしておいてください。
@@ -62,125 +66,125 @@ You can use <http://api.slack.com/methods/views.publish|*views.publish*> API met
 }
 ```
                 """,
-                ),
+                    ),
+                },
             },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 As with the welcome message, you can place <https://api.slack.com/block-kit|*Block Kit*> components in Home tabs.
         """,
-                    """
+                        """
 先ほどのメッセージと同様、ホームタブの中に <https://api.slack.com/block-kit|*Block Kit*> によるボタンやプルダウンを配置することができます。
         """,
-                ),
-            },
-        },
-        {
-            "type": "actions",
-            "elements": [
-                {
-                    "type": "button",
-                    "text": {"type": "plain_text", "text": ":star::star::star:"},
-                    "value": "3",
-                    "action_id": "page1_home_tab_button_3",
-                },
-                {
-                    "type": "button",
-                    "text": {"type": "plain_text", "text": ":star::star:"},
-                    "value": "2",
-                    "action_id": "page1_home_tab_button_2",
-                },
-                {
-                    "type": "button",
-                    "text": {"type": "plain_text", "text": ":star:"},
-                    "value": "1",
-                    "action_id": "page1_home_tab_button_1",
+                    ),
                 },
-                {
-                    "type": "users_select",
-                    "placeholder": {
-                        "type": "plain_text",
-                        "text": i18n("Select a user", "ユーザーを選択"),
+            },
+            {
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": ":star::star::star:"},
+                        "value": "3",
+                        "action_id": "page1_home_tab_button_3",
                     },
-                    "action_id": "page1_home_tab_users_select",
-                },
-            ],
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": ":star::star:"},
+                        "value": "2",
+                        "action_id": "page1_home_tab_button_2",
+                    },
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": ":star:"},
+                        "value": "1",
+                        "action_id": "page1_home_tab_button_1",
+                    },
+                    {
+                        "type": "users_select",
+                        "placeholder": {
+                            "type": "plain_text",
+                            "text": i18n("Select a user", "ユーザーを選択"),
+                        },
+                        "action_id": "page1_home_tab_users_select",
+                    },
+                ],
+            },
+            {"type": "divider"},
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 Using <https://api.slack.com/events-api|*Events API*> is the common way to set up and maintain Home tab content. The <https://api.slack.com/events/app_home_opened|*app_home_opened*> event triggers when an end user access Home Tab. Your app can subscribe the event and update the tab for the user. Actually, the event triggered when you accessed this tab for the first time and this app updated the tab quickly.
 
 It's also possible to update Home tabs at any time regardless of the end users' access. For instance, your app can update tabs as part of midnight batch processes and/or asking end users to manually click buttons to refresh the contents. In this tutorial app, this app never updates unless you click *Previous* or *Next* after the initial loading.
 
 That's all about Home tabs here. Let's go to the next page by clicking the *Next* button.
 """,
-                    """
+                        """
 ホームタブの設定・更新タイミングは <https://api.slack.com/events-api|*Events API*> を使うのが一般的です。ユーザーがアクセスしたときに発生する <https://api.slack.com/events/app_home_opened|*app_home_opened*> というイベントを受け取るように Slack アプリを設定しておき、そのイベントが発生したら、対象ユーザー用のタブを更新します。あなたが先ほどこのタブを開いたとき、実はそのような処理が実行されていたのです。
 
 ユーザーアクセス以外のタイミング以外で更新することもできます。バッチ処理で事前更新しておいたり、手動更新用のボタンを置いたりもできます。このチュートリアルは初回表示以外では *「前へ」* *「次へ」* などのボタンを押したときだけ更新されます。
 
 ホームタブの説明は以上です。下にある *「次へ」* ボタンを押して次のページへ進みましょう。
 """,
-                ),
+                    ),
+                },
             },
-        },
-    ],
-    # --------------------------------------------
-    # page 2
-    # --------------------------------------------
-    [
-        {
-            "type": "header",
-            "text": {"type": "plain_text", "text": i18n("2. Modals", "2. モーダル")},
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+        ],
+        # --------------------------------------------
+        # page 2
+        # --------------------------------------------
+        [
+            {
+                "type": "header",
+                "text": {"type": "plain_text", "text": i18n("2. Modals", "2. モーダル")},
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 Great! The Home tab has been successfully updated. The feature we learn here is Modals, which was already used a lot in the previous page. To enable this feature, go to the Slack App configuration page and turn *Features* > *Interactivity & Shortcuts* > *Interactivity* on and set a valid URL for *Request URL*.
 
 You can open a new modal by clicking the following button. The modal has a few custom validation logics. Try the submission and see how the validations work.
 """,
-                    """
+                        """
 無事、ホームタブが更新されていますね。次に紹介する機能は、前のページで既に使われていた「モーダル」です。モーダルは、アプリ管理画面で *Features* > *Interactivity & Shortcuts* > *Interactivity* を有効にして Request URL を正しく設定するだけで利用することができます。
 
 以下のボタンをクリックするとモーダルが起動します。入力チェックが実装されていますので、送信まで実行してみてください。
 """,
-                ),
+                    ),
+                },
             },
-        },
-        {
-            "type": "actions",
-            "elements": [
-                {
-                    "type": "button",
-                    "text": {
-                        "type": "plain_text",
-                        "text": i18n("Open a modal", "モーダルを起動する"),
+            {
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "button",
+                        "text": {
+                            "type": "plain_text",
+                            "text": i18n("Open a modal", "モーダルを起動する"),
+                        },
+                        "value": "3",
+                        "style": "primary",
+                        "action_id": "page2_modal",
                     },
-                    "value": "3",
-                    "style": "primary",
-                    "action_id": "page2_modal",
-                },
-            ],
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+                ],
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 You can freely implement custom validation rules this way. Check this app's code for further details.
 
 ```
@@ -207,7 +211,7 @@ You should see the exactly same modal there!
 
 Check the <https://api.slack.com/surfaces/modals/using|API document> and <https://api.slack.com/tools/bolt|Bolt document> for furhther information.
 """,
-                    """
+                        """
 入力項目のバリデーションは以下のような形で自由に実装することができます。詳細はこのアプリのソースコードを見てみてください。
 
 ```
@@ -234,63 +238,63 @@ def handle_modals(ack, view):
 
 より詳しく学ぶには、<https://api.slack.com/surfaces/modals/using|ドキュメント（英語）>や <https://api.slack.com/tools/bolt|Bolt のドキュメント>を参照してください。
 """,
-                ),
+                    ),
+                },
             },
-        },
-    ],
-    # --------------------------------------------
-    # page 3
-    # --------------------------------------------
-    [
-        {
-            "type": "header",
-            "text": {
-                "type": "plain_text",
-                "text": i18n("3. External Data Source", "3. 動的なセレクトメニュー"),
+        ],
+        # --------------------------------------------
+        # page 3
+        # --------------------------------------------
+        [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": i18n("3. External Data Source", "3. 動的なセレクトメニュー"),
+                },
             },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 In this page, you'll learn how to use <https://api.slack.com/reference/block-kit/block-elements#external_multi_select|External Data Source based select menus>. This feature enables developers to build dynamic select menus using any data sources. Your app can easily build "search by keyword" functionalities.
 
 As with the modals in the previous page, your app needs to tell Slack the URL to communicate. Go to *Features* > *Interactivity & Shortcuts* > *Interactivity* and set a URL in the *Select Menus* section. Slack will send requests when a user interacts in select menues and expect your app to return the options as `options` in response body.
 
 Here is a simple demo select menu using external data source.
 """,
-                    """
+                        """
 このページでは、<https://api.slack.com/reference/block-kit/block-elements#external_multi_select|動的なセレクトメニュー> について説明します。標準のメニューではなく、カスタムで、かつ、入力キーワードに応じた検索結果のような動的な選択肢を返す機能です。
 
 前のページのモーダルと同様、あらかじめ URL を設定しておきます。 *Features* > *Interactivity & Shortcuts* > *Interactivity* のページの最下部に *Select Menus* というセクションがあり、そこに URL を設定します。ここに Slack からリクエストがきたら、決められた形式で選択肢一覧を `options` として応答します。
 
 以下は実際に動作しているデモのセレクトメニューです。
 """,
-                ),
+                    ),
+                },
             },
-        },
-        {
-            "type": "actions",
-            "elements": [
-                {
-                    "type": "external_select",
-                    "placeholder": {
-                        "type": "plain_text",
-                        "text": i18n("Search by keyword", "キーワードを入力"),
-                    },
-                    "min_query_length": 0,
-                    "action_id": "external-data-source-example",
-                }
-            ],
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+            {
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "external_select",
+                        "placeholder": {
+                            "type": "plain_text",
+                            "text": i18n("Search by keyword", "キーワードを入力"),
+                        },
+                        "min_query_length": 0,
+                        "action_id": "external-data-source-example",
+                    }
+                ],
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 The <https://api.slack.com/block-kit|*Block Kit*> JSON data for realizing can looks as below. You can go with `multi_external_select` type if you want to enable users to choose multiple items.
 
 ```
@@ -324,7 +328,7 @@ As you see, the above code has a static array of options. But needless to say, y
 
 This is a very useful feature for business operations. Make use of it in many situations!
 """,
-                    """
+                        """
 使用する <https://api.slack.com/block-kit|*Block Kit*> の JSON データは以下の様になります。複数選択にしたい場合は `multi_external_select` にするだけです。
 
 ```
@@ -359,72 +363,72 @@ def external_data_source_handler(ack, body):
 
 いろんな場面で使える機能なので、ぜひうまく活用してみてください。
 """,
-                ),
+                    ),
+                },
             },
-        },
-    ],
-    # --------------------------------------------
-    # page 4
-    # --------------------------------------------
-    [
-        {
-            "type": "header",
-            "text": {"type": "plain_text", "text": i18n("4. Shortcuts", "4. ショートカット")},
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+        ],
+        # --------------------------------------------
+        # page 4
+        # --------------------------------------------
+        [
+            {
+                "type": "header",
+                "text": {"type": "plain_text", "text": i18n("4. Shortcuts", "4. ショートカット")},
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 Let's go to a channel and try shortcuts. As a preparation, you will ask this app to create a test channel for it. Once the channel has been created, you can go to the channel by clicking a link on the modal.
 """,
-                    """
+                        """
 このページでは、チャンネルに移動して、ショートカットを実行してみましょう。まずは、準備のためにこのアプリにチャンネルをつくらせます。作成後、リンクをクリックしてそのままチャンネルに移動できます。
 """,
-                ),
+                    ),
+                },
             },
-        },
-        {
-            "type": "actions",
-            "elements": [
-                {
-                    "type": "button",
-                    "text": {
-                        "type": "plain_text",
-                        "text": i18n("Create a test channel", "テスト用チャンネルをつくる"),
+            {
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "button",
+                        "text": {
+                            "type": "plain_text",
+                            "text": i18n("Create a test channel", "テスト用チャンネルをつくる"),
+                        },
+                        "value": "clicked",
+                        "style": "primary",
+                        "action_id": "page4_create_channel",
                     },
-                    "value": "clicked",
-                    "style": "primary",
-                    "action_id": "page4_create_channel",
-                },
-            ],
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+                ],
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 By the way, the modal starting from the above button utilizes a few Web APIs. For channel creation,  it uses <https://api.slack.com/methods/conversations.create|conversations.create> API method. Then, it invites you to the created channel by <https://api.slack.com/methods/conversations.invite|conversations.invite> API method.
 
 Also, this app subscribes <https://api.slack.com/events/channel_created|channel_created> event in <https://api.slack.com/events-api|Events API>. When a channel is created, this app checks if the channel was created by itself and if so, the app sends a welcome message in this channel.
 """,
-                    """
+                        """
 ちなみに、上のボタンからの処理がやっていることを簡単に説明しておきます。チャンネルの作成には <https://api.slack.com/methods/conversations.create|conversations.create> という API を使っています。そして、あなたを <https://api.slack.com/methods/conversations.invite|conversations.invite> API を使って作られたチャンネルに招待しています。
 
 それに加えて <https://api.slack.com/events/channel_created|channel_created> というイベントを <https://api.slack.com/events-api|Events API> を使って購読しています。チャンネルが作成されたら、このアプリ自身が作成したチャンネルであるかをチェックした上でウェルカムメッセージを投稿する、ということを行っています。
 """,
-                ),
+                    ),
+                },
             },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+            {"type": "divider"},
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 Welcome back! As we saw in the channel, there are two types of shortcuts. You can choose a right one depending on the situation.
 
 *Global Shortcuts*
@@ -435,7 +439,7 @@ You can find the list of global shortcuts from the :zap: icon menu in text compo
 
 You can use this type of shortcuts from message menu. If you don't see the one at the three shortcuts, click "More message shortcuts" and find the one you want to use in the whole list.
 """,
-                    """
+                        """
 おかえりなさい。チャンネルで試したように、ショートカットには以下の二種類があります。用途に合わせて使い分けてみてください。
 
 *グローバルショートカット*
@@ -446,27 +450,27 @@ You can use this type of shortcuts from message menu. If you don't see the one a
 
 メッセージのメニューから起動できます。表示されていない場合は「その他のメッセージのショートカット」をクリックして、一覧から検索します。
 """,
-                ),
+                    ),
+                },
             },
-        },
-    ],
-    # --------------------------------------------
-    # page 5
-    # --------------------------------------------
-    [
-        {
-            "type": "header",
-            "text": {
-                "type": "plain_text",
-                "text": i18n("5. Paid Plan Features", "5. 有料プラン向け機能での開発"),
+        ],
+        # --------------------------------------------
+        # page 5
+        # --------------------------------------------
+        [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": i18n("5. Paid Plan Features", "5. 有料プラン向け機能での開発"),
+                },
             },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 In this page, we will learn the features that are available only for paid plan workspaces.
 
 *Steps from Apps*
@@ -493,7 +497,7 @@ Among the Web APIs that are available at <https://api.slack.com/methods|api.slac
 
 On the Enterprise Grid plan, Org Owners can export data using Slack's <https://slack.com/help/articles/360002079527-A-guide-to-Slacks-Discovery-APIs|Discovery API>. 
 """,
-                    """
+                        """
 このページでは有料プランのワークスペースでのみ利用可能な機能を用いた開発についてご紹介します。
 
 *ワークフローのカスタムステップ*
@@ -522,46 +526,46 @@ On the Enterprise Grid plan, Org Owners can export data using Slack's <https://s
 
 <https://slack.com/intl/ja-jp/help/articles/360002079527|Discovery API> は、Slack のお客様が選んだパートナーと Enterprise Grid のオーガナイゼーションをつなぐための API です。この API を有効にすることで、対応したソリューションと連携したり、カスタムのアプリケーションを開発することができます。
 """,
-                ),
+                    ),
+                },
             },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+            {"type": "divider"},
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 Developers acn submit a request to use sandbox environment for Enterprise Grid ready Slack app development.
 
 Refer to the <https://api.slack.com/enterprise/grid/testing|testing guide> for details.
     """,
-                    """
+                        """
 Enterprise Grid に対応した Slack アプリの開発を行う開発者はサンドボックス環境を申請することができます。
 
 <https://api.slack.com/enterprise/grid/testing|こちらのガイド>を参考にしてみてください。
     """,
-                ),
+                    ),
+                },
             },
-        },
-    ],
-    # --------------------------------------------
-    # page 6
-    # --------------------------------------------
-    [
-        {
-            "type": "header",
-            "text": {
-                "type": "plain_text",
-                "text": i18n("6. Further information", "6. インタラクティブなアプリをつくるための情報リソース"),
+        ],
+        # --------------------------------------------
+        # page 6
+        # --------------------------------------------
+        [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": i18n("6. Further information", "6. インタラクティブなアプリをつくるための情報リソース"),
+                },
             },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": i18n(
-                    """
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 Lastly, here are helpful resource to learn further about interactive features in the Slack Platform:
 
 • <https://api.slack.com/|Slack Platform API Ddocuments>
@@ -587,7 +591,7 @@ Join the open developer community: <https://join.slack.com/t/community/shared_in
 
 Thanks a lot for completing this tutorial! Enjoy Slack app development :wave:
         """,
-                    """
+                        """
 最後に、このチュートリアルで紹介したインタラクティブな機能を使ったアプリの開発をさらに深く学んでいくために有益なリソースの一覧を紹介しておきます。
 
 • <https://api.slack.com/|Slack プラットフォームドキュメントのトップページ>
@@ -621,11 +625,18 @@ Thanks a lot for completing this tutorial! Enjoy Slack app development :wave:
 
 Slack プラットフォームの機能を活用して、素晴らしいアプリを開発してください :wave:
         """,
-                ),
+                    ),
+                },
             },
-        },
-    ],
-]
+        ],
+    ]
+
+
+# The pages are built (and compacted) only for the languages actually in use
+@functools.lru_cache(maxsize=None)
+def load_pages(lang: str) -> List[List[dict]]:
+    with language(lang):
+        return compact_blocks(build_pages())
 
 
 # --------------------------------------------
@@ -644,7 +655,7 @@ def build_pager_block(page: int) -> dict:
                 "action_id": "tutorial_page_transition_2",
             }
         ]
-    elif page >= len(pages):
+    elif page >= len(load_pages(current_lang())):
         pager_block_elements = [
             {
                 "type": "button",
@@ -677,49 +688,122 @@ def build_pager_block(page: int) -> dict:
     return {"type": "actions", "elements": pager_block_elements}
 
 
-def tutorial_view(page: int) -> dict:
+jst = datetime.timezone(datetime.timedelta(hours=+9), "JST")
+
+
+def build_tutorial_view_blocks(page: int) -> List[dict]:
+    pages = load_pages(current_lang())
     page_content = []
     if page <= len(pages):
         page_content = pages[page - 1]
-
-    tz = datetime.timezone(datetime.timedelta(hours=+9), "JST")
-    now = datetime.datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
-    blocks = page_content + [
+    return page_content + [
         {"type": "divider"},
         build_pager_block(page),
         {"type": "divider"},
-        {
-            "type": "context",
-            "elements": [
-                {
-                    "type": "plain_text",
-                    "text": i18n(f"Last Updated: {now}, JST", f"最終更新日時: {now}, JST"),
-                }
-            ],
-        },
     ]
-    return {"type": "home", "blocks": blocks}
+
+
+# The blocks except the "Last Updated" context are the same for everyone,
+# so they are built only once per language and shared by all views.publish calls
+@functools.lru_cache(maxsize=None)
+def load_tutorial_view_blocks(lang: str) -> Dict[int, List[dict]]:
+    with language(lang):
+        return {
+            page: build_tutorial_view_blocks(page)
+            for page in range(1, len(load_pages(lang)) + 1)
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def load_tutorial_view_hashes(lang: str) -> Dict[int, str]:
+    return {
+        page: hashlib.sha256(json.dumps(blocks).encode("utf-8")).hexdigest()
+        for page, blocks in load_tutorial_view_blocks(lang).items()
+    }
+
+
+def load_all_tutorial_views():
+    for lang in supported_langs:
+        load_tutorial_view_hashes(lang)
+
+
+published_view_store = build_published_view_store()
+
+
+def tutorial_view(page: int) -> dict:
+    blocks = load_tutorial_view_blocks(current_lang()).get(page)
+    if blocks is None:
+        blocks = build_tutorial_view_blocks(page)
+
+    now = datetime.datetime.now(jst).strftime("%Y-%m-%d %H:%M:%S")
+    last_updated = {
+        "type": "context",
+        "elements": [
+            {
+                "type": "plain_text",
+                "text": i18n(f"Last Updated: {now}, JST", f"最終更新日時: {now}, JST"),
+            }
+        ],
+    }
+    return {"type": "home", "blocks": blocks + [last_updated]}
 
 
 def app_home_opened():
     pass
 
 
+def publish_tutorial_view(context: BoltContext, client: WebClient, page: int):
+    client.views_publish(user_id=context.user_id, view=tutorial_view(page))
+    content_hash = load_tutorial_view_hashes(current_lang()).get(page)
+    if content_hash is not None:
+        published_view_store.save(
+            enterprise_id=context.enterprise_id,
+            team_id=context.team_id,
+            user_id=context.user_id,
+            view=PublishedView(page=page, content_hash=content_hash),
+        )
+
+
+# Returns None when the user already has the latest version of the page
+def find_page_to_publish(
+    event: dict, published: Optional[PublishedView]
+) -> Optional[int]:
+    tutorial_view_hashes = load_tutorial_view_hashes(current_lang())
+    if published is None or published.page not in tutorial_view_hashes:
+        return 1
+    if (
+        event.get("view") is None
+        or published.content_hash != tutorial_view_hashes[published.page]
+    ):
+        # Restore the page the user was reading before
+        return published.page
+    return None
+
+
+@with_user_lang
 def app_home_opened_lazy(event, context: BoltContext, client: WebClient):
-    if event["tab"] == "home":
-        client.views_publish(user_id=context.user_id, view=tutorial_view(1))
+    if event["tab"] != "home":
+        return
+
+    published = published_view_store.find(
+        enterprise_id=context.enterprise_id,
+        team_id=context.team_id,
+        user_id=context.user_id,
+    )
+    page = find_page_to_publish(event, published)
+    if page is not None:
+        publish_tutorial_view(context, client, page)
 
 
 def tutorial_page_transition(ack):
     ack()
 
 
+@with_user_lang
 def tutorial_page_transition_lazy(
     action: dict, context: BoltContext, client: WebClient
 ):
-    client.views_publish(
-        user_id=context.user_id, view=tutorial_view(int(action["value"]))
-    )
+    publish_tutorial_view(context, client, int(action["value"]))
 
 
 # --------------------------------------------
@@ -727,12 +811,8 @@ def tutorial_page_transition_lazy(
 # --------------------------------------------
 
 
-def page1_home_tab_button_click(ack):
-    ack()
-
-
-def page1_home_tab_button_click_lazy(action: dict, body: dict, client: WebClient):
-    num = int(action["value"])
+@compacted
+def build_page1_button_modal(num: int) -> dict:
     message = i18n(
         f"""
 You've got {':star:' * num}!
@@ -783,43 +863,57 @@ Your app receives an associated value ("{num}" in this case) to the clicked butt
 ```
     """,
     )
+    return {
+        "type": "modal",
+        "title": {"type": "plain_text", "text": i18n("Demo App", "デモアプリ")},
+        "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
+        "blocks": [
+            {"type": "section", "text": {"type": "mrkdwn", "text": message}}
+        ],
+    }
+
+
+def page1_home_tab_button_click(ack):
+    ack()
+
+
+@with_user_lang
+def page1_home_tab_button_click_lazy(action: dict, body: dict, client: WebClient):
     client.views_open(
         trigger_id=body["trigger_id"],
-        view={
-            "type": "modal",
-            "title": {"type": "plain_text", "text": i18n("Demo App", "デモアプリ")},
-            "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
-            "blocks": [
-                {"type": "section", "text": {"type": "mrkdwn", "text": message}}
-            ],
-        },
+        view=build_page1_button_modal(int(action["value"])),
     )
 
 
+def build_page1_users_select_modal(selected_user: str) -> dict:
+    return {
+        "type": "modal",
+        "title": {"type": "plain_text", "text": i18n("Demo App", "デモアプリ")},
+        "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        f"You selected <@{selected_user}>!",
+                        f"あなたは <@{selected_user}> を選択しました！",
+                    ),
+                },
+            }
+        ],
+    }
+
+
 def page1_home_tab_users_select(ack):
     ack()
 
 
+@with_user_lang
 def page1_home_tab_users_select_lazy(action, body: dict, client: WebClient):
     client.views_open(
         trigger_id=body["trigger_id"],
-        view={
-            "type": "modal",
-            "title": {"type": "plain_text", "text": i18n("Demo App", "デモアプリ")},
-            "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": i18n(
-                            f"You selected <@{action['selected_user']}>!",
-                            f"あなたは <@{action['selected_user']}> を選択しました！",
-                        ),
-                    },
-                }
-            ],
-        },
+        view=build_page1_users_select_modal(action["selected_user"]),
     )
 
 
@@ -828,12 +922,8 @@ def page1_home_tab_users_select_lazy(action, body: dict, client: WebClient):
 # --------------------------------------------
 
 
-def page2_modal(ack):
-    ack()
-
-
-def page2_modal_lazy(body: dict, client: WebClient, logger: Logger):
-    modal = {
+def build_page2_modal() -> dict:
+    return {
         "type": "modal",
         "callback_id": "page2_modal_submission",
         "title": {
@@ -935,11 +1025,20 @@ def page2_modal_lazy(body: dict, client: WebClient, logger: Logger):
             },
         ],
     }
-    logger.info(json.dumps(modal))
+
+
+def page2_modal(ack):
+    ack()
+
+
+@with_user_lang
+def page2_modal_lazy(body: dict, client: WebClient, logger: Logger):
+    modal = build_page2_modal()
+    logger.info(structured("Opening a modal", view=modal))
     client.views_open(trigger_id=body["trigger_id"], view=modal)
 
 
-def page2_modal_submission(ack: Ack, view: dict):
+def build_page2_modal_submission_response(view: dict) -> dict:
     values = view.get("state", {}).get("values", {})
     title = values.get("title", {}).get("input", {}).get("value")
     assignee = values.get("assignee", {}).get("input", {}).get("selected_user")
@@ -970,11 +1069,11 @@ def page2_modal_submission(ack: Ack, view: dict):
         )
 
     if len(errors) > 0:
-        return ack(response_action="errors", errors=errors)
+        return {"response_action": "errors", "errors": errors}
 
-    ack(
-        response_action="update",
-        view={
+    return {
+        "response_action": "update",
+        "view": {
             "type": "modal",
             "callback_id": "page2_modal_submission_result",
             "title": {"type": "plain_text", "text": i18n("Accepted!", "タスク登録完了")},
@@ -1021,36 +1120,72 @@ def page2_modal_submission(ack: Ack, view: dict):
                 },
             ],
         },
-    )
+    }
+
+
+def page2_modal_submission(ack: Ack, view: dict):
+    ack(**build_page2_modal_submission_response(view))
 
 
 # --------------------------------------------
 # page 3
 # --------------------------------------------
 
-all_options = [
-    {
-        "text": {"type": "plain_text", "text": i18n(":cat: Cat", ":cat: ねこ")},
-        "value": "cat",
-    },
-    {
-        "text": {"type": "plain_text", "text": i18n(":dog: Dog", ":dog: いぬ")},
-        "value": "dog",
-    },
-    {
-        "text": {"type": "plain_text", "text": i18n(":bear: Bear", ":bear: くま")},
-        "value": "bear",
-    },
-]
+
+def build_all_options() -> List[dict]:
+    return [
+        {
+            "text": {"type": "plain_text", "text": i18n(":cat: Cat", ":cat: ねこ")},
+            "value": "cat",
+        },
+        {
+            "text": {"type": "plain_text", "text": i18n(":dog: Dog", ":dog: いぬ")},
+            "value": "dog",
+        },
+        {
+            "text": {"type": "plain_text", "text": i18n(":bear: Bear", ":bear: くま")},
+            "value": "bear",
+        },
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def load_all_options(lang: str) -> List[dict]:
+    with language(lang):
+        return build_all_options()
+
+
+# SLACK_OPTIONS_SOURCE replaces the built-in options with a CSV, JSONL or SQLite file
+options_source = build_options_source()
+
+options_cache = OptionsResultCache(
+    max_size=int(os.environ.get("SLACK_OPTIONS_CACHE_SIZE") or 1000)
+)
+
+
+@functools.lru_cache(maxsize=None)
+def load_options_index(lang: str) -> OptionsIndex:
+    return OptionsIndex((o["value"], o["text"]["text"]) for o in load_all_options(lang))
+
+
+# Called at startup; building a large index in a block_suggestion request would delay the ack
+def load_all_options_indexes():
+    if options_source is not None:
+        options_source.build_index()
+    for lang in supported_langs:
+        load_options_index(lang)
+
+
+def find_options(keyword: Optional[str]) -> List[dict]:
+    if options_source is not None:
+        index = options_source.load_index()
+        return options_cache.search(options_source.name, index, keyword)
+    lang = current_lang()
+    return options_cache.search(f"built-in:{lang}", load_options_index(lang), keyword)
 
 
 def external_data_source_handler(ack: Ack, body: dict):
-    keyword = body.get("value")
-    if keyword is not None and len(keyword) > 0:
-        options = [o for o in all_options if keyword in o["text"]["text"]]
-        ack(options=options)
-    else:
-        ack(options=all_options)
+    ack(options=find_options(body.get("value")))
 
 
 # --------------------------------------------
@@ -1058,14 +1193,8 @@ def external_data_source_handler(ack: Ack, body: dict):
 # --------------------------------------------
 
 
-def page4_create_channel(ack):
-    ack()
-
-
-def page4_create_channel_lazy(
-    body: dict, context: BoltContext, client: WebClient, logger: Logger
-):
-    modal = {
+def build_page4_create_channel_modal(user_id: str) -> dict:
+    return {
         "type": "modal",
         "callback_id": "page4_create_channel_submission",
         "title": {
@@ -1082,8 +1211,8 @@ def page4_create_channel_lazy(
                     "type": "plain_text_input",
                     "action_id": "input",
                     "initial_value": i18n(
-                        f"_learning-app-{context.user_id.lower()}",
-                        f"_学習用チャンネル-{context.user_id.lower()}",
+                        f"_learning-app-{user_id.lower()}",
+                        f"_学習用チャンネル-{user_id.lower()}",
                     ),
                     "placeholder": {
                         "type": "plain_text",
@@ -1095,119 +1224,243 @@ def page4_create_channel_lazy(
             },
         ],
     }
-    logger.info(json.dumps(modal))
+
+
+def page4_create_channel(ack):
+    ack()
+
+
+@with_user_lang
+def page4_create_channel_lazy(
+    body: dict, context: BoltContext, client: WebClient, logger: Logger
+):
+    modal = build_page4_create_channel_modal(context.user_id)
+    logger.info(structured("Opening a modal", view=modal))
     client.views_open(trigger_id=body["trigger_id"], view=modal)
 
 
+def build_page4_create_channel_submission_view() -> dict:
+    return {
+        "type": "modal",
+        "callback_id": "page4_create_channel_submission",
+        "title": {
+            "type": "plain_text",
+            "text": i18n("Creating a channel", "チャンネル作成中"),
+        },
+        "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n("Wait a second... :zzz:", "少々お待ちください... :zzz:"),
+                },
+            },
+        ],
+    }
+
+
 def page4_create_channel_submission(ack: Ack):
     ack(
         response_action="update",
-        view={
-            "type": "modal",
-            "callback_id": "page4_create_channel_submission",
-            "title": {
-                "type": "plain_text",
-                "text": i18n("Creating a channel", "チャンネル作成中"),
+        view=build_page4_create_channel_submission_view(),
+    )
+
+
+def build_page4_channel_creation_failure_view(error: str) -> dict:
+    error_message = i18n(
+        f"The app failed to create a channel ({error}) :bow:",
+        f"チャンネル作成中にエラーが発生しました ({error}) :bow:",
+    )
+    if error == "name_taken":
+        error_message = i18n(
+            f"The channel already exists :bow:", f"このチャンネル名はすでに存在しています :bow:"
+        )
+    elif error == "invalid_name_specials":
+        error_message = i18n(
+            f"Unfortunately, you cannot use special characters or upper case characters for channel names :bow:",
+            f"チャンネル名にアルファベット大文字や特殊文字などは使えません :bow:",
+        )
+    return {
+        "type": "modal",
+        "callback_id": "page2_modal_submission_result",
+        "title": {
+            "type": "plain_text",
+            "text": i18n("Channel Creation Failure", "チャンネル作成エラー"),
+        },
+        "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
+        "blocks": [
+            {
+                "type": "section",
+                "text": {"type": "mrkdwn", "text": error_message},
+            }
+        ],
+    }
+
+
+def build_page4_channel_created_view(channel_id: str) -> dict:
+    return {
+        "type": "modal",
+        "callback_id": "page2_modal_submission_result",
+        "title": {
+            "type": "plain_text",
+            "text": i18n("Channel Created!", "チャンネル作成完了"),
+        },
+        "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        "The app successfully created the channel!", "チャンネルを作成しました！"
+                    ),
+                },
             },
-            "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": i18n("Wait a second... :zzz:", "少々お待ちください... :zzz:"),
-                    },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        f"Go to <#{channel_id}> and follow the instructions.",
+                        f"<#{channel_id}> へ移動してそこで指示に従ってショートカットを実行してみてください。",
+                    ),
                 },
-            ],
+            },
+        ],
+    }
+
+
+def build_page4_channel_creation_progress_view(channel_id: str) -> dict:
+    return {
+        "type": "modal",
+        "callback_id": "page4_create_channel_submission",
+        "title": {
+            "type": "plain_text",
+            "text": i18n("Creating a channel", "チャンネル作成中"),
         },
-    )
+        "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        f"<#{channel_id}> has been created. Inviting you to the channel... :zzz:",
+                        f"<#{channel_id}> を作成しました。チャンネルに招待しています... :zzz:",
+                    ),
+                },
+            },
+        ],
+    }
+
+
+# Returns the hash of the updated view, which the next update has to send.
+# When someone else has updated the view in the meantime, returns None without updating it.
+def update_view(
+    client: WebClient, view_id: str, view: dict, view_hash: Optional[str] = None
+) -> Optional[str]:
+    try:
+        response = client.views_update(view_id=view_id, hash=view_hash, view=view)
+        return response["view"]["hash"]
+    except SlackApiError as e:
+        if e.response["error"] == "hash_conflict":
+            return None
+        raise
+
 
+# Runs the Web API calls that don't depend on each other in parallel
+channel_creation_executor = ContextCopyingThreadPoolExecutor(max_workers=10)
 
+
+@with_user_lang
 def page4_create_channel_submission_lazy(
-    view: dict, context: BoltContext, client: WebClient
+    view: dict, context: BoltContext, client: WebClient, logger: Logger
 ):
     values = view.get("state", {}).get("values", {})
     channel_name = values.get("channel_name", {}).get("input", {}).get("value")
-    channel_id = ""
+    progress = None
     try:
         channel_creation = client.conversations_create(name=channel_name)
         channel_id = channel_creation["channel"]["id"]
-        client.conversations_join(channel=channel_id)
-        client.conversations_invite(channel=channel_id, users=[context.user_id])
-    except SlackApiError as e:
-        error = e.response["error"]
-        error_message = i18n(
-            f"The app failed to create a channel ({error}) :bow:",
-            f"チャンネル作成中にエラーが発生しました ({error}) :bow:",
+        # The progress update, join and invite only need the channel ID
+        progress = channel_creation_executor.submit(
+            update_view,
+            client,
+            view["id"],
+            build_page4_channel_creation_progress_view(channel_id),
         )
-        if error == "name_taken":
-            error_message = i18n(
-                f"The channel already exists :bow:", f"このチャンネル名はすでに存在しています :bow:"
-            )
-        elif error == "invalid_name_specials":
-            error_message = i18n(
-                f"Unfortunately, you cannot use special characters or upper case characters for channel names :bow:",
-                f"チャンネル名にアルファベット大文字や特殊文字などは使えません :bow:",
-            )
-        client.views_update(
-            view_id=view["id"],
-            view={
-                "type": "modal",
-                "callback_id": "page2_modal_submission_result",
-                "title": {
-                    "type": "plain_text",
-                    "text": i18n("Channel Creation Failure", "チャンネル作成エラー"),
-                },
-                "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
-                "blocks": [
-                    {
-                        "type": "section",
-                        "text": {"type": "mrkdwn", "text": error_message},
-                    }
-                ],
-            },
+        joining = channel_creation_executor.submit(
+            client.conversations_join, channel=channel_id
         )
-        return
+        client.conversations_invite(channel=channel_id, users=[context.user_id])
+        joining.result()
+        result_view = build_page4_channel_created_view(channel_id)
+    except SlackApiError as e:
+        result_view = build_page4_channel_creation_failure_view(e.response["error"])
+
+    # The result must not be overwritten by the progress update
+    view_hash = None
+    if progress is not None:
+        try:
+            view_hash = progress.result()
+        except SlackApiError as e:
+            logger.warning(f"Failed to update the progress: {e}")
+    update_view(client, view["id"], result_view, view_hash)
+
+
+def build_channel_setup_message_text() -> str:
+    return i18n(
+        "Welcome to this test channel! Let's try shortcuts.",
+        "ようこそ、テスト用チャンネルへ！ここではショートカットを試してみましょう。",
+    )
 
-    client.views_update(
-        view_id=view["id"],
-        view={
-            "type": "modal",
-            "callback_id": "page2_modal_submission_result",
+
+@compacted
+def build_channel_setup_message_blocks() -> List[dict]:
+    return [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": i18n(
+                    """
+Welcome to this test channel! Let's try shortcuts.
+
+You can find the list of global shortcuts from the :zap: icon menu in text composer. It is a menu to display the list of available global shortcuts.
+
+Once the menu opens, search by "Learn". You will find the "Learn Global Shortcut". Let's click the one!
+                            """,
+                    """
+ようこそ、テスト用チャンネルへ！ここではショートカットを試してみましょう。
+
+メッセージ入力エリアに :zap: のようなアイコンがあると思いますが、これはクリックするとショートカット一覧が表示されるメニューです。
+
+メニューが開いたら「学習」で検索してみてください。そうすると「学習用のグローバルショートカット」というものが見つかるはずです。それをクリックしてみましょう。
+                            """,
+                ),
+            },
+        },
+        {
+            "type": "image",
             "title": {
                 "type": "plain_text",
-                "text": i18n("Channel Created!", "チャンネル作成完了"),
+                "text": i18n("Shortcut Menu", "ショートカットメニュー"),
             },
-            "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": i18n(
-                            "The app successfully created the channel!", "チャンネルを作成しました！"
-                        ),
-                    },
-                },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": i18n(
-                            f"Go to <#{channel_id}> and follow the instructions.",
-                            f"<#{channel_id}> へ移動してそこで指示に従ってショートカットを実行してみてください。",
-                        ),
-                    },
-                },
-            ],
+            "image_url": i18n(
+                "https://user-images.githubusercontent.com/19658/97389676-40b13280-191e-11eb-859a-1834ee83497c.png",
+                "https://user-images.githubusercontent.com/19658/96969620-a92e9700-154d-11eb-9fa0-97ee7644a82f.png"
+            ),
+            "alt_text": i18n("Shortcut Menu", "ショートカットメニュー"),
         },
-    )
+    ]
 
 
 def page4_create_channel_setup(ack):
     ack()
 
 
+@with_user_lang
 def page4_create_channel_setup_lazy(
     event: dict, context: BoltContext, client: WebClient
 ):
@@ -1215,100 +1468,60 @@ def page4_create_channel_setup_lazy(
     if creator == context.bot_user_id:
         client.chat_postMessage(
             channel=event["channel"]["id"],
-            text=i18n(
-                "Welcome to this test channel! Let's try shortcuts.",
-                "ようこそ、テスト用チャンネルへ！ここではショートカットを試してみましょう。",
-            ),
-            blocks=[
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": i18n(
-                            """
-Welcome to this test channel! Let's try shortcuts.
-
-You can find the list of global shortcuts from the :zap: icon menu in text composer. It is a menu to display the list of available global shortcuts.
-
-Once the menu opens, search by "Learn". You will find the "Learn Global Shortcut". Let's click the one!
-                            """,
-                            """
-ようこそ、テスト用チャンネルへ！ここではショートカットを試してみましょう。
-
-メッセージ入力エリアに :zap: のようなアイコンがあると思いますが、これはクリックするとショートカット一覧が表示されるメニューです。
-
-メニューが開いたら「学習」で検索してみてください。そうすると「学習用のグローバルショートカット」というものが見つかるはずです。それをクリックしてみましょう。
-                            """,
-                        ),
-                    },
-                },
-                {
-                    "type": "image",
-                    "title": {
-                        "type": "plain_text",
-                        "text": i18n("Shortcut Menu", "ショートカットメニュー"),
-                    },
-                    "image_url": i18n(
-                        "https://user-images.githubusercontent.com/19658/97389676-40b13280-191e-11eb-859a-1834ee83497c.png",
-                        "https://user-images.githubusercontent.com/19658/96969620-a92e9700-154d-11eb-9fa0-97ee7644a82f.png"
-                    ),
-                    "alt_text": i18n("Shortcut Menu", "ショートカットメニュー"),
-                },
-            ],
+            text=build_channel_setup_message_text(),
+            blocks=build_channel_setup_message_blocks(),
         )
 
 
-def global_shortcut_handler(ack: Ack, body: dict, client: WebClient):
-    ack()
-    client.views_open(
-        trigger_id=body["trigger_id"],
-        view={
-            "type": "modal",
-            "callback_id": "global-shortcut-example_submission",
-            "title": {"type": "plain_text", "text": i18n("Global Shortcuts", "グローバルショートカット")},
-            "submit": {"type": "plain_text", "text": i18n("Submit", "送信")},
-            "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": i18n(
-                            """
+@compacted
+def build_global_shortcut_modal() -> dict:
+    return {
+        "type": "modal",
+        "callback_id": "global-shortcut-example_submission",
+        "title": {"type": "plain_text", "text": i18n("Global Shortcuts", "グローバルショートカット")},
+        "submit": {"type": "plain_text", "text": i18n("Submit", "送信")},
+        "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n(
+                        """
 This Slack app opened this modal in response to your global shortcut invocation.
 
 You can use global shortcuts from the search bear. Thus, the current channel may not exist in some cases. If your app needs to notify users in a channel when the process completes, the app can use an input block along with `default_to_current_conversation` option. Here is an example:
                             """,
-                            """
+                        """
 グローバルショートカットからこのモーダルを起動しました。
 
 グローバルショートカットは検索バーからも実行できます。そのため、必ずしも「現在のチャンネル」が存在するとは限りません。完了後に何か通知したいという場合は `default_to_current_conversation` というオプションを指定したセレクトメニューを使用します。以下がその例です。
                             """
-                        ),
-                    },
+                    ),
                 },
-                {
-                    "type": "input",
-                    "block_id": "channel",
-                    "element": {
-                        "type": "conversations_select",
-                        "placeholder": {
-                            "type": "plain_text",
-                            "text": i18n("Unset if not in channel", "チャンネル外で起動したときは未設定"),
-                        },
-                        "default_to_current_conversation": True,
-                        "action_id": "input",
-                    },
-                    "label": {
+            },
+            {
+                "type": "input",
+                "block_id": "channel",
+                "element": {
+                    "type": "conversations_select",
+                    "placeholder": {
                         "type": "plain_text",
-                        "text": i18n("Current Channel", "起動したチャンネル"),
+                        "text": i18n("Unset if not in channel", "チャンネル外で起動したときは未設定"),
                     },
+                    "default_to_current_conversation": True,
+                    "action_id": "input",
                 },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": i18n("""
+                "label": {
+                    "type": "plain_text",
+                    "text": i18n("Current Channel", "起動したチャンネル"),
+                },
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": i18n("""
 If you clicked this shortcut in a channel, the channel should be selected in the above select menu. As this app does, making the input block required is a good way to surely ask end users to tell the place to notify.
 
 The following Python code is a simple listener that handles global shortcut requests.
@@ -1360,63 +1573,75 @@ def handler(ack, body, client):
 それでは、このモーダルをこのまま送信してみてください。
 """
 ),
-                    },
                 },
-            ],
-        },
+            },
+        ],
+    }
+
+
+def global_shortcut_handler(ack: Ack, body: dict, client: WebClient):
+    ack()
+    client.views_open(
+        trigger_id=body["trigger_id"],
+        view=build_global_shortcut_modal(),
+    )
+
+
+def build_message_shortcut_guide_text() -> str:
+    return i18n(
+        """Let's try message shortcuts. You can start a message shortcut from the message menu. If you don't see the shortcut in the menu, click "More message shortcuts..." to access the whole list.""",
+        "次はメッセージショートカットを実行してみましょう。以下のようにメッセージメニューから「学習用のメッセージメニュー」を起動してください。表示されていない場合は「その他のメッセージのショートカット」をクリックして、一覧から検索してください。"
     )
 
 
+def build_message_shortcut_guide_blocks() -> List[dict]:
+    return [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text":i18n(
+                    """Let's try message shortcuts. You can start a message shortcut from the message menu. If you don't see the shortcut in the menu, click "More message shortcuts..." to access the whole list.""",
+                    "次はメッセージショートカットを実行してみましょう。以下のようにメッセージメニューから「学習用のメッセージメニュー」を起動してください。表示されていない場合は「その他のメッセージのショートカット」をクリックして、一覧から検索してください。"
+                ),
+            },
+        },
+        {
+            "type": "image",
+            "title": {"type": "plain_text", "text": i18n("Message Menu", "メッセージメニュー")},
+            "image_url": "https://user-images.githubusercontent.com/19658/96974266-f44ba880-1553-11eb-94f0-b40408ee0731.gif",
+            "alt_text": i18n("Message Menu", "メッセージメニュー"),
+        },
+    ]
+
+
 def global_shortcut_view_submission(ack):
     ack()
 
 
+@with_user_lang
 def global_shortcut_view_submission_lazy(view: dict, client: WebClient):
     client.chat_postMessage(
         channel=view["state"]["values"]["channel"]["input"]["selected_conversation"],
-        text=i18n(
-            """Let's try message shortcuts. You can start a message shortcut from the message menu. If you don't see the shortcut in the menu, click "More message shortcuts..." to access the whole list.""",
-            "次はメッセージショートカットを実行してみましょう。以下のようにメッセージメニューから「学習用のメッセージメニュー」を起動してください。表示されていない場合は「その他のメッセージのショートカット」をクリックして、一覧から検索してください。"),
-        blocks=[
+        text=build_message_shortcut_guide_text(),
+        blocks=build_message_shortcut_guide_blocks(),
+    )
+
+
+@compacted
+def build_message_shortcut_modal() -> dict:
+    return {
+        "type": "modal",
+        "callback_id": "global-shortcut-example_submission",
+        "title": {"type": "plain_text", "text": i18n("Message Shortcuts", "メッセージショートカット")},
+        "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
+        "blocks": [
             {
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text":i18n(
-                        """Let's try message shortcuts. You can start a message shortcut from the message menu. If you don't see the shortcut in the menu, click "More message shortcuts..." to access the whole list.""",
-                        "次はメッセージショートカットを実行してみましょう。以下のようにメッセージメニューから「学習用のメッセージメニュー」を起動してください。表示されていない場合は「その他のメッセージのショートカット」をクリックして、一覧から検索してください。"
-                    ),
-                },
-            },
-            {
-                "type": "image",
-                "title": {"type": "plain_text", "text": i18n("Message Menu", "メッセージメニュー")},
-                "image_url": "https://user-images.githubusercontent.com/19658/96974266-f44ba880-1553-11eb-94f0-b40408ee0731.gif",
-                "alt_text": i18n("Message Menu", "メッセージメニュー"),
-            },
-        ],
-    )
-
-
-def message_shortcut_handler(ack: Ack):
-    ack()
-
-
-def message_shortcut_handler_lazy(body: dict, context: BoltContext, client: WebClient, logger: Logger):
-    client.views_open(
-        trigger_id=body["trigger_id"],
-        view={
-            "type": "modal",
-            "callback_id": "global-shortcut-example_submission",
-            "title": {"type": "plain_text", "text": i18n("Message Shortcuts", "メッセージショートカット")},
-            "close": {"type": "plain_text", "text": i18n("Close", "閉じる")},
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": i18n(
-                            """
+                    "text": i18n(
+                        """
 This Slack app opened this modal in response to your message shortcut invocation. Message shortcuts can be used for creating a task with the message text and user information.
 
 The following Python code is a simple listener that handles message shortcut requests.
@@ -1441,7 +1666,7 @@ def handler(ack, body, client):
     )
 ```
                             """,
-                            """
+                        """
 メッセージショートカットからこのモーダルを起動しました。メッセージショートカットのよくある例は、メッセージ本文や投稿者を含めたタスクなどを外部のシステムに登録する連携アプリです。
 
 メッセージショートカットをハンドリングする Python のコードは以下のようになります。
@@ -1469,22 +1694,35 @@ def handler(ack, body, client):
 
 ワークフロービルダーのリアクションをトリガーを使って似たような処理を実装できますが、メッセージショートカットを実装すると、より使い勝手の良いものを実装できるでしょう。
                             """
-                        ),
-                    },
+                    ),
                 },
-            ],
-        },
+            },
+        ],
+    }
+
+
+def build_shortcuts_summary_text(team_id: str, app_id: str) -> str:
+    return i18n(
+        f"We've learnt how to run two types of shortcuts. Go back to <slack://app?team={team_id}&id={app_id}&tab=home|Home tab> and continue learning more features!",
+        f"ここでは、二種類のショートカットの実行を学びました。<slack://app?team={team_id}&id={app_id}&tab=home|ホームタブに戻って>、学習の続きをみていきましょう。"
+    )
+
+
+def message_shortcut_handler(ack: Ack):
+    ack()
+
+
+@with_user_lang
+def message_shortcut_handler_lazy(body: dict, context: BoltContext, client: WebClient, logger: Logger):
+    client.views_open(
+        trigger_id=body["trigger_id"], view=build_message_shortcut_modal()
     )
     try:
         team_id = context.team_id
-        # https://github.com/slackapi/bolt-python/pull/126
-        app_id = client.bots_info(bot=context.bot_id)["bot"]["app_id"]
+        app_id = find_installation_metadata(context, client).app_id
         client.chat_postMessage(
             channel=body["channel"]["id"],
-            text=i18n(
-                f"We've learnt how to run two types of shortcuts. Go back to <slack://app?team={team_id}&id={app_id}&tab=home|Home tab> and continue learning more features!",
-                f"ここでは、二種類のショートカットの実行を学びました。<slack://app?team={team_id}&id={app_id}&tab=home|ホームタブに戻って>、学習の続きをみていきましょう。"
-            ),
+            text=build_shortcuts_summary_text(team_id, app_id),
         )
     except Exception as e:
         logger.exception(f"Failed to post a message: {e}")
@@ -0,0 +1,217 @@
+import copy
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from slack_bolt import BoltContext
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web import SlackResponse
+
+from app.metrics import metrics
+from app.tracing import tracer
+
+# https://api.slack.com/docs/rate-limits
+# The numbers are the calls per minute per workspace
+method_rate_limits = {
+    "auth.test": 100,  # Tier 4
+    "bots.info": 50,  # Tier 3
+    "chat.postMessage": 60,  # Special: about 1 message per second
+    "conversations.create": 20,  # Tier 2
+    "conversations.invite": 50,  # Tier 3
+    "conversations.join": 50,  # Tier 3
+    "users.info": 100,  # Tier 4
+    "users.list": 20,  # Tier 2
+    "views.open": 100,  # Tier 4
+    "views.publish": 100,  # Tier 4
+    "views.update": 100,  # Tier 4
+}
+default_rate_limit = 20  # Tier 2
+
+# trigger_id expires in 3 seconds
+trigger_id_expiration_seconds = 3.0
+
+
+class TokenBucket:
+    def __init__(self, calls_per_minute: int):
+        self.capacity = max(1.0, calls_per_minute / 10)  # allows short bursts
+        self.tokens = self.capacity
+        self.refill_per_second = calls_per_minute / 60
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.waiters: List[int] = []  # in the arrival order
+        self.condition = threading.Condition()
+
+    # Returns the seconds to wait until the call at the position in the queue can be made
+    def _refill(self, now: float, position: int) -> float:
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated_at) * self.refill_per_second,
+        )
+        self.updated_at = now
+        wait = max(0.0, (position + 1 - self.tokens) / self.refill_per_second)
+        return max(wait, self.blocked_until - now)
+
+    # Returns False without taking a token when the call can't be made by the deadline
+    def acquire(self, seq: int, deadline: Optional[float] = None) -> bool:
+        with self.condition:
+            self.waiters.append(seq)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._refill(now, self.waiters.index(seq))
+                    if wait <= 0.0:
+                        self.tokens -= 1
+                        return True
+                    if deadline is not None and now + wait > deadline:
+                        return False
+                    self.condition.wait(timeout=wait)
+            finally:
+                self.waiters.remove(seq)
+                self.condition.notify_all()
+
+    def block(self, seconds: float):
+        with self.condition:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.condition.notify_all()
+
+
+# Slack's rate limits are per method, so each (workspace, method) has its own queue;
+# e.g., views.open never waits behind the chat.postMessage calls of the fan-out
+class WebAPIScheduler:
+    def __init__(self, *, max_retries: int = 2, max_buckets: int = 10000):
+        self.max_retries = max_retries
+        self.max_buckets = max_buckets
+        self.logger = logging.getLogger(__name__)
+        # (team_id, method) -> bucket, the least recently used first
+        self._buckets: "OrderedDict[Tuple[Optional[str], str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def _bucket(self, team_id: Optional[str], api_method: str) -> TokenBucket:
+        key = (team_id, api_method)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(
+                    method_rate_limits.get(api_method, default_rate_limit)
+                )
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_buckets:
+                    self._evict_idle_buckets()
+            self._buckets.move_to_end(key)
+            return bucket
+
+    # The buckets with waiting calls are kept
+    def _evict_idle_buckets(self):
+        for key in list(self._buckets):
+            if len(self._buckets) <= self.max_buckets:
+                return
+            if len(self._buckets[key].waiters) == 0:
+                del self._buckets[key]
+
+    def acquire(
+        self,
+        team_id: Optional[str],
+        api_method: str,
+        deadline: Optional[float] = None,
+    ) -> bool:
+        bucket = self._bucket(team_id, api_method)
+        metrics.observe("web_api_queue_depth", len(bucket.waiters), method=api_method)
+        started = time.perf_counter()
+        acquired = bucket.acquire(next(self._seq), deadline)
+        elapsed = (time.perf_counter() - started) * 1000
+        metrics.observe("web_api_queue_latency", elapsed, method=api_method)
+        return acquired
+
+    def rate_limited(self, team_id: Optional[str], api_method: str, retry_after: float):
+        self.logger.warning(f"{api_method} is rate limited (retry after {retry_after}s)")
+        self._bucket(team_id, api_method).block(retry_after)
+        metrics.observe("web_api_retry_after", retry_after * 1000, method=api_method)
+
+
+class ScheduledWebClient(WebClient):
+    # scheduled_team_id is the workspace of the rate limits; team_id is sent with every call
+    def __init__(
+        self, scheduler: WebAPIScheduler, *, scheduled_team_id: Optional[str] = None, **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+        self.scheduled_team_id = scheduled_team_id or kwargs.get("team_id")
+
+    # Lazy listeners receive a deep copy of the request,
+    # so the copied client has to keep sharing the same scheduler
+    def __deepcopy__(self, memo):
+        return copy.copy(self)
+
+    def api_call(self, api_method: str, *, http_verb: str = "POST", **kwargs) -> SlackResponse:
+        params = {}
+        for name in ["params", "data", "json"]:
+            params.update(kwargs.get(name) or {})
+        # The calls with a trigger_id are useless after it expires,
+        # so they fail instead of waiting for the rate limits past the expiration
+        deadline = None
+        if "trigger_id" in params:
+            deadline = time.monotonic() + trigger_id_expiration_seconds
+
+        attempts = 0
+        while True:
+            if not self.scheduler.acquire(self.scheduled_team_id, api_method, deadline):
+                raise self._trigger_expired_error(api_method, http_verb, kwargs)
+            started = time.perf_counter()
+            error = "none"
+            try:
+                with tracer.span(f"slack {api_method}", **{"slack.method": api_method}):
+                    return super().api_call(api_method, http_verb=http_verb, **kwargs)
+            except SlackApiError as e:
+                error = e.response.get("error") or str(e.response.status_code)
+                if e.response.status_code != 429 or attempts >= self.scheduler.max_retries:
+                    raise
+                attempts += 1
+                headers = {k.lower(): v for k, v in e.response.headers.items()}
+                retry_after = int(headers.get("retry-after", 1))
+                self.scheduler.rate_limited(self.scheduled_team_id, api_method, retry_after)
+                if deadline is not None and time.monotonic() + retry_after >= deadline:
+                    raise
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                elapsed = (time.perf_counter() - started) * 1000
+                metrics.observe("web_api_latency", elapsed, method=api_method, error=error)
+
+    # Raised without calling the API, as Slack would reject the call with the rate limits
+    def _trigger_expired_error(self, api_method: str, http_verb: str, kwargs: dict) -> SlackApiError:
+        response = SlackResponse(
+            client=self,
+            http_verb=http_verb,
+            api_url=self.base_url + api_method,
+            req_args=kwargs,
+            data={"ok": False, "error": "trigger_expired"},
+            headers={},
+            status_code=429,
+        )
+        return SlackApiError(f"The rate limits of {api_method} exceed the trigger_id's expiration", response)
+
+
+web_api_scheduler = WebAPIScheduler()
+
+
+# Makes all the Web API calls in listeners go through the shared scheduler
+def use_web_api_scheduler(context: BoltContext, client: WebClient, next):
+    context["client"] = ScheduledWebClient(
+        web_api_scheduler,
+        token=client.token,
+        base_url=client.base_url,
+        timeout=client.timeout,
+        ssl=client.ssl,
+        proxy=client.proxy,
+        headers=dict(client.headers),
+        scheduled_team_id=context.team_id,
+        logger=client.logger,
+        retry_handlers=client.retry_handlers,
+    )
+    next()
@@ -0,0 +1,137 @@
+# Measures the authorization of the first requests in cold Lambda containers
+#
+#   python benchmarks/authorization_cache.py [--latency 0.02] [--containers 20] [--teams 50]
+#
+# Each container starts with empty memory and authorizes requests from installed teams
+# and from teams that have uninstalled the app. The S3 requests go to the FakeS3Client and
+# auth.test sleeps for the same latency. With the shared cache, only the first container
+# that sees a team pays for them.
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slack_bolt import BoltContext  # noqa: E402
+from slack_bolt.authorization.authorize import InstallationStoreAuthorize  # noqa: E402
+from slack_sdk.errors import SlackApiError  # noqa: E402
+from slack_sdk.oauth.installation_store import Installation  # noqa: E402
+
+from app import authorization_cache  # noqa: E402
+from app.authorization_cache import (  # noqa: E402
+    FileAuthorizationCache,
+    SQLiteAuthorizationCache,
+    SharedCacheAuthorize,
+)
+from app.installation_stores import (  # noqa: E402
+    ConcurrentS3InstallationStore,
+    WriteThroughInstallationStore,
+)
+from fake_s3 import FakeS3Client  # noqa: E402
+
+bucket = "fake-installations"
+logger = logging.getLogger(__name__)
+
+
+class FakeWebClient:
+    def __init__(self, *, latency: float, revoked: set):
+        self.latency = latency
+        self.revoked = revoked
+        self.calls = 0
+
+    def auth_test(self, *, token: str):
+        self.calls += 1
+        time.sleep(self.latency)
+        team_id = token.split("-")[1]
+        if team_id in self.revoked:
+            raise SlackApiError("invalid_auth", {"ok": False, "error": "invalid_auth"})
+        return {
+            "ok": True,
+            "url": f"https://{team_id}.slack.com/",
+            "team": team_id,
+            "team_id": team_id,
+            "user_id": f"U{team_id}",
+            "bot_id": f"B{team_id}",
+        }
+
+
+def percentiles(values: List[float]) -> str:
+    values = sorted(values)
+    result = []
+    for p in [0.5, 0.99]:
+        value = values[min(len(values) - 1, int(len(values) * p))]
+        result.append(f"p{int(p * 100)}: {value * 1000:7.2f} ms")
+    return ", ".join(result)
+
+
+def run(name: str, s3: FakeS3Client, args, build_authorize):
+    installed = [f"T{i:06d}" for i in range(args.teams)]
+    # Uninstalled: no data at all, or stale data with a revoked token
+    missing = [f"X{i:06d}" for i in range(args.teams // 5)]
+    revoked = {f"R{i:06d}" for i in range(args.teams // 5)}
+    client = FakeWebClient(latency=args.latency, revoked=revoked)
+    s3.calls = 0
+    durations = {"installed": [], "uninstalled": []}
+    for _ in range(args.containers):
+        # A cold container
+        authorization_cache.local_authorizations.clear()
+        store = WriteThroughInstallationStore(
+            ConcurrentS3InstallationStore(s3_client=s3, bucket_name=bucket, client_id="111.222")
+        )
+        authorize = build_authorize(store)
+        for team_id in installed + missing + sorted(revoked):
+            context = BoltContext(client=client, is_enterprise_install=False)
+            started = time.perf_counter()
+            result = authorize(context=context, enterprise_id=None, team_id=team_id, user_id="U1")
+            elapsed = time.perf_counter() - started
+            assert (result is not None) == (team_id in installed)
+            durations["installed" if result is not None else "uninstalled"].append(elapsed)
+    print(f"{name}:")
+    print(f"  installed   {percentiles(durations['installed'])}")
+    print(f"  uninstalled {percentiles(durations['uninstalled'])}")
+    print(f"  S3 calls: {s3.calls}, auth.test calls: {client.calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--containers", type=int, default=20)
+    parser.add_argument("--teams", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        s3 = FakeS3Client(base_dir=f"{tmp_dir}/s3", latency=0.0)
+        store = ConcurrentS3InstallationStore(s3_client=s3, bucket_name=bucket, client_id="111.222")
+        for i in range(args.teams):
+            store.save(Installation(user_id="U1", team_id=f"T{i:06d}", bot_token=f"xoxb-T{i:06d}"))
+        for i in range(args.teams // 5):
+            store.save(Installation(user_id="U1", team_id=f"R{i:06d}", bot_token=f"xoxb-R{i:06d}"))
+        s3.latency = args.latency
+
+        def no_shared_cache(store):
+            return InstallationStoreAuthorize(
+                logger=logger, installation_store=store, bot_only=True, cache_enabled=True
+            )
+
+        def shared(cache):
+            return lambda store: SharedCacheAuthorize(
+                cache=cache, logger=logger, installation_store=store, bot_only=True
+            )
+
+        print(
+            f"{args.containers} cold containers x {args.teams} installed teams, "
+            f"latency: {args.latency * 1000:.0f} ms"
+        )
+        run("no shared cache", s3, args, no_shared_cache)
+        file_cache = FileAuthorizationCache(base_dir=f"{tmp_dir}/file-cache")
+        run("shared cache (files)", s3, args, shared(file_cache))
+        sqlite_cache = SQLiteAuthorizationCache(database=f"{tmp_dir}/cache.db")
+        run("shared cache (SQLite)", s3, args, shared(sqlite_cache))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Reports the size of each Block Kit view / message this app sends, and checks the budgets
+#
+#   python benchmarks/block_kit_report.py [--budget benchmarks/block_kit_budget.json]
+#   python benchmarks/block_kit_report.py --update   (writes the current sizes + 10% as the budgets)
+#
+# "raw" is the payload before app/block_kit.py's compaction and "bytes" is the one sent now,
+# both encoded as slack_sdk does (json.dumps with the default options).
+# The exit code is 1 when a view exceeds its budget or Slack's limits
+# (blocks per view / message, characters of section and header texts), so CI can run this.
+import argparse
+import json
+import math
+import os
+import sys
+from typing import Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SLACK_LAMBDA_PATH", "/slack/events")
+
+from app import tutorials  # noqa: E402
+from app.i18n import language, supported_langs  # noqa: E402
+from app.onboarding import (  # noqa: E402
+    build_installation_message_blocks,
+    build_raw_installation_message_blocks,
+)
+
+default_budget_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "block_kit_budget.json")
+
+# https://api.slack.com/reference/block-kit/blocks
+max_view_blocks = 100
+max_message_blocks = 50
+max_text_length = {"section": 3000, "header": 150}
+
+
+def raw(builder: Callable) -> Callable:
+    return getattr(builder, "__wrapped__", builder)
+
+
+# (name, kind, raw payload, compacted payload) for each view / message
+def build_payloads() -> Iterator[Tuple[str, str, object, object]]:
+    raw_pages = tutorials.build_pages()
+    for page in range(1, len(raw_pages) + 1):
+        view = tutorials.tutorial_view(page)
+        page_length = len(tutorials.load_pages(tutorials.current_lang())[page - 1])
+        raw_view = {"type": "home", "blocks": raw_pages[page - 1] + view["blocks"][page_length:]}
+        yield f"home page {page}", "view", raw_view, view
+
+    raw_message = build_raw_installation_message_blocks("A111", "U111")
+    yield "installation message", "message", raw_message, build_installation_message_blocks("A111", "U111")
+
+    builders: List[Tuple[str, str, Callable, tuple]] = [
+        ("page1 button modal", "view", tutorials.build_page1_button_modal, (3,)),
+        ("page1 users select modal", "view", tutorials.build_page1_users_select_modal, ("U111",)),
+        ("page2 modal", "view", tutorials.build_page2_modal, ()),
+        ("page4 create channel modal", "view", tutorials.build_page4_create_channel_modal, ("U111",)),
+        ("page4 submission view", "view", tutorials.build_page4_create_channel_submission_view, ()),
+        ("page4 failure view", "view", tutorials.build_page4_channel_creation_failure_view, ("name_taken",)),
+        ("page4 created view", "view", tutorials.build_page4_channel_created_view, ("C111",)),
+        ("page4 progress view", "view", tutorials.build_page4_channel_creation_progress_view, ("C111",)),
+        ("channel setup message", "message", tutorials.build_channel_setup_message_blocks, ()),
+        ("global shortcut modal", "view", tutorials.build_global_shortcut_modal, ()),
+        ("message shortcut guide", "message", tutorials.build_message_shortcut_guide_blocks, ()),
+        ("message shortcut modal", "view", tutorials.build_message_shortcut_modal, ()),
+    ]
+    for name, kind, builder, args in builders:
+        yield name, kind, raw(builder)(*args), builder(*args)
+
+
+def encoded_size(payload: object) -> int:
+    return len(json.dumps(payload).encode("utf-8"))
+
+
+def blocks_of(payload: object) -> List[dict]:
+    return payload["blocks"] if isinstance(payload, dict) else payload
+
+
+def find_limit_errors(kind: str, payload: object) -> List[str]:
+    blocks = blocks_of(payload)
+    errors = []
+    max_blocks = max_view_blocks if kind == "view" else max_message_blocks
+    if len(blocks) > max_blocks:
+        errors.append(f"{len(blocks)} blocks > {max_blocks}")
+    for i, block in enumerate(blocks):
+        limit = max_text_length.get(block.get("type"))
+        text = (block.get("text") or {}).get("text") or ""
+        if limit is not None and len(text) > limit:
+            errors.append(f"block {i}: {block['type']} text has {len(text)} chars > {limit}")
+    return errors
+
+
+# For comparison: most of the bytes of the Japanese views are the \uXXXX escapes of json.dumps
+def utf8_size(payload: object) -> int:
+    return len(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", default=default_budget_path)
+    parser.add_argument("--update", action="store_true", help="write the current sizes + 10%% as the budgets")
+    args = parser.parse_args()
+    budgets: Dict[str, int] = {}
+    if os.path.exists(args.budget):
+        with open(args.budget) as f:
+            budgets = json.load(f)
+
+    sizes: Dict[str, int] = {}
+    failures = []
+    raw_payloads, payloads = [], []
+    print(f"{'view':<36} {'blocks':>6} {'raw':>8} {'bytes':>8} {'saved':>6} {'budget':>8}")
+    for lang in supported_langs:
+        with language(lang):
+            for name, kind, raw_payload, payload in build_payloads():
+                key = f"{lang}/{name}"
+                raw_size, size = encoded_size(raw_payload), encoded_size(payload)
+                sizes[key] = size
+                raw_payloads.append(raw_payload)
+                payloads.append(payload)
+                budget = budgets.get(key)
+                errors = find_limit_errors(kind, payload)
+                if budget is not None and size > budget:
+                    errors.append(f"{size} bytes > budget {budget}")
+                failures.extend(f"{key}: {e}" for e in errors)
+                print(
+                    f"{key:<36} {len(blocks_of(payload)):>6} {raw_size:>8,} {size:>8,}"
+                    f" {(raw_size - size) / raw_size:>6.1%} {budget or '-':>8}"
+                    + ("  OVER" if errors else "")
+                )
+
+    total_raw = sum(encoded_size(p) for p in raw_payloads)
+    total = sum(encoded_size(p) for p in payloads)
+    print(f"total: {total_raw:,} -> {total:,} bytes ({(total_raw - total) / total_raw:.1%} smaller)")
+    print(f"(as compact UTF-8 JSON: {sum(utf8_size(p) for p in payloads):,} bytes)")
+
+    if args.update:
+        with open(args.budget, "w") as f:
+            budgets = {k: int(math.ceil(v * 1.1 / 100) * 100) for k, v in sizes.items()}
+            json.dump(budgets, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Updated {args.budget}")
+        return
+    for failure in failures:
+        print(f"FAILED {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Measures how long users wait for the result of the channel creation modal (page 4)
+#
+#   python benchmarks/channel_creation.py [api latency in seconds]
+#
+# Web API calls are answered locally after the given latency.
+# The legacy implementation makes four sequential calls, so the critical path is
+# create + join + invite + update. The current one is create + max(join, invite) + update.
+import os
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SLACK_LAMBDA_PATH", "/slack/events")
+
+import logging  # noqa: E402
+
+from slack_bolt import BoltContext  # noqa: E402
+from slack_sdk import WebClient  # noqa: E402
+from slack_sdk.errors import SlackApiError  # noqa: E402
+from slack_sdk.web import SlackResponse  # noqa: E402
+
+from app.tutorials import (  # noqa: E402
+    build_page4_channel_created_view,
+    build_page4_channel_creation_failure_view,
+    page4_create_channel_submission_lazy,
+)
+
+
+class StubWebClient(WebClient):
+    def __init__(self, latency: float):
+        super().__init__(token="xoxb-stub")
+        self.latency = latency
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.hash = 0
+        self.calls: List[Tuple[str, float, float]] = []
+
+    def api_call(self, api_method: str, *, http_verb: str = "POST", **kwargs):
+        started = time.perf_counter() - self.started
+        time.sleep(self.latency)
+        data = {"ok": True}
+        if api_method == "conversations.create":
+            data["channel"] = {"id": "C111"}
+        if api_method == "views.update":
+            with self.lock:
+                sent_hash = (kwargs.get("json") or {}).get("hash")
+                if sent_hash is not None and sent_hash != str(self.hash):
+                    data = {"ok": False, "error": "hash_conflict"}
+                else:
+                    self.hash += 1
+                    data["view"] = {"id": "V111", "hash": str(self.hash)}
+        with self.lock:
+            self.calls.append((api_method, started, time.perf_counter() - self.started))
+        return SlackResponse(
+            client=self,
+            http_verb=http_verb,
+            api_url=self.base_url + api_method,
+            req_args=kwargs,
+            data=data,
+            headers={},
+            status_code=200,
+        ).validate()
+
+
+# The implementation before the calls were parallelized
+def legacy_page4_create_channel_submission_lazy(
+    view: dict, context: BoltContext, client: WebClient
+):
+    values = view.get("state", {}).get("values", {})
+    channel_name = values.get("channel_name", {}).get("input", {}).get("value")
+    channel_id = ""
+    try:
+        channel_creation = client.conversations_create(name=channel_name)
+        channel_id = channel_creation["channel"]["id"]
+        client.conversations_join(channel=channel_id)
+        client.conversations_invite(channel=channel_id, users=[context.user_id])
+    except SlackApiError as e:
+        client.views_update(
+            view_id=view["id"],
+            view=build_page4_channel_creation_failure_view(e.response["error"]),
+        )
+        return
+
+    client.views_update(
+        view_id=view["id"], view=build_page4_channel_created_view(channel_id)
+    )
+
+
+def run(name: str, latency: float, listener):
+    view = {
+        "id": "V111",
+        "state": {"values": {"channel_name": {"input": {"value": "learning-app"}}}},
+    }
+    context = BoltContext(user_id="U111")
+    client = StubWebClient(latency)
+    listener(view, context, client)
+
+    # The last views.update shows the result
+    result = [c for c in client.calls if c[0] == "views.update"][-1]
+    print(f"{name}: result shown after {result[2] * 1000:.0f} ms")
+    for api_method, started, ended in sorted(client.calls, key=lambda c: c[1]):
+        print(f"  {api_method:<22} {started * 1000:6.0f} - {ended * 1000:6.0f} ms")
+
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    logger = logging.getLogger(__name__)
+    run("before", latency, legacy_page4_create_channel_submission_lazy)
+    run(
+        "after",
+        latency,
+        lambda view, context, client: page4_create_channel_submission_lazy(
+            view, context, client, logger
+        ),
+    )
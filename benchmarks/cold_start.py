@@ -0,0 +1,84 @@
+# Measures the cold start of lambda_app.py in both startup modes
+#
+#   python benchmarks/cold_start.py [runs] [top]
+#
+# Each run imports lambda_app in a fresh interpreter with `python -X importtime`.
+# The report shows the p50/p99 of the whole import and the slowest modules.
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+script = """
+import time
+started = time.perf_counter()
+import lambda_app
+print(f"init: {time.perf_counter() - started}")
+"""
+
+import_time_line = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(.+)$")
+
+
+def build_env(lazy_init: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("SLACK_SIGNING_SECRET", "dummy")
+    env.setdefault("SLACK_CLIENT_ID", "111.222")
+    env.setdefault("SLACK_CLIENT_SECRET", "dummy")
+    env.setdefault("SLACK_SCOPES", "chat:write")
+    env.setdefault("SLACK_INSTALLATION_S3_BUCKET_NAME", "dummy")
+    env.setdefault("SLACK_STATE_S3_BUCKET_NAME", "dummy")
+    env.setdefault("SLACK_LAMBDA_PATH", "/default/slack_learning_app_ja")
+    env.setdefault("AWS_DEFAULT_REGION", "ap-northeast-1")
+    env["SLACK_LAMBDA_LAZY_INIT"] = "1" if lazy_init else "0"
+    return env
+
+
+def run_once(lazy_init: bool) -> Tuple[float, Dict[str, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=project_dir,
+        env=build_env(lazy_init),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    init = float(re.search(r"^init: (.+)$", result.stdout, re.M).group(1))
+    self_times = {}
+    for line in result.stderr.splitlines():
+        m = import_time_line.match(line)
+        if m:
+            self_times[m.group(4)] = int(m.group(1))
+    return init, self_times
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def report(lazy_init: bool, runs: int, top: int):
+    inits = []
+    totals: Dict[str, int] = defaultdict(int)
+    for _ in range(runs):
+        init, self_times = run_once(lazy_init)
+        inits.append(init)
+        for module, us in self_times.items():
+            totals[module] += us
+
+    print(f"SLACK_LAMBDA_LAZY_INIT={'1' if lazy_init else '0'} ({runs} runs)")
+    print(f"  init p50: {percentile(inits, 0.5) * 1000:8.1f} ms")
+    print(f"  init p99: {percentile(inits, 0.99) * 1000:8.1f} ms")
+    print("  slowest modules (average self time):")
+    for module, us in sorted(totals.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"    {us / runs / 1000:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    report(False, runs, top)
+    report(True, runs, top)
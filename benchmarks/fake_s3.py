@@ -0,0 +1,56 @@
+# A filesystem-backed stand-in for the boto3 S3 client, which the S3 stores can use
+#
+#   FakeS3Client(base_dir="/tmp/fake-s3", latency=0.02)
+#
+# Objects are saved as {base_dir}/{bucket}/{key}. Each call sleeps for the latency
+# to simulate a round trip. A moto server works as well, with
+# AWS_ENDPOINT_URL=http://localhost:5000 and boto3.client("s3").
+import io
+import threading
+import time
+from pathlib import Path
+
+
+class NoSuchKey(Exception):
+    pass
+
+
+class FakeS3Client:
+    def __init__(self, *, base_dir: str, latency: float = 0.0):
+        self.base_dir = base_dir
+        self.latency = latency
+        self.calls = 0
+        self.max_concurrency = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def _path(self, bucket: str, key: str) -> Path:
+        return Path(f"{self.base_dir}/{bucket}/{key}")
+
+    def _round_trip(self):
+        with self._lock:
+            self.calls += 1
+            self._running += 1
+            self.max_concurrency = max(self.max_concurrency, self._running)
+        time.sleep(self.latency)
+        with self._lock:
+            self._running -= 1
+
+    def put_object(self, *, Bucket: str, Key: str, Body):
+        self._round_trip()
+        path = self._path(Bucket, Key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(Body.encode("utf-8") if isinstance(Body, str) else Body)
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    def get_object(self, *, Bucket: str, Key: str):
+        self._round_trip()
+        try:
+            return {"Body": io.BytesIO(self._path(Bucket, Key).read_bytes())}
+        except FileNotFoundError:
+            raise NoSuchKey(f"The specified key does not exist: {Key}")
+
+    def delete_object(self, *, Bucket: str, Key: str):
+        self._round_trip()
+        self._path(Bucket, Key).unlink(missing_ok=True)
+        return {"ResponseMetadata": {"HTTPStatusCode": 204}}
@@ -0,0 +1,165 @@
+# A local stand-in for the Slack Web API, which WebClient can use via base_url
+#
+#   python benchmarks/fake_slack_api.py --port 8888 --latency 0.1 --rate-limit 20 \
+#     --error conversations.create=name_taken:0.2
+#
+#   WebClient(base_url="http://localhost:8888/api/")
+#
+# --rate-limit is the number of calls per second allowed for each method.
+# Exceeding calls receive 429 with a Retry-After header, like the real API.
+# --error METHOD=ERROR:RATE makes the method fail with the error code at the given rate.
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+canned_responses = {
+    "auth.test": {
+        "url": "https://fake.slack.com/",
+        "team": "Fake Workspace",
+        "user": "fake-bot",
+        "team_id": "T111",
+        "user_id": "UBOT",
+        "bot_id": "BBOT",
+    },
+    "bots.info": {"bot": {"id": "BBOT", "app_id": "A111", "user_id": "UBOT"}},
+    "chat.postMessage": {"channel": "C111", "ts": "1600000000.000100"},
+    "conversations.create": {"channel": {"id": "C111", "name": "fake-channel"}},
+    "conversations.join": {"channel": {"id": "C111"}},
+    "conversations.invite": {"channel": {"id": "C111"}},
+    "users.info": {"user": {"id": "U111", "locale": "ja-JP"}},
+    "views.open": {"view": {"id": "V111", "hash": "1600000000.fake"}},
+    "views.publish": {"view": {"id": "V111", "hash": "1600000000.fake"}},
+    "views.update": {"view": {"id": "V111", "hash": "1600000000.fake"}},
+}
+
+
+class FakeSlackAPI:
+    def __init__(
+        self,
+        *,
+        port: int = 0,
+        latency: float = 0.0,
+        rate_limit: Optional[int] = None,
+        errors: Optional[Dict[str, Tuple[str, float]]] = None,
+    ):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.errors = errors or {}
+        self.calls: List[Tuple[str, dict]] = []
+        self.lock = threading.Lock()
+        self.windows: Dict[str, Tuple[int, int]] = {}
+        self.server = ThreadingHTTPServer(("localhost", port), self._build_handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://localhost:{self.server.server_port}/api/"
+
+    def start(self) -> "FakeSlackAPI":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, method: str) -> int:
+        with self.lock:
+            return len([c for c in self.calls if c[0] == method])
+
+    def _retry_after(self, method: str) -> Optional[int]:
+        if self.rate_limit is None:
+            return None
+        now = int(time.time())
+        with self.lock:
+            second, count = self.windows.get(method, (now, 0))
+            if second != now:
+                second, count = now, 0
+            self.windows[method] = (second, count + 1)
+        return 1 if count >= self.rate_limit else None
+
+    def handle(self, method: str, params: dict) -> Tuple[int, dict, dict]:
+        with self.lock:
+            self.calls.append((method, params))
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        retry_after = self._retry_after(method)
+        if retry_after is not None:
+            return 429, {"Retry-After": str(retry_after)}, {"ok": False, "error": "ratelimited"}
+
+        if method in self.errors:
+            error, rate = self.errors[method]
+            if random.random() < rate:
+                return 200, {}, {"ok": False, "error": error}
+
+        body = {"ok": True}
+        body.update(canned_responses.get(method, {}))
+        return 200, {}, body
+
+    def _build_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw_body = self.rfile.read(length).decode("utf-8")
+                if (self.headers.get("Content-Type") or "").startswith("application/json"):
+                    params = json.loads(raw_body) if raw_body else {}
+                else:
+                    params = dict(parse_qsl(raw_body))
+                method = self.path.split("?")[0].rstrip("/").split("/")[-1]
+
+                status, headers, body = api.handle(method, params)
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def parse_errors(values: List[str]) -> Dict[str, Tuple[str, float]]:
+    errors = {}
+    for value in values:
+        method, error = value.split("=", 1)
+        error, _, rate = error.partition(":")
+        errors[method] = (error, float(rate or "1"))
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None)
+    parser.add_argument("--error", action="append", default=[])
+    args = parser.parse_args()
+
+    api = FakeSlackAPI(
+        port=args.port,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        errors=parse_errors(args.error),
+    )
+    print(f"Fake Slack API is running at {api.base_url}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        api.stop()
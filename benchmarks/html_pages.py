@@ -0,0 +1,94 @@
+# Measures how many OAuth completion pages can be built per second
+#
+#   python benchmarks/html_pages.py [iterations]
+#
+# "before" renders the page with f-strings and encodes it for Content-Length,
+# and "after" fills the pre-split template with the pre-computed segment sizes.
+import os
+import sys
+import time
+from html import unescape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SLACK_LAMBDA_PATH", "/slack/install")
+
+from app.i18n import i18n, language, supported_langs  # noqa: E402
+from app.onboarding import (  # noqa: E402
+    build_html_response,
+    build_success_page_url,
+    render_failure_page_with_size,
+    render_success_page_with_size,
+)
+
+
+# The implementation before the templates
+def legacy_render_success_page(app_id, team_id, is_enterprise_install, enterprise_url):
+    url = build_success_page_url(app_id, team_id, is_enterprise_install, enterprise_url)
+    main = i18n(
+        f"""
+<h2>Thank you!</h2>
+<p>Redirecting to the Slack App... click <a href="{url}">here</a></p>
+""",
+        f"""
+<h2>インストールありがとうございます！</h2>
+<p>Slack クライアントアプリに移動します... 遷移しない場合は<a href="{url}">こちら</a>をクリックしてください。</p>
+""",
+    )
+    return f"""
+<html>
+<head>
+<meta http-equiv="refresh" content="0; URL={url}">
+<style>
+body {{
+  padding: 10px 15px;
+  font-family: verdana;
+  text-align: center;
+}}
+</style>
+</head>
+<body>
+{main}
+</body>
+</html>
+"""
+
+
+def legacy_response(i: int):
+    html = legacy_render_success_page("A111", f"T{i:08d}", False, None)
+    return build_html_response(200, html)
+
+
+def new_response(i: int):
+    html, size = render_success_page_with_size("A111", f"T{i:08d}", False, None)
+    return build_html_response(200, html, size)
+
+
+# The best of 5 rounds, as a single response takes only a few microseconds
+def responses_per_second(build, iterations: int) -> float:
+    durations = []
+    for _ in range(5):
+        started = time.perf_counter()
+        for i in range(iterations):
+            build(i)
+        durations.append(time.perf_counter() - started)
+    return iterations / min(durations)
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for lang in supported_langs:
+        with language(lang):
+            for i in range(3):
+                before, after = legacy_response(i), new_response(i)
+                # the new pages escape "&" in the URLs
+                assert unescape(after.body) == before.body
+                size = after.headers["content-length"][0]
+                assert size == str(len(after.body.encode("utf-8")))
+            html, size = render_failure_page_with_size("/slack/install", "<script>")
+            assert "<script>" not in html and size == len(html.encode("utf-8"))
+
+            before = responses_per_second(legacy_response, iterations)
+            after = responses_per_second(new_response, iterations)
+        print(f"language: {lang}, iterations: {iterations}")
+        print(f"before: {before:>12,.0f} responses/sec")
+        print(f"after:  {after:>12,.0f} responses/sec ({after / before:.2f}x)")
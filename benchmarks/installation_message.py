@@ -0,0 +1,47 @@
+# Measures how many welcome DM payloads can be built per second
+#
+#   python benchmarks/installation_message.py [iterations]
+#
+# "before" builds the block tree and serializes it for each message, as
+# chat_postMessage(blocks=...) did, and "after" fills the pre-serialized template.
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SLACK_LAMBDA_PATH", "/slack/events")
+
+from app.block_kit import compact_blocks  # noqa: E402
+from app.i18n import language, supported_langs  # noqa: E402
+from app.onboarding import (  # noqa: E402
+    build_installation_message_blocks_json,
+    build_raw_installation_message_blocks,
+)
+
+
+def legacy_payload(app_id: str, user_id: str) -> str:
+    return json.dumps(build_raw_installation_message_blocks(app_id, user_id))
+
+
+def payloads_per_second(build, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        build("A0123456789", f"U{i:010d}")
+    return iterations / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for lang in supported_langs:
+        with language(lang):
+            for app_id, user_id in [("A111", "U111"), ('A"\\', "U</>&")]:
+                assert json.loads(
+                    build_installation_message_blocks_json(app_id, user_id)
+                ) == compact_blocks(build_raw_installation_message_blocks(app_id, user_id))
+
+            before = payloads_per_second(legacy_payload, iterations)
+            after = payloads_per_second(build_installation_message_blocks_json, iterations)
+        print(f"language: {lang}, iterations: {iterations}")
+        print(f"before: {before:>12,.0f} payloads/sec")
+        print(f"after:  {after:>12,.0f} payloads/sec ({after / before:.2f}x)")
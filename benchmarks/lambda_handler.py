@@ -0,0 +1,94 @@
+# Measures the per-invocation overhead of lambda_app.handler
+#
+#   python benchmarks/lambda_handler.py [iterations] [events.jsonl]
+#
+# The events file has one API Gateway event per line.
+# When it's absent, signed url_verification / ssl_check requests are used,
+# which don't need any installation data in S3.
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SLACK_SIGNING_SECRET", "dummy")
+os.environ.setdefault("SLACK_CLIENT_ID", "111.222")
+os.environ.setdefault("SLACK_CLIENT_SECRET", "dummy")
+os.environ.setdefault("SLACK_SCOPES", "chat:write")
+os.environ.setdefault("SLACK_INSTALLATION_S3_BUCKET_NAME", "dummy")
+os.environ.setdefault("SLACK_STATE_S3_BUCKET_NAME", "dummy")
+os.environ.setdefault("SLACK_LAMBDA_PATH", "/default/slack_learning_app_ja")
+os.environ.setdefault("SLACK_LAMBDA_LAZY_INIT", "1")
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-1")
+
+import logging  # noqa: E402
+
+import lambda_app  # noqa: E402
+from slack_bolt.adapter.aws_lambda import SlackRequestHandler  # noqa: E402
+
+logging.disable(logging.INFO)
+
+
+class LambdaContext:
+    function_name = "slack_learning_app_ja"
+    invoked_function_arn = "arn:aws:lambda:ap-northeast-1:123456789012:function:slack_learning_app_ja"
+
+
+def build_event(body: str, content_type: str) -> dict:
+    timestamp = str(int(time.time()))
+    signature = hmac.new(
+        os.environ["SLACK_SIGNING_SECRET"].encode("utf-8"),
+        f"v0:{timestamp}:{body}".encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+    return {
+        "body": body,
+        "isBase64Encoded": False,
+        "headers": {
+            "content-type": content_type,
+            "x-slack-request-timestamp": timestamp,
+            "x-slack-signature": f"v0={signature}",
+        },
+        "requestContext": {"http": {"method": "POST"}},
+    }
+
+
+def load_events(path: str) -> List[dict]:
+    if path is not None:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return [
+        build_event(
+            json.dumps({"type": "url_verification", "challenge": "xxx", "token": "t"}),
+            "application/json",
+        ),
+        build_event("ssl_check=1&token=t", "application/x-www-form-urlencoded"),
+    ]
+
+
+def legacy_handler(event, context):
+    slack_handler = SlackRequestHandler(app=lambda_app.app)
+    return slack_handler.handle(event, context)
+
+
+def measure(handler, events: List[dict], iterations: int) -> float:
+    context = LambdaContext()
+    started = time.perf_counter()
+    for i in range(iterations):
+        response = handler(events[i % len(events)], context)
+        assert response["statusCode"] == 200, response
+    return (time.perf_counter() - started) / iterations
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    events = load_events(sys.argv[2] if len(sys.argv) > 2 else None)
+
+    before = measure(legacy_handler, events, iterations)
+    after = measure(lambda_app.handler, events, iterations)
+    print(f"events: {len(events)}, iterations: {iterations}")
+    print(f"new handler per invocation: {before * 1_000_000:8.1f} us/invocation")
+    print(f"shared handler:             {after * 1_000_000:8.1f} us/invocation")
@@ -0,0 +1,130 @@
+# Measures the per-request routing cost of app.dispatch as the number of listeners grows
+#
+#   python benchmarks/listener_routing.py [counts...]   (default: 20 100 250 500)
+#
+# For each count, this registers the app's listeners plus synthetic ones (str / regex
+# action_ids, views, events) to Bolt's App and IndexedApp, and dispatches signed requests:
+#   link_button   - the trivial ack, which IndexedApp answers before the authorization
+#   last action   - the last registered listener, which App finds after checking all of them
+#   regex action  - a listener registered with re.compile
+#   unhandled     - no listener matches (404)
+# Web API calls and authorize are stubbed as in benchmarks/replay.py.
+# The filler regex listeners make the regex scenario scan about 1/10 of the listeners.
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Callable, List
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SLACK_LAMBDA_PATH", "/slack/events")
+
+from slack_bolt import App  # noqa: E402
+from slack_sdk import WebClient  # noqa: E402
+
+from app.executors import ContextCopyingThreadPoolExecutor  # noqa: E402
+from app.listener_index import IndexedApp  # noqa: E402
+from app.listeners import register_listeners  # noqa: E402
+from replay import authorize, sign, signing_secret, stub_web_api  # noqa: E402
+
+form_headers = {"content-type": ["application/x-www-form-urlencoded"]}
+json_headers = {"content-type": ["application/json"]}
+
+
+def block_actions(action_id: str) -> dict:
+    payload = {
+        "type": "block_actions",
+        "team": {"id": "T111"},
+        "user": {"id": "U111", "team_id": "T111"},
+        "api_app_id": "A111",
+        "trigger_id": "111.222",
+        "container": {"type": "message", "channel_id": "C111", "message_ts": "111.222"},
+        "channel": {"id": "C111"},
+        "actions": [{"type": "button", "action_id": action_id, "block_id": "b", "value": "v"}],
+    }
+    return {"headers": form_headers, "body": f"payload={quote(json.dumps(payload))}"}
+
+
+def event_callback(event_type: str) -> dict:
+    body = {
+        "type": "event_callback",
+        "team_id": "T111",
+        "api_app_id": "A111",
+        "event": {"type": event_type, "user": "U111"},
+        "authorizations": [{"team_id": "T111", "user_id": "UBOT", "is_bot": True}],
+    }
+    return {"headers": json_headers, "body": json.dumps(body)}
+
+
+def filler_ack(ack):
+    ack()
+
+
+def build_app(app_class: Callable, listener_count: int, executor) -> App:
+    app = app_class(
+        signing_secret=signing_secret,
+        authorize=authorize,
+        client=WebClient(),
+        listener_executor=executor,
+        # Runs the listeners in the dispatching thread as lambda_app.py does;
+        # otherwise, Bolt's polling for the ack (10 ms intervals) hides the routing cost
+        process_before_response=True,
+    )
+    register_listeners(app)
+    for i in range(listener_count - len(app._listeners)):
+        if i % 10 == 8:
+            app.view(f"filler_view_{i}")(filler_ack)
+        elif i % 10 == 9:
+            app.event(f"filler_event_{i}")(filler_ack)
+        elif i % 10 == 7:
+            app.action(re.compile(f"filler_pattern_{i}_\\d+"))(filler_ack)
+        else:
+            app.action(f"filler_action_{i}")(filler_ack)
+    app.action("last_action")(filler_ack)
+    return app
+
+
+def measure(app: App, record: dict, iterations: int) -> List[float]:
+    durations = []
+    for _ in range(iterations):
+        request = sign(record["body"], record["headers"])
+        started = time.perf_counter()
+        response = app.dispatch(request)
+        durations.append(time.perf_counter() - started)
+        assert response.status in [200, 404], response.status
+    return durations
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    counts = [int(c) for c in sys.argv[1:]] or [20, 100, 250, 500]
+    iterations = 300
+    stub_web_api(0)
+    executor = ContextCopyingThreadPoolExecutor(max_workers=4)
+    scenarios = [
+        ("link_button", block_actions("link_button")),
+        ("last action", block_actions("last_action")),
+        ("regex action", block_actions("filler_pattern_7_3")),
+        ("unhandled", event_callback("reaction_added")),
+    ]
+    print(f"{'listeners':>9} {'request':<13} {'App p50':>10} {'Indexed p50':>12} {'speedup':>8}")
+    for count in counts:
+        apps = [build_app(App, count, executor), build_app(IndexedApp, count, executor)]
+        for name, record in scenarios:
+            p50s = []
+            for app in apps:
+                measure(app, record, 20)  # warm up
+                p50s.append(statistics.median(measure(app, record, iterations)))
+            print(
+                f"{len(apps[1]._listeners):>9} {name:<13} {p50s[0] * 1000:>7.3f} ms "
+                f"{p50s[1] * 1000:>9.3f} ms {p50s[0] / p50s[1]:>7.1f}x"
+            )
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# Sends signed requests to /slack/events and reports the requests per second
+#
+#   python benchmarks/load_test.py --start gunicorn [--concurrency 50] [--duration 10]
+#   python benchmarks/load_test.py --start dev
+#   python benchmarks/load_test.py --url http://localhost:3000/slack/events
+#
+# --start runs flask_app.py on a free port with dummy credentials and a temporary database,
+# either with gunicorn.conf.py or with Flask's debug server, and stops it afterwards.
+# Without --start, the requests go to --url, signed with SLACK_SIGNING_SECRET.
+# The default payload is url_verification, which goes through the signature verification and
+# the middleware of the app. --records sends the requests recorded by lambda_local_dev.py
+# instead (they need a workspace that has installed the app).
+import argparse
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+url_verification = {
+    "headers": {"content-type": ["application/json"]},
+    "body": json.dumps({"token": "load-test", "challenge": "load-test", "type": "url_verification"}),
+}
+
+
+def sign(signing_secret: str, body: str, headers: Dict[str, List[str]]) -> Dict[str, str]:
+    timestamp = str(int(time.time()))
+    signature = hmac.new(
+        signing_secret.encode("utf-8"),
+        f"v0:{timestamp}:{body}".encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+    signed = {k: v[0] for k, v in headers.items() if k.lower() in ["content-type"]}
+    signed["x-slack-request-timestamp"] = timestamp
+    signed["x-slack-signature"] = f"v0={signature}"
+    return signed
+
+
+def percentiles(values: List[float]) -> str:
+    values = sorted(values)
+    if len(values) == 0:
+        return "-"
+    result = []
+    for p in [0.5, 0.9, 0.99]:
+        result.append(f"p{int(p * 100)}: {values[min(len(values) - 1, int(len(values) * p))] * 1000:7.1f} ms")
+    return ", ".join(result)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode: str, port: int, signing_secret: str, tmp_dir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(
+        {
+            "PORT": str(port),
+            "SLACK_SIGNING_SECRET": signing_secret,
+            "SLACK_CLIENT_ID": "111.222",
+            "SLACK_CLIENT_SECRET": "load-test",
+            "SLACK_SCOPES": "commands,chat:write",
+            "SLACK_SQLITE_DB": f"{tmp_dir}/slack_app.db",
+        }
+    )
+    env.setdefault("SLACK_LAMBDA_PATH", "/slack/install")
+    if mode == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+    else:
+        command = [sys.executable, "flask_app.py"]
+    process = subprocess.Popen(
+        command,
+        cwd=project_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,  # to stop the reloader's child process as well
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline and process.poll() is None:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/slack/install")
+            conn.getresponse().read()
+            conn.close()
+            time.sleep(2)  # the other workers
+            return process
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"The {mode} server did not start")
+
+
+def stop_server(process: subprocess.Popen):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def run(url: str, records: List[dict], signing_secret: str, args):
+    target = urlparse(url)
+    latencies: List[float] = []
+    statuses: Dict[object, int] = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def client(n: int):
+        conn: Optional[http.client.HTTPConnection] = None
+        i = n
+        while time.perf_counter() < deadline:
+            record = records[i % len(records)]
+            i += 1
+            headers = sign(signing_secret, record["body"], record["headers"])
+            if args.no_keepalive:
+                headers["connection"] = "close"
+            started = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=10)
+                conn.request("POST", target.path, body=record["body"].encode("utf-8"), headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                if args.no_keepalive or response.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                if conn is not None:
+                    conn.close()
+                conn = None
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+        if conn is not None:
+            conn.close()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(args.concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    keepalive = "off" if args.no_keepalive else "on"
+    print(f"{url} (concurrency: {args.concurrency}, keep-alive: {keepalive})")
+    print(f"  statuses: {dict(statuses)}")
+    print(f"  throughput: {len(latencies) / elapsed:,.1f} req/sec")
+    print(f"  latency: {percentiles(latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start", choices=["gunicorn", "dev"], default=None)
+    parser.add_argument("--url", default="http://localhost:3000/slack/events")
+    parser.add_argument("--records", default=None, help="JSONL file of recorded requests")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--no-keepalive", action="store_true")
+    args = parser.parse_args()
+
+    records = [url_verification]
+    if args.records:
+        with open(args.records) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    if args.start is None:
+        run(args.url, records, os.environ["SLACK_SIGNING_SECRET"], args)
+        return
+    signing_secret = "load-test-signing-secret"
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        process = start_server(args.start, port, signing_secret, tmp_dir)
+        try:
+            print(f"server: {args.start}")
+            run(f"http://127.0.0.1:{port}/slack/events", records, signing_secret, args)
+        finally:
+            stop_server(process)
+
+
+if __name__ == "__main__":
+    main()
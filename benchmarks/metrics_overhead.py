@@ -0,0 +1,135 @@
+# Measures the overhead of the latency histograms in app/metrics.py
+#
+#   python benchmarks/metrics_overhead.py [iterations]   (default: 3000)
+#
+# Dispatches the same signed requests to the app with and without instrument_app /
+# handle_with_metrics, and reports the p50 of each. Web API calls go through the
+# ScheduledWebClient stubbed as in benchmarks/replay.py, so every request also
+# records web_api_latency. The EMF documents and the Prometheus text are printed at the end.
+# The exit code is 1 when a request is recorded without its listener's name.
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SLACK_LAMBDA_PATH", "/slack/events")
+
+from app import metrics as app_metrics  # noqa: E402
+from app.executors import ContextCopyingThreadPoolExecutor  # noqa: E402
+from app.listener_index import IndexedApp  # noqa: E402
+from app.web_api_scheduler import method_rate_limits  # noqa: E402
+from listener_routing import block_actions, build_app, event_callback  # noqa: E402
+from replay import sign, stub_web_api  # noqa: E402
+
+
+def app_home_opened() -> dict:
+    record = event_callback("app_home_opened")
+    body = json.loads(record["body"])
+    body["event"].update({"tab": "home", "channel": "D111"})
+    return {"headers": record["headers"], "body": json.dumps(body)}
+
+
+# The lazy listener's invocation on AWS Lambda
+def lazy_only(record: dict, function_name: str) -> dict:
+    headers = dict(record["headers"])
+    headers["x-slack-bolt-lazy-only"] = ["1"]
+    headers["x-slack-bolt-lazy-function-name"] = [function_name]
+    return {"headers": headers, "body": record["body"]}
+
+
+# The app runs the listeners in a copy of the context (app/listener_index.py),
+# and handle_with_metrics still has to find which listener handled the request
+def check_listener_labels(dispatch: Callable, cases: List[Tuple[dict, Tuple[str, str]]]) -> List[str]:
+    errors = []
+    for record, expected in cases:
+        app_metrics.metrics.drain()
+        dispatch(sign(record["body"], record["headers"]))
+        recorded = [
+            (name, dict(labels).get("listener"))
+            for name, labels in app_metrics.metrics.drain()
+            if name != "web_api_latency"
+        ]
+        if expected not in recorded:
+            errors.append(f"expected {expected} but recorded {recorded}")
+    return errors
+
+
+def measure(dispatch: Callable, records: List[dict], iterations: int) -> List[float]:
+    durations = []
+    for i in range(iterations):
+        record = records[i % len(records)]
+        request = sign(record["body"], record["headers"])
+        started = time.perf_counter()
+        dispatch(request)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    stub_web_api(0)
+    # All the requests come from the same workspace
+    for api_method in method_rate_limits:
+        method_rate_limits[api_method] = 1000000
+    executor = ContextCopyingThreadPoolExecutor(max_workers=4)
+    records = [
+        block_actions("link_button"),
+        block_actions("last_action"),
+        # users.info and views.publish through the ScheduledWebClient
+        app_home_opened(),
+        event_callback("reaction_added"),
+    ]
+
+    plain = build_app(IndexedApp, 0, executor)
+    instrumented = build_app(IndexedApp, 0, executor)
+    app_metrics.instrument_app(instrumented)
+
+    def dispatch_with_metrics(request):
+        return app_metrics.handle_with_metrics(instrumented.dispatch, request)
+
+    errors = check_listener_labels(
+        dispatch_with_metrics,
+        [
+            # Before the others, which start the lazy listeners in the executor
+            (
+                lazy_only(app_home_opened(), "app_home_opened_lazy"),
+                ("lazy_listener_latency", "app_home_opened_lazy"),
+            ),
+            (block_actions("last_action"), ("listener_ack_latency", "filler_ack")),
+            (app_home_opened(), ("listener_ack_latency", "app_home_opened")),
+        ],
+    )
+    for error in errors:
+        print(f"FAILED {error}")
+    if errors:
+        sys.exit(1)
+
+    for name, dispatch in [("plain", plain.dispatch), ("metrics", dispatch_with_metrics)]:
+        measure(dispatch, records, 100)  # warm up
+        durations = measure(dispatch, records, iterations)
+        print(f"{name:<8} p50: {statistics.median(durations) * 1000:.3f} ms")
+
+    histogram = app_metrics.Histogram()
+    started = time.perf_counter()
+    for i in range(100000):
+        histogram.record(i / 100)
+    print(f"Histogram.record: {(time.perf_counter() - started) * 10:.2f} us")
+    print(f"p99 of 0..1000 ms: {histogram.percentile(99):.2f} ms ({len(histogram.counts)} buckets)")
+
+    executor.shutdown(wait=True)
+    print("\n--- Prometheus ---")
+    print(app_metrics.to_prometheus_text()[:1500])
+    print("--- EMF ---")
+    output = io.StringIO()
+    app_metrics.flush_emf(output.write)
+    print(output.getvalue()[:1500])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Measures the S3 round trips of an OAuth callback and of the first event after it
+#
+#   python benchmarks/oauth_s3_io.py [--latency 0.02] [--endpoint-url http://localhost:5000]
+#
+# By default, this uses the filesystem-backed FakeS3Client with the given latency.
+# With --endpoint-url, this uses boto3 against a local S3 stand-in such as a moto server
+# (the buckets are created if they don't exist).
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slack_sdk.oauth.installation_store import Installation  # noqa: E402
+from slack_sdk.oauth.installation_store.amazon_s3 import AmazonS3InstallationStore  # noqa: E402
+from slack_sdk.oauth.installation_store.cacheable_installation_store import (  # noqa: E402
+    CacheableInstallationStore,
+)
+from slack_sdk.oauth.state_store.amazon_s3 import AmazonS3OAuthStateStore  # noqa: E402
+
+from app.installation_stores import (  # noqa: E402
+    ConcurrentS3InstallationStore,
+    ConcurrentS3OAuthStateStore,
+    WriteThroughInstallationStore,
+    s3_io,
+)
+from fake_s3 import FakeS3Client  # noqa: E402
+
+state_bucket, installation_bucket = "fake-state", "fake-installations"
+
+
+def build_installation(i: int) -> Installation:
+    return Installation(
+        app_id="A111",
+        enterprise_id=None,
+        team_id=f"T{i:08d}",
+        user_id="U111",
+        bot_token=f"xoxb-{i}",
+        bot_id="B111",
+        bot_user_id="UB111",
+        bot_scopes="chat:write,commands",
+    )
+
+
+# consumes the state, saves the installation, and then authorizes the first event
+def run_callback(state_store, installation_store, i: int) -> float:
+    state = state_store.issue()
+    started = time.perf_counter()
+    assert state_store.consume(state)
+    installation_store.save(build_installation(i))
+    s3_io.wait()  # done by the Lambda handler before returning the response
+    bot = installation_store.find_bot(enterprise_id=None, team_id=f"T{i:08d}")
+    assert bot is not None and bot.bot_token == f"xoxb-{i}"
+    return time.perf_counter() - started
+
+
+def measure(name: str, s3_client, state_store, installation_store, iterations: int):
+    calls = getattr(s3_client, "calls", None)
+    durations = sorted(run_callback(state_store, installation_store, i) for i in range(iterations))
+    p50 = durations[len(durations) // 2] * 1000
+    summary = f"{name}: p50 {p50:7.1f} ms, max {durations[-1] * 1000:7.1f} ms"
+    if calls is not None:
+        per_callback = (s3_client.calls - calls) / iterations - 1  # without issue()
+        summary += f", {per_callback:.0f} S3 calls, max concurrency {s3_client.max_concurrency}"
+    print(summary)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--endpoint-url")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    def build_client():
+        if args.endpoint_url:
+            import boto3
+
+            client = boto3.client("s3", endpoint_url=args.endpoint_url)
+            for bucket in [state_bucket, installation_bucket]:
+                try:
+                    client.create_bucket(Bucket=bucket)
+                except client.exceptions.BucketAlreadyOwnedByYou:
+                    pass
+            return client
+        return FakeS3Client(base_dir=tempfile.mkdtemp(), latency=args.latency)
+
+    s3 = build_client()
+    measure(
+        "before",
+        s3,
+        AmazonS3OAuthStateStore(s3_client=s3, bucket_name=state_bucket, expiration_seconds=600),
+        CacheableInstallationStore(
+            AmazonS3InstallationStore(
+                s3_client=s3, bucket_name=installation_bucket, client_id="111.222"
+            )
+        ),
+        args.iterations,
+    )
+    s3 = build_client()
+    measure(
+        "after ",
+        s3,
+        ConcurrentS3OAuthStateStore(
+            s3_client=s3, bucket_name=state_bucket, expiration_seconds=600
+        ),
+        WriteThroughInstallationStore(
+            ConcurrentS3InstallationStore(
+                s3_client=s3, bucket_name=installation_bucket, client_id="111.222"
+            )
+        ),
+        args.iterations,
+    )
@@ -0,0 +1,112 @@
+# Measures the external select data source with large option catalogs
+#
+#   python benchmarks/options_index.py [sizes...]   (default: 10000 100000 1000000)
+#
+# For each size, this builds an OptionsIndex over synthetic English / Japanese options
+# and replays typeahead keystrokes ("c", "ca", "cat", ...) against it and
+# against the legacy linear scan. Slack waits for the options only 3 seconds.
+# The cached replay simulates many users typing the same popular keywords through
+# the OptionsResultCache that external_data_source_handler uses.
+import os
+import random
+import resource
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.options_index import OptionsIndex, OptionsResultCache  # noqa: E402
+
+adjectives = ["black", "white", "small", "large", "fluffy", "sleepy", "happy", "brave"]
+nouns = ["cat", "dog", "bear", "fox", "rabbit", "panda", "tiger", "whale", "otter"]
+ja_nouns = ["ネコ", "イヌ", "クマ", "キツネ", "ウサギ", "パンダ", "トラ", "クジラ", "カワウソ"]
+ja_adjectives = ["くろい", "しろい", "ちいさな", "おおきな", "ねむい", "げんきな"]
+
+
+def build_catalog(size: int) -> List[Tuple[str, str]]:
+    rand = random.Random(size)
+    options = []
+    for i in range(size):
+        if i % 2 == 0:
+            text = f"{rand.choice(adjectives).title()} {rand.choice(nouns).title()} #{i}"
+        else:
+            text = f"{rand.choice(ja_adjectives)}{rand.choice(ja_nouns)} No.{i}"
+        options.append((f"option-{i}", text))
+    return options
+
+
+def build_keywords(options: List[Tuple[str, str]], count: int) -> List[str]:
+    rand = random.Random(count)
+    keywords = []
+    while len(keywords) < count:
+        text = rand.choice(options)[1]
+        start = rand.choice([0, 0, 0, text.find(" ") + 1])
+        for length in range(1, 6):  # keystrokes
+            keywords.append(text[start : start + length])
+    # full-width / half-width / hiragana variants
+    keywords += ["ＣＡＴ", "ﾈｺ", "ねこ", "きつね", "No.12", "#99"]
+    return keywords
+
+
+def legacy_search(options: List[dict], keyword: str) -> List[dict]:
+    return [o for o in options if keyword in o["text"]["text"]]
+
+
+def percentiles(values: List[float]) -> str:
+    values = sorted(values)
+    result = []
+    for p in [0.5, 0.99, 1.0]:
+        value = values[min(len(values) - 1, int(len(values) * p))]
+        result.append(f"p{int(p * 100)}: {value * 1000:7.3f} ms")
+    return ", ".join(result)
+
+
+def run(size: int):
+    options = build_catalog(size)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    index = OptionsIndex(options)
+    built = time.perf_counter() - started
+    memory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024
+    print(f"options: {size:,} (index built in {built:.2f} s, +{memory:,.0f} MB max RSS)")
+
+    keywords = build_keywords(options, 1000)
+    durations = []
+    for keyword in keywords:
+        started = time.perf_counter()
+        index.search(keyword)
+        durations.append(time.perf_counter() - started)
+    print(f"  index  ({len(keywords)} keystrokes): {percentiles(durations)}")
+
+    cache = OptionsResultCache()
+    rand = random.Random(size)
+    popular = keywords[:200]
+    durations = []
+    for _ in range(5000):
+        keyword = rand.choice(popular if rand.random() < 0.8 else keywords)
+        started = time.perf_counter()
+        cache.search("benchmark", index, keyword)
+        durations.append(time.perf_counter() - started)
+    stats = cache.stats()
+    print(
+        f"  cached (5000 keystrokes): {percentiles(durations)} "
+        f"(hit rate: {stats['hit_rate']:.0%}, narrowed: {stats['narrowed']}, misses: {stats['misses']})"
+    )
+
+    option_dicts = [
+        {"text": {"type": "plain_text", "text": t}, "value": v} for v, t in options
+    ]
+    legacy_keywords = keywords[: max(20, 1_000_000 // size * 5)]
+    durations = []
+    for keyword in legacy_keywords:
+        started = time.perf_counter()
+        legacy_search(option_dicts, keyword)
+        durations.append(time.perf_counter() - started)
+    print(f"  legacy ({len(legacy_keywords)} keystrokes): {percentiles(durations)}")
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,191 @@
+# Replays recorded requests through app.dispatch without Slack or AWS
+#
+#   SLACK_RECORD_REQUESTS_FILE=recorded_requests.jsonl python lambda_app.py
+#   python benchmarks/replay.py recorded_requests.jsonl [--concurrency 10] [--repeat 10]
+#
+# Web API calls are answered locally after --api-latency seconds.
+# With --base-url, they are sent to a running benchmarks/fake_slack_api.py instead.
+# The report shows the throughput, ack latency percentiles,
+# and the completion time of each lazy listener.
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SLACK_LAMBDA_PATH", "/slack/events")
+
+import logging  # noqa: E402
+
+from slack_bolt import BoltRequest  # noqa: E402
+from slack_bolt.authorization import AuthorizeResult  # noqa: E402
+from slack_bolt.lazy_listener import ThreadLazyListenerRunner  # noqa: E402
+from slack_bolt.lazy_listener.internals import build_runnable_function  # noqa: E402
+from slack_sdk import WebClient  # noqa: E402
+from slack_sdk.web import SlackResponse  # noqa: E402
+from slack_sdk.webhook import WebhookClient, WebhookResponse  # noqa: E402
+
+from app.executors import ContextCopyingThreadPoolExecutor  # noqa: E402
+from app.listener_index import IndexedApp  # noqa: E402
+from app.listeners import register_listeners  # noqa: E402
+
+signing_secret = "replay-signing-secret"
+
+canned_responses = {
+    "auth.test": {"user_id": "UBOT", "bot_id": "BBOT", "team_id": "T111"},
+    "bots.info": {"bot": {"id": "BBOT", "app_id": "A111"}},
+    "conversations.create": {"channel": {"id": "C111"}},
+    "users.info": {"user": {"id": "U111", "locale": "ja-JP"}},
+}
+
+
+def stub_web_api(latency: float, stub_web_client: bool = True):
+    def api_call(self, api_method: str, *, http_verb: str = "POST", **kwargs):
+        time.sleep(latency)
+        data = {"ok": True}
+        data.update(canned_responses.get(api_method, {}))
+        return SlackResponse(
+            client=self,
+            http_verb=http_verb,
+            api_url=self.base_url + api_method,
+            req_args=kwargs,
+            data=data,
+            headers={},
+            status_code=200,
+        )
+
+    def send_dict(self, body: dict, headers=None):
+        time.sleep(latency)
+        return WebhookResponse(url=self.url, status_code=200, body="ok", headers={})
+
+    if stub_web_client:
+        WebClient.api_call = api_call
+    WebhookClient.send_dict = send_dict
+
+
+def authorize(enterprise_id, team_id, user_id):
+    return AuthorizeResult(
+        enterprise_id=enterprise_id,
+        team_id=team_id,
+        bot_token="xoxb-replay",
+        bot_id="BBOT",
+        bot_user_id="UBOT",
+    )
+
+
+class TimedLazyListenerRunner(ThreadLazyListenerRunner):
+    def __init__(self, logger, executor):
+        super().__init__(logger=logger, executor=executor)
+        self.lock = threading.Lock()
+        self.futures = []
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+
+    def start(self, function, request: BoltRequest) -> None:
+        runnable = build_runnable_function(
+            func=function, logger=self.logger, request=request
+        )
+        started = time.perf_counter()
+
+        def run():
+            runnable()
+            with self.lock:
+                self.durations[function.__name__].append(time.perf_counter() - started)
+
+        with self.lock:
+            self.futures.append(self.executor.submit(run))
+
+
+def sign(body: str, headers: Dict[str, List[str]]) -> BoltRequest:
+    timestamp = str(int(time.time()))
+    signature = hmac.new(
+        signing_secret.encode("utf-8"),
+        f"v0:{timestamp}:{body}".encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+    headers = dict(headers)
+    headers["x-slack-request-timestamp"] = [timestamp]
+    headers["x-slack-signature"] = [f"v0={signature}"]
+    return BoltRequest(body=body, headers=headers)
+
+
+def percentiles(values: List[float]) -> str:
+    values = sorted(values)
+    if len(values) == 0:
+        return "-"
+    result = []
+    for p in [0.5, 0.9, 0.99]:
+        result.append(f"p{int(p * 100)}: {values[min(len(values) - 1, int(len(values) * p))] * 1000:7.1f} ms")
+    return ", ".join(result)
+
+
+def replay(
+    records: List[dict],
+    concurrency: int,
+    repeat: int,
+    api_latency: float,
+    base_url: Optional[str] = None,
+):
+    stub_web_api(api_latency, stub_web_client=base_url is None)
+    executor = ContextCopyingThreadPoolExecutor(max_workers=concurrency * 4)
+    app = IndexedApp(
+        signing_secret=signing_secret,
+        authorize=authorize,
+        client=WebClient(base_url=base_url or WebClient.BASE_URL),
+        listener_executor=executor,
+    )
+    register_listeners(app)
+    lazy_runner = TimedLazyListenerRunner(logger=app.logger, executor=executor)
+    app.listener_runner.lazy_listener_runner = lazy_runner
+
+    ack_latencies: List[float] = []
+    statuses: Dict[int, int] = defaultdict(int)
+    lock = threading.Lock()
+
+    def dispatch(record: dict):
+        request = sign(record["body"], record["headers"])
+        started = time.perf_counter()
+        response = app.dispatch(request)
+        elapsed = time.perf_counter() - started
+        with lock:
+            ack_latencies.append(elapsed)
+            statuses[response.status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as dispatchers:
+        for _ in range(repeat):
+            for record in records:
+                dispatchers.submit(dispatch, record)
+    acked = time.perf_counter() - started
+    wait(lazy_runner.futures)
+    completed = time.perf_counter() - started
+    executor.shutdown()
+
+    api = base_url or f"stub ({api_latency * 1000:.0f} ms)"
+    print(f"requests: {len(ack_latencies)}, concurrency: {concurrency}, api: {api}")
+    print(f"statuses: {dict(statuses)}")
+    print(f"throughput: {len(ack_latencies) / acked:,.1f} acks/sec ({len(ack_latencies) / completed:,.1f} req/sec including lazy listeners)")
+    print(f"ack latency: {percentiles(ack_latencies)}")
+    for name, durations in sorted(lazy_runner.durations.items()):
+        print(f"  {name} ({len(durations)}): {percentiles(durations)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    parser.add_argument("--base-url", default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with open(args.path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    replay(records, args.concurrency, args.repeat, args.api_latency, args.base_url)
@@ -0,0 +1,146 @@
+# Measures the installation lookups of flask_app.py's stores with many workspaces
+#
+#   python benchmarks/sqlite_installation_store.py [--workspaces 100000] [--lookups 2000]
+#
+# The same installations are saved to Bolt's default FileInstallationStore and to an SQLite
+# database, which is read by slack_sdk's SQLite3InstallationStore (a new connection per query)
+# and by SQLiteInstallationStore. Then this measures the OAuth state store, including the
+# deletion of expired states.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slack_sdk.oauth.installation_store import FileInstallationStore, Installation  # noqa: E402
+from slack_sdk.oauth.installation_store.sqlite3 import SQLite3InstallationStore  # noqa: E402
+from slack_sdk.oauth.state_store.sqlite3 import SQLite3OAuthStateStore  # noqa: E402
+
+from app.installation_stores import (  # noqa: E402
+    SQLiteInstallationStore,
+    SQLiteOAuthStateStore,
+)
+
+client_id = "111.222"
+
+
+def build_installation(i: int) -> Installation:
+    return Installation(
+        app_id="A111",
+        enterprise_id=f"E{i % 100:04d}" if i % 10 == 0 else None,
+        team_id=f"T{i:08d}",
+        user_id=f"U{i:08d}",
+        bot_id=f"B{i:08d}",
+        bot_user_id=f"W{i:08d}",
+        bot_token=f"xoxb-{i}",
+        bot_scopes=["chat:write", "commands"],
+    )
+
+
+def percentiles(values: List[float]) -> str:
+    values = sorted(values)
+    result = []
+    for p in [0.5, 0.99]:
+        value = values[min(len(values) - 1, int(len(values) * p))]
+        result.append(f"p{int(p * 100)}: {value * 1000:6.3f} ms")
+    return ", ".join(result)
+
+
+def measure(name: str, lookups: List[int], find: Callable[[Installation], object]):
+    durations = []
+    for i in lookups:
+        installation = build_installation(i)
+        started = time.perf_counter()
+        assert find(installation) is not None
+        durations.append(time.perf_counter() - started)
+    print(f"  {name:44} {percentiles(durations)}")
+
+
+def run_installations(tmp_dir: str, args):
+    database = f"{tmp_dir}/installations.db"
+    file_store = FileInstallationStore(base_dir=f"{tmp_dir}/files", client_id=client_id)
+    sqlite_store = SQLiteInstallationStore(database=database, client_id=client_id)
+    stores = [
+        ("FileInstallationStore", file_store),
+        ("SQLite3InstallationStore", SQLite3InstallationStore(database=database, client_id=client_id)),
+        ("SQLiteInstallationStore", sqlite_store),
+    ]
+    started = time.perf_counter()
+    for i in range(args.workspaces):
+        installation = build_installation(i)
+        sqlite_store.save(installation)
+        if not args.skip_files:
+            file_store.save(installation)
+    print(f"saved {args.workspaces:,} workspaces in {time.perf_counter() - started:.1f} s")
+
+    lookups = random.Random(1).choices(range(args.workspaces), k=args.lookups)
+    for name, store in stores:
+        if args.skip_files and isinstance(store, FileInstallationStore):
+            continue
+        print(f"{name}:")
+        measure(
+            "find_bot",
+            lookups,
+            lambda i: store.find_bot(enterprise_id=i.enterprise_id, team_id=i.team_id),
+        )
+        measure(
+            "find_installation",
+            lookups,
+            lambda i: store.find_installation(enterprise_id=i.enterprise_id, team_id=i.team_id),
+        )
+        measure(
+            "find_installation (user_id)",
+            lookups,
+            lambda i: store.find_installation(
+                enterprise_id=i.enterprise_id, team_id=i.team_id, user_id=i.user_id
+            ),
+        )
+
+
+def run_states(tmp_dir: str, args):
+    for name, store in [
+        ("SQLite3OAuthStateStore", SQLite3OAuthStateStore(database=f"{tmp_dir}/s1.db", expiration_seconds=600)),
+        ("SQLiteOAuthStateStore", SQLiteOAuthStateStore(database=f"{tmp_dir}/s2.db", expiration_seconds=600)),
+    ]:
+        # Abandoned OAuth flows, which have expired
+        store.expiration_seconds = -1
+        if isinstance(store, SQLiteOAuthStateStore):
+            store._last_cleanup = time.time()
+        for _ in range(args.expired_states):
+            store.issue()
+        store.expiration_seconds = 600
+        print(f"{name} ({args.expired_states:,} expired states):")
+        issued, consumed = [], []
+        for _ in range(args.lookups // 10):
+            started = time.perf_counter()
+            state = store.issue()
+            issued.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            assert store.consume(state)
+            consumed.append(time.perf_counter() - started)
+        print(f"  {'issue':44} {percentiles(issued)}")
+        print(f"  {'consume':44} {percentiles(consumed)}")
+        if isinstance(store, SQLiteOAuthStateStore):
+            started = time.perf_counter()
+            deleted = store.delete_expired_states()
+            print(f"  deleted {deleted:,} expired states in {time.perf_counter() - started:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workspaces", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--expired-states", type=int, default=100_000)
+    parser.add_argument("--skip-files", action="store_true", help="skip FileInstallationStore")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_installations(tmp_dir, args)
+        run_states(tmp_dir, args)
+
+
+if __name__ == "__main__":
+    main()
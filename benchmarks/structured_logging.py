@@ -0,0 +1,71 @@
+# Measures the cost of logging the tutorial modals
+#
+#   python benchmarks/structured_logging.py [iterations]   (default: 2000)
+#
+# Compares logger.info(json.dumps(modal)) with DEBUG-everywhere (the former setup) to
+# logger.info(structured(...)) through configure_logging with INFO, the field size cap,
+# and sampling rates. The handler writes to a discarded stream, so the numbers are
+# the serialization and formatting cost that Lambda pays before CloudWatch ingestion.
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.structured_logging import configure_logging, structured  # noqa: E402
+from app.tutorials import build_page2_modal, build_page4_create_channel_modal  # noqa: E402
+
+logger = logging.getLogger("benchmark")
+
+
+def page2_modal_lazy(modal: dict, structured_log: bool):
+    if structured_log:
+        logger.info(structured("Opening a modal", view=modal))
+    else:
+        logger.info(json.dumps(modal))
+
+
+def reset_logging(stream: io.StringIO, level: str, sample_rates: str):
+    os.environ["SLACK_LOG_LEVEL"] = level
+    os.environ["SLACK_LOG_SAMPLE_RATES"] = sample_rates
+    configure_logging(force=True)
+    logging.getLogger().handlers[0].setStream(stream)
+
+
+def run(name: str, modal: dict, iterations: int, structured_log: bool, stream: io.StringIO):
+    stream.seek(0)
+    stream.truncate()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        page2_modal_lazy(modal, structured_log)
+    elapsed = time.perf_counter() - started
+    print(
+        f"  {name:<36} {elapsed / iterations * 1000000:8.1f} us/call "
+        f"{len(stream.getvalue()) / iterations:8.0f} bytes/call"
+    )
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    modals = {
+        "page2 modal": build_page2_modal(),
+        "page4 modal": build_page4_create_channel_modal("U111"),
+    }
+    stream = io.StringIO()
+    for modal_name, modal in modals.items():
+        print(f"{modal_name} ({len(json.dumps(modal))} chars)")
+        reset_logging(stream, "DEBUG", "")
+        run("json.dumps, DEBUG", modal, iterations, False, stream)
+        run("structured, DEBUG, capped", modal, iterations, True, stream)
+        reset_logging(stream, "DEBUG", "page2_modal_lazy:0.1")
+        run("structured, DEBUG, capped, 10% sampled", modal, iterations, True, stream)
+        reset_logging(stream, "WARNING", "")
+        run("json.dumps, WARNING", modal, iterations, False, stream)
+        run("structured, WARNING", modal, iterations, True, stream)
+
+
+if __name__ == "__main__":
+    main()
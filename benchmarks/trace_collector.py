@@ -0,0 +1,148 @@
+# A local stand-in for an OpenTelemetry collector, which receives the spans of app/tracing.py
+#
+#   python benchmarks/trace_collector.py --port 4318 [--output traces.jsonl]
+#   SLACK_TRACE_OTLP_ENDPOINT=http://localhost:4318/v1/traces python lambda_app.py
+#
+#   python benchmarks/trace_collector.py --show traces.jsonl
+#
+# The collector accepts OTLP/HTTP JSON at /v1/traces, appends the requests to --output,
+# and prints each trace as a tree once no more spans arrive for it for a second.
+# --show prints the traces in a file written by the collector or by SLACK_TRACE_FILE.
+# The tree shows the offset from the start of the trace and the duration of each span;
+# "*" marks the spans on the critical path (the child that finishes last at each level).
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+def to_spans(request: dict) -> List[dict]:
+    spans = []
+    for resource_spans in request.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            spans.extend(scope_spans.get("spans", []))
+    return spans
+
+
+def attributes_of(span: dict) -> Dict[str, object]:
+    result = {}
+    for attribute in span.get("attributes", []):
+        value = attribute["value"]
+        result[attribute["key"]] = next(iter(value.values())) if value else None
+    return result
+
+
+def print_trace(trace_id: str, spans: List[dict]):
+    by_id = {s["spanId"]: s for s in spans}
+    children: Dict[Optional[str], List[dict]] = defaultdict(list)
+    for span in spans:
+        parent = span.get("parentSpanId")
+        children[parent if parent in by_id else None].append(span)
+    started = min(int(s["startTimeUnixNano"]) for s in spans)
+    ended = max(int(s["endTimeUnixNano"]) for s in spans)
+    print(f"trace {trace_id} ({len(spans)} spans, {(ended - started) / 1e6:.1f} ms)")
+
+    def show(span: dict, depth: int, critical: bool):
+        start = (int(span["startTimeUnixNano"]) - started) / 1e6
+        duration = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+        attributes = attributes_of(span)
+        notes = []
+        if attributes.get("faas.coldstart") is True:
+            notes.append("cold start")
+        if span.get("status", {}).get("code") == 2:
+            notes.append(f"error: {span['status'].get('message')}")
+        mark = "*" if critical else " "
+        note = f"  ({', '.join(notes)})" if notes else ""
+        print(f"  {mark} {start:9.1f} ms {duration:9.1f} ms  {'  ' * depth}{span['name']}{note}")
+        nested = sorted(children.get(span["spanId"], []), key=lambda s: int(s["startTimeUnixNano"]))
+        last = max(nested, key=lambda s: int(s["endTimeUnixNano"]), default=None)
+        for child in nested:
+            show(child, depth + 1, critical and child is last)
+
+    roots = sorted(children[None], key=lambda s: int(s["startTimeUnixNano"]))
+    last_root = max(roots, key=lambda s: int(s["endTimeUnixNano"]))
+    for root in roots:
+        show(root, 0, root is last_root)
+
+
+def print_traces(spans: List[dict]):
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    for span in spans:
+        traces[span["traceId"]].append(span)
+    for trace_id, trace_spans in traces.items():
+        print_trace(trace_id, trace_spans)
+
+
+class Collector:
+    def __init__(self, output: Optional[str], quiet_seconds: float = 1.0):
+        self.output = output
+        self.quiet_seconds = quiet_seconds
+        self.traces: Dict[str, List[dict]] = defaultdict(list)
+        self.updated_at: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def receive(self, request: dict):
+        with self.lock:
+            if self.output:
+                with open(self.output, "a") as f:
+                    f.write(json.dumps(request, separators=(",", ":")) + "\n")
+            for span in to_spans(request):
+                self.traces[span["traceId"]].append(span)
+                self.updated_at[span["traceId"]] = time.monotonic()
+
+    def print_finished_traces(self):
+        while True:
+            time.sleep(0.2)
+            with self.lock:
+                now = time.monotonic()
+                finished = [t for t, at in self.updated_at.items() if now - at >= self.quiet_seconds]
+                traces = [(t, self.traces.pop(t)) for t in finished]
+                for trace_id in finished:
+                    del self.updated_at[trace_id]
+            for trace_id, spans in traces:
+                print_trace(trace_id, spans)
+
+
+def serve(port: int, collector: Collector):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path != "/v1/traces":
+                self.send_response(404)
+                self.end_headers()
+                return
+            collector.receive(json.loads(body))
+            response = b"{}"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, format, *args):
+            pass
+
+    threading.Thread(target=collector.print_finished_traces, daemon=True).start()
+    print(f"Receiving spans at http://localhost:{port}/v1/traces")
+    ThreadingHTTPServer(("0.0.0.0", port), Handler).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--show", default=None, help="JSONL file of OTLP/JSON requests")
+    args = parser.parse_args()
+    if args.show:
+        with open(args.show) as f:
+            spans = [s for line in f if line.strip() for s in to_spans(json.loads(line))]
+        print_traces(spans)
+        return
+    serve(args.port, Collector(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Measures how many Home tab views tutorial_view() can build per second
+#
+#   python benchmarks/tutorial_view.py
+#
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SLACK_LAMBDA_PATH", "/slack/events")
+
+from app.i18n import current_lang, i18n  # noqa: E402
+from app.tutorials import build_pager_block, load_pages, tutorial_view  # noqa: E402
+
+pages = load_pages(current_lang())
+
+
+# The implementation before the per-page blocks were cached
+def legacy_tutorial_view(page: int) -> dict:
+    page_content = []
+    if page <= len(pages):
+        page_content = pages[page - 1]
+
+    tz = datetime.timezone(datetime.timedelta(hours=+9), "JST")
+    now = datetime.datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
+    blocks = page_content + [
+        {"type": "divider"},
+        build_pager_block(page),
+        {"type": "divider"},
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "plain_text",
+                    "text": i18n(f"Last Updated: {now}, JST", f"最終更新日時: {now}, JST"),
+                }
+            ],
+        },
+    ]
+    return {"type": "home", "blocks": blocks}
+
+
+def views_per_second(build, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        build(i % len(pages) + 1)
+    return iterations / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    assert legacy_tutorial_view(3)["blocks"][:-1] == tutorial_view(3)["blocks"][:-1]
+
+    before = views_per_second(legacy_tutorial_view, iterations)
+    after = views_per_second(tutorial_view, iterations)
+    print(f"language: {current_lang()}, iterations: {iterations}")
+    print(f"before: {before:>12,.0f} views/sec")
+    print(f"after:  {after:>12,.0f} views/sec ({after / before:.2f}x)")
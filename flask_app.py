@@ -1,28 +1,51 @@
-import logging
-logging.basicConfig(level=logging.DEBUG)
+from app.structured_logging import configure_logging
+configure_logging()
 
 import os
+import time
 
-from slack_bolt import App
 from slack_bolt.oauth.callback_options import CallbackOptions
 from slack_bolt.oauth.oauth_settings import OAuthSettings
+from slack_sdk.oauth.state_utils import OAuthStateUtils
 
+from app.executors import ContextCopyingThreadPoolExecutor
+from app.installation_stores import SQLiteInstallationStore, SQLiteOAuthStateStore
+from app.listener_index import IndexedApp
 from app.listeners import register_listeners
+from app.metrics import collect_prometheus_text, handle_with_metrics, instrument_app
+from app.onboarding import install_completion, install_failure
+from app.onboarding_fanout import onboarding_fanout
+from app.tutorials import channel_creation_executor, load_all_options_indexes
 
-# デフォルトではローカルファイルに state の情報やインストール情報を書きます
+# ローカルの SQLite ファイルに state の情報やインストール情報を書きます
 # 必要に応じて別の実装に差し替えてください（Amazon S3, RDB に対応しています）
-from app.onboarding import install_completion, install_failure
+database = os.environ.get("SLACK_SQLITE_DB", "./slack_app.db")
+
+# lazy リスナーを実行するスレッドプール（gunicorn.conf.py はワーカーのスレッド数に合わせて設定します）
+listener_executor = ContextCopyingThreadPoolExecutor(
+    max_workers=int(os.environ.get("SLACK_LISTENER_THREADS") or 5)
+)
 
-app = App(
+app = IndexedApp(
     oauth_settings=OAuthSettings(
         callback_options=CallbackOptions(
             success=install_completion, failure=install_failure
         ),
+        installation_store=SQLiteInstallationStore(
+            database=database, client_id=os.environ["SLACK_CLIENT_ID"]
+        ),
+        state_store=SQLiteOAuthStateStore(
+            database=database, expiration_seconds=OAuthStateUtils.default_expiration_seconds
+        ),
         # Simpler & v1.0.x compatible mode
         installation_store_bot_only=True
-    )
+    ),
+    listener_executor=listener_executor,
 )
 register_listeners(app)
+instrument_app(app)
+# The options of SLACK_OPTIONS_SOURCE are indexed before the worker receives requests
+load_all_options_indexes()
 
 from flask import Flask, request
 from slack_bolt.adapter.flask import SlackRequestHandler
@@ -33,7 +56,14 @@ handler = SlackRequestHandler(app)
 
 @flask_app.route("/slack/events", methods=["POST"])
 def slack_events():
-    return handler.handle(request)
+    return handle_with_metrics(handler.handle, request)
+
+
+# Listener and Web API latency histograms in Prometheus text format
+# (with gunicorn, the numbers of all the worker processes)
+@flask_app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return collect_prometheus_text(), 200, {"Content-Type": "text/plain; version=0.0.4"}
 
 
 @flask_app.route("/slack/install", methods=["GET"])
@@ -46,7 +76,19 @@ def oauth_redirect():
     return handler.handle(request)
 
 
-# Only for local debug
+# Called by gunicorn.conf.py before a worker process exits; the lazy listeners, the welcome DMs,
+# and the channel setup (join / invite / progress updates) run after the responses have been returned
+def drain_background_tasks(timeout: float) -> int:
+    deadline = time.monotonic() + timeout
+    # The lazy listeners first, as they submit tasks to the other executors
+    unfinished = listener_executor.drain(timeout=timeout)
+    for executor in [onboarding_fanout.executor, channel_creation_executor]:
+        remaining = max(deadline - time.monotonic(), 0)
+        unfinished += executor.drain(timeout=remaining)
+    return unfinished
+
+
+# Only for local debug (use gunicorn.conf.py in production)
 if __name__ == "__main__":
-    logging.basicConfig(format="%(asctime)s %(message)s", level=logging.DEBUG)
+    configure_logging(default_level="DEBUG", force=True)
     flask_app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", 3000)))
@@ -0,0 +1,57 @@
+# Production server settings for flask_app.py
+#
+#   gunicorn -c gunicorn.conf.py
+#   gunicorn -c gunicorn.conf.py aiohttp_app:web_app --worker-class aiohttp.GunicornWebWorker
+#
+# Each worker process has its own thread pools; the settings can be changed with env variables.
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+wsgi_app = "flask_app:flask_app"
+bind = f"0.0.0.0:{os.environ.get('PORT', '3000')}"
+
+workers = int(os.environ.get("SLACK_SERVER_WORKERS") or multiprocessing.cpu_count() * 2 + 1)
+worker_class = "gthread"
+# Threads acknowledging the requests in a worker
+threads = int(os.environ.get("SLACK_SERVER_THREADS") or 8)
+# Lazy listeners wait for Web API calls much longer than the acknowledgements,
+# so each worker has more threads for them (read by flask_app.py)
+if not os.environ.get("SLACK_LISTENER_THREADS"):
+    os.environ["SLACK_LISTENER_THREADS"] = str(threads * 4)
+
+# The workers share the latency histograms for /metrics through the files in this directory
+temporary_metrics_dir = None
+if not os.environ.get("SLACK_METRICS_DIR"):
+    temporary_metrics_dir = tempfile.mkdtemp(prefix="slack-metrics-")
+    os.environ["SLACK_METRICS_DIR"] = temporary_metrics_dir
+
+# Longer than the idle timeout of load balancers (e.g., 60 seconds of ALB)
+# so that the load balancer closes the idle connections first
+keepalive = int(os.environ.get("SLACK_SERVER_KEEPALIVE_SECONDS") or 75)
+
+# On SIGTERM, a worker stops accepting requests, finishes the ongoing ones,
+# and then waits for the lazy listeners until this timeout
+graceful_timeout = int(os.environ.get("SLACK_SERVER_GRACEFUL_TIMEOUT_SECONDS") or 30)
+
+
+def worker_exit(server, worker):
+    flask_app = sys.modules.get("flask_app")
+    if flask_app is None:
+        return
+    # The arbiter kills the worker at graceful_timeout, so keep a margin
+    unfinished = flask_app.drain_background_tasks(timeout=max(graceful_timeout - 2, 0))
+    if unfinished > 0:
+        server.log.warning(f"Worker {worker.pid} exited with {unfinished} unfinished lazy listeners")
+    else:
+        server.log.info(f"Worker {worker.pid} finished all the lazy listeners")
+    metrics = sys.modules.get("app.metrics")
+    if metrics is not None and metrics.worker_metrics_files is not None:
+        metrics.worker_metrics_files.save(force=True)
+
+
+def on_exit(server):
+    if temporary_metrics_dir is not None:
+        shutil.rmtree(temporary_metrics_dir, ignore_errors=True)
@@ -1,53 +1,139 @@
-import logging
 import os
+from typing import Optional
 
-from slack_bolt import App
 from slack_bolt.adapter.aws_lambda import SlackRequestHandler
-from slack_bolt.adapter.aws_lambda.lambda_s3_oauth_flow import LambdaS3OAuthFlow
 from slack_bolt.authorization.authorize import InstallationStoreAuthorize
+from slack_bolt.oauth import OAuthFlow
 from slack_bolt.oauth.callback_options import CallbackOptions
 from slack_bolt.oauth.oauth_settings import OAuthSettings
-from slack_sdk.oauth.installation_store.cacheable_installation_store import (
-    CacheableInstallationStore,
-)
 
+from app.authorization_cache import SharedCacheAuthorize, shared_authorization_cache
+from app.boto3_clients import LazyBoto3Client
+from app.executors import ContextCopyingThreadPoolExecutor
+from app.installation_stores import (
+    ConcurrentS3InstallationStore,
+    ConcurrentS3OAuthStateStore,
+    WriteThroughInstallationStore,
+    s3_io,
+)
+from app.listener_index import IndexedApp
 from app.listeners import register_listeners
+from app.metrics import flush_emf, handle_with_metrics, instrument_app
 from app.onboarding import install_failure, install_completion
+from app.onboarding_fanout import (
+    handle_lambda_onboarding_fanout,
+    invoke_lambda_onboarding_fanout,
+    lambda_event_key,
+    onboarding_fanout,
+)
+from app.structured_logging import configure_logging
+from app.tracing import TracingLambdaLazyListenerRunner, trace_lambda_invocation, tracer
+from app.tutorials import load_all_options_indexes, load_all_tutorial_views
 
 SlackRequestHandler.clear_all_log_handlers()
-logging.basicConfig(format="%(asctime)s %(message)s", level=logging.DEBUG)
-
-oauth_flow = LambdaS3OAuthFlow(
-    settings=OAuthSettings(
-        install_path=os.environ["SLACK_LAMBDA_PATH"],
-        redirect_uri_path=os.environ["SLACK_LAMBDA_PATH"],
-        callback_options=CallbackOptions(
-            success=install_completion, failure=install_failure
-        ),
-        # Simpler & v1.0.x compatible mode
-        installation_store_bot_only=True,
-    )
+# SLACK_LOG_LEVEL (default: INFO) and the sampling settings in _env
+configure_logging()
+
+oauth_settings = OAuthSettings(
+    install_path=os.environ["SLACK_LAMBDA_PATH"],
+    redirect_uri_path=os.environ["SLACK_LAMBDA_PATH"],
+    callback_options=CallbackOptions(
+        success=install_completion, failure=install_failure
+    ),
+    # Simpler & v1.0.x compatible mode
+    installation_store_bot_only=True,
 )
 
-oauth_flow.settings.installation_store = CacheableInstallationStore(
-    oauth_flow.settings.installation_store
+# When SLACK_LAMBDA_LAZY_INIT=1, the S3 client is created when a request needs it
+# instead of during the cold start (the tutorial pages are always built lazily)
+lazy_init = os.environ.get("SLACK_LAMBDA_LAZY_INIT") == "1"
+
+# Both stores share the same client (and its connection pool)
+s3_client = LazyBoto3Client("s3")
+if not lazy_init:
+    s3_client = s3_client.client
+    # Use the CPU boost in the init phase to build all the Home tab views
+    load_all_tutorial_views()
+# Even with SLACK_LAMBDA_LAZY_INIT, as the options index of SLACK_OPTIONS_SOURCE can be large
+load_all_options_indexes()
+
+oauth_settings.state_store = ConcurrentS3OAuthStateStore(
+    s3_client=s3_client,
+    bucket_name=os.environ["SLACK_STATE_S3_BUCKET_NAME"],
+    expiration_seconds=oauth_settings.state_expiration_seconds,
 )
-oauth_flow.settings.authorize = InstallationStoreAuthorize(
-    logger=oauth_flow.logger,
-    installation_store=oauth_flow.settings.installation_store,
-    cache_enabled=True,
+oauth_settings.installation_store = WriteThroughInstallationStore(
+    ConcurrentS3InstallationStore(
+        s3_client=s3_client,
+        bucket_name=os.environ["SLACK_INSTALLATION_S3_BUCKET_NAME"],
+        client_id=oauth_settings.client_id,
+    )
 )
+oauth_flow = OAuthFlow(settings=oauth_settings)
+if shared_authorization_cache is not None:
+    # Cold containers reuse the authorizations that the other containers have done
+    oauth_flow.settings.authorize = SharedCacheAuthorize(
+        cache=shared_authorization_cache,
+        ttl_seconds=float(os.environ.get("SLACK_AUTHORIZATION_CACHE_TTL_SECONDS") or 600),
+        negative_ttl_seconds=float(
+            os.environ.get("SLACK_AUTHORIZATION_CACHE_NEGATIVE_TTL_SECONDS") or 60
+        ),
+        logger=oauth_flow.logger,
+        installation_store=oauth_flow.settings.installation_store,
+        bot_only=True,
+    )
+else:
+    oauth_flow.settings.authorize = InstallationStoreAuthorize(
+        logger=oauth_flow.logger,
+        installation_store=oauth_flow.settings.installation_store,
+        bot_only=True,
+        cache_enabled=True,
+    )
 
-app = App(
+app = IndexedApp(
     process_before_response=True,  # This is required when you can Bolt apps on FaaS
     oauth_flow=oauth_flow,
+    listener_executor=ContextCopyingThreadPoolExecutor(max_workers=5),
 )
 register_listeners(app)
+# Listener and Web API latency histograms, written in CloudWatch Embedded Metric Format
+instrument_app(app)
+
+# Background threads are frozen once the response is returned,
+# so the welcome DMs are sent in asynchronous invocations of this function
+onboarding_fanout.dispatch = invoke_lambda_onboarding_fanout
+
+# Reused by all the invocations in this container; a new handler per invocation
+# also meant a new boto3 Lambda client for every lazy listener invocation
+slack_handler: Optional[SlackRequestHandler] = None
 
 
 def handler(event, context):
-    slack_handler = SlackRequestHandler(app=app)
-    return slack_handler.handle(event, context)
+    try:
+        # SLACK_TRACE_FILE / SLACK_TRACE_OTLP_ENDPOINT enable the tracing
+        name = "onboarding fanout" if lambda_event_key in event else None
+        with trace_lambda_invocation(event, context, name):
+            return handle_invocation(event, context)
+    finally:
+        flush_emf()
+        tracer.flush()
+
+
+def handle_invocation(event, context):
+    if lambda_event_key in event:
+        return handle_lambda_onboarding_fanout(event, context)
+    global slack_handler
+    if slack_handler is None:
+        slack_handler = SlackRequestHandler(app=app)
+        # The lazy listener invocations continue the trace of this invocation
+        app.listener_runner.lazy_listener_runner = TracingLambdaLazyListenerRunner(
+            app.logger, lambda_client=LazyBoto3Client("lambda")
+        )
+    try:
+        return handle_with_metrics(slack_handler.handle, event, context)
+    finally:
+        # e.g., the deletion of the consumed OAuth state
+        s3_io.wait()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,74 @@
+import json
 import os
+import threading
+from urllib.parse import parse_qsl, urlencode
 
 from slack_bolt import BoltRequest
 from slack_bolt.app import App
 from slack_bolt.oauth import OAuthFlow
 from slack_bolt.response import BoltResponse
 
+from app.structured_logging import configure_logging, structured
+
+redacted_headers = ["x-slack-signature", "authorization", "cookie"]
+redacted_keys = ["token", "bot_access_token", "response_url"]
+
+
+def redact(data):
+    if isinstance(data, dict):
+        return {
+            k: "(redacted)" if k in redacted_keys else redact(v) for k, v in data.items()
+        }
+    if isinstance(data, list):
+        return [redact(v) for v in data]
+    return data
+
+
+def redact_body(raw_body: str, content_type: str) -> str:
+    if content_type.startswith("application/json"):
+        return json.dumps(redact(json.loads(raw_body)))
+    params = []
+    for k, v in parse_qsl(raw_body, keep_blank_values=True):
+        if k == "payload":
+            v = json.dumps(redact(json.loads(v)))
+        elif k in redacted_keys:
+            v = "(redacted)"
+        params.append((k, v))
+    return urlencode(params)
+
+
+# Appends every dispatched request to a JSONL file, which benchmarks/replay.py can replay
+class RequestRecorder:
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, request: BoltRequest):
+        content_type = (request.headers.get("content-type") or [""])[0]
+        headers = {
+            k: ["(redacted)"] if k in redacted_headers else list(v)
+            for k, v in request.headers.items()
+        }
+        line = json.dumps(
+            {"headers": headers, "body": redact_body(request.raw_body, content_type)},
+            ensure_ascii=False,
+        )
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
 
 def run(app: App):
+    # e.g., SLACK_RECORD_REQUESTS_FILE=recorded_requests.jsonl python lambda_app.py
+    record_path = os.environ.get("SLACK_RECORD_REQUESTS_FILE")
+    recorder = RequestRecorder(record_path) if record_path else None
+    configure_logging(default_level="DEBUG", force=True)
+
     @app.use
     def print_request(request: BoltRequest, next, logger):
-        logger.info(f"Request body: {request.body}")
+        logger.info(structured("Request", body=request.body))
+        if recorder is not None:
+            recorder.record(request)
         next()
 
     from flask import Request, Response, make_response